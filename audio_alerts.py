@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Single background worker for alert sounds (overdue tasks).
+
+Callers only put a request on a queue, so the Tk main thread never touches
+audio APIs. One long-lived daemon thread plays the sounds:
+
+- Coalescing: requests arriving within `coalesce_window` seconds of the first
+  one are merged into a single sound (e.g. 30 tasks going overdue at once,
+  or a sync bringing in many overdue tasks).
+- Rate limiting: at most one sound per `min_interval` seconds. Requests that
+  arrive during the cool-down are merged into one sound played when it ends.
+- Sounds are played blocking inside the worker, so streams never overlap
+  and the thread count stays at one.
+- play() (e.g. a "Test Sound" button) skips the waits but still goes through
+  the worker; pending alerts are merged into that sound.
+
+Usage patterns:
+    from audio_alerts import AlertPlayer
+
+    player = AlertPlayer(lambda: playsound("overdue.mp3"))
+    player.alert()   # from any thread, returns immediately
+    player.play()    # same, but played without the coalescing/cool-down wait
+    player.stop()    # on exit (optional, the worker is a daemon)
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+_STOP = object()
+_NOW = object()
+
+
+class AlertPlayer:
+    """Queue-fed audio worker with coalescing and rate limiting."""
+
+    def __init__(self, play: Callable[[], None], coalesce_window: float = 0.75,
+                 min_interval: float = 10.0):
+        self._play = play
+        self.coalesce_window = coalesce_window
+        self.min_interval = min_interval
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._last_played = float("-inf")
+        self.played = 0      # sounds actually played
+        self.requested = 0   # alert() calls
+
+    def alert(self) -> None:
+        """Request one alert sound (non-blocking, thread-safe)."""
+        self.requested += 1
+        self._ensure_worker()
+        self._queue.put(None)
+
+    def play(self) -> None:
+        """Play one sound as soon as the worker is free (non-blocking, thread-safe)."""
+        self._ensure_worker()
+        self._queue.put(_NOW)
+
+    def stop(self) -> None:
+        """Ask the worker to exit after the sound it is playing (if any)."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+
+    # ----------- WORKER -----------
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="alert-audio", daemon=True)
+                self._thread.start()
+
+    def _drain_until(self, deadline: float) -> bool:
+        """
+        Swallow requests until `deadline` (monotonic); a play() request ends the
+        wait early. False if stop was requested.
+        """
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return True
+            if item is _STOP:
+                return False
+            if item is _NOW:
+                return True
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if item is not _NOW:
+                # Merge everything that arrives in the coalescing window or the cool-down
+                deadline = max(time.monotonic() + self.coalesce_window,
+                               self._last_played + self.min_interval)
+                if not self._drain_until(deadline):
+                    return
+            try:
+                self._play()
+            except Exception as e:
+                print(f"Alert sound warning: {e}")
+            self._last_played = time.monotonic()
+            self.played += 1
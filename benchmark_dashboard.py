@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+Headless benchmark for the dashboard (task.py) data layer.
+
+Generates synthetic taskmask.db files (todos, archive rows, notes, links),
+imports task.py against them without showing a window and times the hot
+paths: load_todo_data_from_db, persist_todos_to_db, refresh_todo_tree,
+update_timers, find_next_task and update_status_bar. Results are written as
+JSON so runs can be compared between versions.
+
+Tk backends (--tk):
+- stub  : in-process stand-in widgets (no display needed). Treeview/Listbox
+          keep real Python state, so timings cover task.py's own work and the
+          number of widget calls, not Tk's drawing.
+- real  : the real tkinter (needs a display, e.g. `xvfb-run`).
+- auto  : real if $DISPLAY is set, otherwise stub (default).
+
+Each database size runs in a fresh subprocess so module state and caches
+never leak between sizes.
+
+Usage patterns:
+    python benchmark_dashboard.py                            # 10k todos, stub Tk
+    python benchmark_dashboard.py --todos 10000 100000 500000 --out bench.json
+    xvfb-run python benchmark_dashboard.py --tk real --repeat 3
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+WORDS = (
+    "report invoice backup deploy review meeting call email server client "
+    "budget design release fix update migrate audit renew plan draft"
+).split()
+SEARCH_QUERY = "invoice"
+TS_FMT = "%Y-%m-%d %H:%M:%S"
+DEADLINE_FMT = "%Y-%m-%d %H:%M"
+
+
+# ----------- HEADLESS TK STAND-IN -----------
+class _Widget:
+    """Accepts any widget call; unknown methods are no-ops returning None."""
+
+    def __init__(self, *args, **kwargs):
+        self._opts = dict(kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+    def __getitem__(self, key):
+        return self._opts.get(key, "")
+
+    def __setitem__(self, key, value):
+        self._opts[key] = value
+
+    def cget(self, key):
+        return self._opts.get(key, "")
+
+    def winfo_exists(self):
+        return 1
+
+    def winfo_width(self):
+        return 1280
+
+    def winfo_height(self):
+        return 720
+
+    def winfo_x(self):
+        return 0
+
+    winfo_y = winfo_rootx = winfo_rooty = winfo_x
+
+    def winfo_screenwidth(self):
+        return 1920
+
+    def winfo_screenheight(self):
+        return 1080
+
+
+class _Var:
+    def __init__(self, master=None, value=None, name=None):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+
+    def trace_add(self, *args, **kwargs):
+        return ""
+
+    trace = trace_add
+
+
+class _Listbox(_Widget):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.items = []
+
+    def insert(self, index, *values):
+        if index == "end":
+            self.items.extend(values)
+        else:
+            self.items[int(index):int(index)] = values
+
+    def delete(self, first, last=None):
+        if last is None:
+            del self.items[int(first)]
+        else:
+            end = len(self.items) if last == "end" else int(last) + 1
+            del self.items[int(first):end]
+
+    def get(self, first, last=None):
+        if last is None:
+            return self.items[int(first)]
+        end = len(self.items) if last == "end" else int(last) + 1
+        return tuple(self.items[int(first):end])
+
+    def size(self):
+        return len(self.items)
+
+    def curselection(self):
+        return ()
+
+
+class _Treeview(_Widget):
+    """Flat Treeview model: children order, item values/tags, selection; counts calls."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._order = []
+        self._items = {}
+        self._selection = ()
+        self.calls = {"insert": 0, "delete": 0, "detach": 0, "move": 0, "item": 0}
+
+    def get_children(self, item=""):
+        return tuple(self._order)
+
+    def insert(self, parent, index, iid=None, values=(), tags=()):
+        self.calls["insert"] += 1
+        if index == "end" or int(index) >= len(self._order):
+            self._order.append(iid)
+        else:
+            self._order.insert(int(index), iid)
+        self._items[iid] = {"values": tuple(values), "tags": tuple(tags)}
+        return iid
+
+    def delete(self, *iids):
+        self.calls["delete"] += 1
+        gone = set(iids)
+        self._order = [iid for iid in self._order if iid not in gone]
+        for iid in iids:
+            self._items.pop(iid, None)
+
+    def detach(self, *iids):
+        self.calls["detach"] += 1
+        gone = set(iids)
+        self._order = [iid for iid in self._order if iid not in gone]
+
+    def move(self, iid, parent, index):
+        self.calls["move"] += 1
+        if iid in self._order:
+            self._order.remove(iid)
+        self._order.insert(int(index), iid)
+
+    def item(self, iid, option=None, **kwargs):
+        data = self._items[iid]
+        if kwargs:
+            self.calls["item"] += 1
+            for key in ("values", "tags"):
+                if key in kwargs:
+                    data[key] = tuple(kwargs[key])
+            return None
+        return data[option] if option else dict(data)
+
+    def exists(self, iid):
+        return iid in self._items
+
+    def index(self, iid):
+        return self._order.index(iid)
+
+    def selection(self):
+        return self._selection
+
+    def selection_set(self, *iids):
+        if len(iids) == 1 and isinstance(iids[0], (list, tuple)):
+            iids = tuple(iids[0])
+        self._selection = tuple(iids)
+
+    def selection_remove(self, *iids):
+        self._selection = ()
+
+    def yview(self, *args):
+        return None if args else (0.0, 1.0)
+
+
+class _Font:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def metrics(self, *args):
+        return 18
+
+    def measure(self, text):
+        return 8 * len(text)
+
+
+def install_stub_tk() -> None:
+    """Register the stand-in as tkinter (+ ttk, messagebox, filedialog, simpledialog, font)."""
+    tk = types.ModuleType("tkinter")
+    for name in ("Tk", "Toplevel", "Frame", "Label", "Button", "Entry", "Menu", "Canvas",
+                 "Scrollbar", "Text", "Spinbox", "Checkbutton", "Radiobutton", "LabelFrame",
+                 "Misc", "Widget"):
+        setattr(tk, name, type(name, (_Widget,), {}))
+    tk.Listbox = _Listbox
+    tk.StringVar = tk.BooleanVar = tk.IntVar = tk.DoubleVar = _Var
+    tk.END, tk.WORD, tk.TclError, tk.TkVersion = "end", "word", Exception, 8.6
+
+    ttk = types.ModuleType("tkinter.ttk")
+    ttk.Treeview = _Treeview
+    ttk.Style = ttk.Scrollbar = ttk.Frame = ttk.Label = ttk.Combobox = _Widget
+
+    messagebox = types.ModuleType("tkinter.messagebox")
+    for name in ("showinfo", "showwarning", "showerror"):
+        setattr(messagebox, name, lambda *args, **kwargs: None)
+    messagebox.askyesno = lambda *args, **kwargs: True
+
+    filedialog = types.ModuleType("tkinter.filedialog")
+    filedialog.askopenfilename = filedialog.asksaveasfilename = lambda *args, **kwargs: ""
+    simpledialog = types.ModuleType("tkinter.simpledialog")
+    font = types.ModuleType("tkinter.font")
+    font.Font = _Font
+
+    tk.ttk, tk.messagebox, tk.filedialog, tk.simpledialog, tk.font = ttk, messagebox, filedialog, simpledialog, font
+    sys.modules.update({
+        "tkinter": tk, "tkinter.ttk": ttk, "tkinter.messagebox": messagebox,
+        "tkinter.filedialog": filedialog, "tkinter.simpledialog": simpledialog, "tkinter.font": font,
+    })
+
+
+def install_real_tk() -> None:
+    """Real tkinter, but make task.py's root.mainloop() return immediately."""
+    import tkinter
+    tkinter.Misc.mainloop = lambda self, n=0: None
+
+
+# ----------- SYNTHETIC DATABASE -----------
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def generate_db(path: str, todos: int, archive: int, notes: int, links: int, seed: int = 42) -> None:
+    """Create a migrated taskmask.db at path filled with deterministic synthetic rows."""
+    sys.path.insert(0, HERE)
+    from taskmask_db import ORDER_GAP, TaskmaskDB, migrate
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    db = TaskmaskDB(path)
+    migrate(db)
+
+    def todo_row(i: int, archived: bool):
+        created = now - timedelta(days=rng.uniform(0, 3 * 365))
+        done = archived or rng.random() < 0.35
+        # Live done rows are recent (older ones would already be archived)
+        done_at = (now - timedelta(hours=rng.uniform(0, 11))) if done and not archived else (
+            created + timedelta(days=rng.uniform(0, 30)) if done else None)
+        deadline = ""
+        if rng.random() < 0.4:
+            deadline = (now + timedelta(minutes=rng.randint(-30 * 1440, 30 * 1440))).strftime(DEADLINE_FMT)
+        return (
+            f"{i:032x}",
+            f"{_sentence(rng, rng.randint(3, 8))} #{i}",
+            deadline,
+            done_at.strftime(TS_FMT) if done_at else "",
+            created.strftime(TS_FMT),
+            done,
+        )
+
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO todos (uuid, task, deadline, done_at, created_at, done, order_index) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((*todo_row(i, False), (i + 1) * ORDER_GAP) for i in range(todos)),
+        )
+        conn.executemany(
+            "INSERT INTO archive_todos (uuid, task, deadline, done_at, created_at, archived_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (row[:5] + (row[3],) for row in (todo_row(todos + i, True) for i in range(archive))),
+        )
+        conn.executemany(
+            "INSERT INTO notes (title, content, order_index) VALUES (?, ?, ?)",
+            ((_sentence(rng, 4), _sentence(rng, rng.randint(50, 2000)), (i + 1) * ORDER_GAP) for i in range(notes)),
+        )
+        conn.executemany(
+            "INSERT INTO links (name, url, order_index) VALUES (?, ?, ?)",
+            ((_sentence(rng, 2), f"https://example.com/{i}", (i + 1) * ORDER_GAP) for i in range(links)),
+        )
+    db.close()
+
+
+# ----------- BENCHMARK (one size, in-process) -----------
+def _timed(fn, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs_ms": [round(r, 3) for r in runs],
+        "min_ms": round(min(runs), 3),
+        "median_ms": round(statistics.median(runs), 3),
+    }
+
+
+def run_single(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="dashboard-bench-")
+    os.environ["APPDATA"] = workdir
+    os.chdir(workdir)  # no portable.txt here, so task.py uses APPDATA
+    sys.path.insert(0, HERE)
+
+    tk_mode = args.tk
+    if tk_mode == "auto":
+        tk_mode = "real" if os.environ.get("DISPLAY") else "stub"
+    install_real_tk() if tk_mode == "real" else install_stub_tk()
+
+    start = time.perf_counter()
+    import task  # builds the (hidden/stubbed) window; data is not loaded yet
+    import_ms = (time.perf_counter() - start) * 1000
+    task.overdue_alerts._play = lambda: None  # time the model, not the speakers
+
+    start = time.perf_counter()
+    generate_db(task.DB_NAME, args.todos, args.archive, args.notes, args.links, args.seed)
+    generate_s = time.perf_counter() - start
+
+    results = {"import_task": {"runs_ms": [round(import_ms, 3)], "min_ms": round(import_ms, 3),
+                               "median_ms": round(import_ms, 3)}}
+    results["init_db"] = _timed(task.init_db, args.repeat)
+    results["load_todo_data_from_db"] = _timed(task.load_todo_data_from_db, args.repeat)
+
+    # First render builds every row; later calls with no changes should be ~free
+    results["refresh_todo_tree_initial"] = _timed(task.refresh_todo_tree, 1)
+    results["refresh_todo_tree"] = _timed(task.refresh_todo_tree, args.repeat)
+    results["update_timers_first_tick"] = _timed(task.update_timers, 1)
+    results["update_timers"] = _timed(task.update_timers, args.repeat)
+    results["update_status_bar"] = _timed(task.update_status_bar, args.repeat)
+
+    task.search_placeholder_active = False
+    task.todo_search_var.set(SEARCH_QUERY)
+    results["find_next_task"] = _timed(task.find_next_task, args.repeat)
+
+    uuids = list(task.todo_data)
+    rng = random.Random(args.seed)
+
+    def edit_one_percent():
+        for uuid_val in rng.sample(uuids, max(1, len(uuids) // 100)):
+            task.todo_data[uuid_val].task += "."
+            task.mark_todo_dirty(uuid_val)
+        task.persist_todos_to_db()
+        task.writes.flush()  # include the commit, not just queueing it
+
+    def edit_all():
+        for uuid_val in uuids:
+            task.mark_todo_dirty(uuid_val)
+        task.persist_todos_to_db()
+        task.writes.flush()
+
+    results["persist_todos_to_db_1pct"] = _timed(edit_one_percent, args.repeat)
+    results["persist_todos_to_db_all"] = _timed(edit_all, 1)
+
+    tree = task.todo_tree
+    meta = {
+        "todos": args.todos,
+        "archive": args.archive,
+        "notes": args.notes,
+        "links": args.links,
+        "tk": tk_mode,
+        "generate_s": round(generate_s, 3),
+        "db_bytes": os.path.getsize(task.DB_NAME),
+    }
+    if isinstance(getattr(tree, "calls", None), dict):
+        meta["treeview_calls"] = dict(tree.calls)
+    task.db.close()
+    return {"meta": meta, "results": results}
+
+
+# ----------- DRIVER -----------
+def _child_cmd(args, todos: int) -> list[str]:
+    archive = args.archive if args.archive is not None else todos
+    return [
+        sys.executable, os.path.abspath(__file__), "--single",
+        "--todos", str(todos), "--archive", str(archive), "--notes", str(args.notes),
+        "--links", str(args.links), "--repeat", str(args.repeat), "--seed", str(args.seed),
+        "--tk", args.tk,
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Headless benchmark for the dashboard data layer")
+    parser.add_argument("--todos", type=int, nargs="+", default=[10000],
+                        help="live todo counts to benchmark, one run each (default: 10000)")
+    parser.add_argument("--archive", type=int, default=None, help="archive rows (default: same as todos)")
+    parser.add_argument("--notes", type=int, default=500)
+    parser.add_argument("--links", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5, help="timed repetitions per operation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tk", choices=("auto", "stub", "real"), default="auto")
+    parser.add_argument("--out", default="benchmark_results.json", help="JSON output path")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        args.todos = args.todos[0]
+        if args.archive is None:
+            args.archive = args.todos
+        # task.py prints to stdout; keep our JSON on its own line at the end
+        report = run_single(args)
+        sys.stdout.write("\n" + json.dumps(report) + "\n")
+        return 0
+
+    runs = []
+    for todos in args.todos:
+        print(f"Benchmarking {todos} todos...", flush=True)
+        proc = subprocess.run(_child_cmd(args, todos), capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            return proc.returncode
+        report = json.loads(proc.stdout.strip().splitlines()[-1])
+        runs.append(report)
+        for name, timing in report["results"].items():
+            print(f"  {name:<28} median {timing['median_ms']:>10.2f} ms   min {timing['min_ms']:>10.2f} ms")
+
+    output = {
+        "created_at": datetime.now().strftime(TS_FMT),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "runs": runs,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
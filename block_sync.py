@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Block-level sync of taskmask.db over "dumb" storage (FTP, S3).
+
+Neither transport can run code remotely or patch a file in place, so the
+remote copy is stored content-addressed:
+
+    <name>.manifest.json        size, sha256, mtime and the chunk hash list
+    <name>.chunks/<sha256>      one object per distinct chunk
+
+Chunks are page-aligned (PAGES_PER_CHUNK SQLite pages), so an edit that
+rewrites a few pages changes a few chunks:
+
+- push_file() uploads only chunks the remote manifest doesn't have, then the
+  new manifest (the commit point), then deletes chunks no longer referenced.
+- pull_file() rebuilds the remote file from chunks already present locally
+  plus the missing ones it downloads, and verifies size + sha256 before
+  the caller swaps it in.
+
+Switching a store to this layout is one-way: once the manifest exists, the
+whole-file <name> written by earlier versions is moved aside to
+<name>.pre-block-sync (retire_legacy) rather than kept up to date, so no
+client keeps reading or writing a copy that stopped changing.
+
+Usage patterns:
+    from block_sync import FtpChunkStore, build_manifest, read_manifest, push_file, pull_file
+
+    store = FtpChunkStore(ftp, "/backup")
+    local = build_manifest("taskmask.db")
+    remote = read_manifest(store, "taskmask.db")
+    if remote is None or remote["sha256"] != local["sha256"]:
+        push_file(store, "taskmask.db", "taskmask.db", local, remote)
+    # or, when the remote copy is newer:
+    pull_file(store, "taskmask.db", remote, "taskmask.db", "taskmask.db.tmp")
+    retire_legacy(store, "taskmask.db")   # after the first push, if a whole-file copy exists
+"""
+
+import hashlib
+import io
+import json
+import os
+from typing import Optional
+
+MANIFEST_FORMAT = 1
+LEGACY_SUFFIX = ".pre-block-sync"  # where retire_legacy() moves the old whole file
+PAGES_PER_CHUNK = 8         # 32 KiB chunks at SQLite's default 4 KiB page size
+DEFAULT_PAGE_SIZE = 4096    # used when the file has no valid SQLite header
+
+
+class BlockSyncError(Exception):
+    """Remote data is missing or the rebuilt file does not match its manifest."""
+
+
+def sqlite_page_size(path: str) -> int:
+    """Page size from the database header (bytes 16-17, big-endian; 1 means 65536)."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(18)
+    except OSError:
+        return DEFAULT_PAGE_SIZE
+    if len(header) < 18 or not header.startswith(b"SQLite format 3\x00"):
+        return DEFAULT_PAGE_SIZE
+    value = int.from_bytes(header[16:18], "big")
+    return 65536 if value == 1 else (value or DEFAULT_PAGE_SIZE)
+
+
+def build_manifest(path: str, pages_per_chunk: int = PAGES_PER_CHUNK) -> dict:
+    """Chunk hashes + whole-file sha256 of a local file, in one read pass."""
+    chunk_size = sqlite_page_size(path) * pages_per_chunk
+    whole = hashlib.sha256()
+    chunks = []
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            whole.update(chunk)
+            chunks.append(hashlib.sha256(chunk).hexdigest())
+            size += len(chunk)
+    return {
+        "format": MANIFEST_FORMAT,
+        "chunk_size": chunk_size,
+        "size": size,
+        "sha256": whole.hexdigest(),
+        "mtime": os.path.getmtime(path),
+        "chunks": chunks,
+    }
+
+
+def manifest_name(name: str) -> str:
+    return f"{name}.manifest.json"
+
+
+def chunk_name(name: str, digest: str) -> str:
+    return f"{name}.chunks/{digest}"
+
+
+def read_manifest(store, name: str) -> Optional[dict]:
+    """The remote manifest for `name`, or None if there is none (or it is unreadable)."""
+    data = store.read(manifest_name(name))
+    if data is None:
+        return None
+    try:
+        manifest = json.loads(data.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("format") != MANIFEST_FORMAT:
+        return None
+    return manifest
+
+
+def push_file(store, path: str, name: str, local: dict, remote: Optional[dict] = None) -> tuple[int, int]:
+    """
+    Upload `path` (described by `local` from build_manifest) as `name`.
+    Returns (chunks uploaded, bytes uploaded).
+    """
+    have = set(remote["chunks"]) if remote and remote.get("chunk_size") == local["chunk_size"] else set()
+    uploaded = nbytes = 0
+    sent = set()
+    with open(path, "rb") as f:
+        for index, digest in enumerate(local["chunks"]):
+            if digest in have or digest in sent:
+                continue
+            f.seek(index * local["chunk_size"])
+            data = f.read(local["chunk_size"])
+            if hashlib.sha256(data).hexdigest() != digest:
+                raise BlockSyncError("local file changed during upload")
+            store.write(chunk_name(name, digest), data)
+            sent.add(digest)
+            uploaded += 1
+            nbytes += len(data)
+    store.write(manifest_name(name), json.dumps(local).encode("utf-8"))
+    if remote:
+        keep = set(local["chunks"])
+        for digest in set(remote.get("chunks", ())) - keep:
+            try:
+                store.delete(chunk_name(name, digest))
+            except Exception:
+                pass  # an orphaned chunk only costs storage
+    return uploaded, nbytes
+
+
+def pull_file(store, name: str, remote: dict, local_path: str, dest_path: str) -> tuple[int, int]:
+    """
+    Rebuild the remote file `name` into dest_path, reusing chunks of local_path
+    where the hashes match. Raises BlockSyncError if the result doesn't verify.
+    Returns (chunks downloaded, bytes downloaded).
+    """
+    chunk_size = int(remote["chunk_size"])
+    local_offsets: dict[str, int] = {}
+    if os.path.exists(local_path):
+        with open(local_path, "rb") as f:
+            offset = 0
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                local_offsets.setdefault(hashlib.sha256(chunk).hexdigest(), offset)
+                offset += len(chunk)
+
+    downloaded = nbytes = 0
+    fetched: dict[str, bytes] = {}  # repeated chunks (e.g. zeroed pages) are fetched once
+    whole = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest_path, "wb") as out, (open(local_path, "rb") if local_offsets else io.BytesIO()) as src:
+            for digest in remote["chunks"]:
+                if digest in local_offsets:
+                    src.seek(local_offsets[digest])
+                    data = src.read(chunk_size)
+                elif digest in fetched:
+                    data = fetched[digest]
+                else:
+                    data = store.read(chunk_name(name, digest))
+                    if data is None or hashlib.sha256(data).hexdigest() != digest:
+                        raise BlockSyncError(f"remote chunk {digest[:12]} is missing or corrupt")
+                    fetched[digest] = data
+                    downloaded += 1
+                    nbytes += len(data)
+                out.write(data)
+                whole.update(data)
+                size += len(data)
+        if size != remote.get("size") or whole.hexdigest() != remote.get("sha256"):
+            raise BlockSyncError("rebuilt file does not match the remote manifest")
+    except BaseException:
+        try:
+            os.remove(dest_path)
+        except OSError:
+            pass
+        raise
+    return downloaded, nbytes
+
+
+def retire_legacy(store, name: str) -> str:
+    """
+    Move the whole-file copy `name` aside (replacing an earlier backup) once
+    the manifest has taken over. Returns the name it was moved to.
+    """
+    backup = name + LEGACY_SUFFIX
+    store.rename(name, backup)
+    return backup
+
+
+# ----------- STORES -----------
+# A store maps names (relative to one remote folder) to bytes:
+# read(name) -> bytes | None, write(name, data), delete(name), rename(old, new).
+
+class FtpChunkStore:
+    """Store on an already logged-in ftplib.FTP connection, under base_dir."""
+
+    def __init__(self, ftp, base_dir: str):
+        self.ftp = ftp
+        self.base_dir = base_dir.rstrip("/")
+        self._dirs: set[str] = set()
+
+    def _path(self, name: str) -> str:
+        return f"{self.base_dir}/{name}"
+
+    def read(self, name: str) -> Optional[bytes]:
+        import ftplib
+        buf = io.BytesIO()
+        try:
+            self.ftp.retrbinary(f"RETR {self._path(name)}", buf.write)
+        except ftplib.error_perm:
+            return None
+        return buf.getvalue()
+
+    def write(self, name: str, data: bytes) -> None:
+        import ftplib
+        path = self._path(name)
+        folder = path.rsplit("/", 1)[0]
+        if folder and folder not in self._dirs:
+            try:
+                self.ftp.mkd(folder)
+            except ftplib.error_perm:
+                pass  # already exists
+            self._dirs.add(folder)
+        # Upload under a temporary name and rename, so readers never see a partial file
+        self.ftp.storbinary(f"STOR {path}.part", io.BytesIO(data))
+        try:
+            self.ftp.delete(path)
+        except ftplib.error_perm:
+            pass
+        self.ftp.rename(f"{path}.part", path)
+
+    def delete(self, name: str) -> None:
+        self.ftp.delete(self._path(name))
+
+    def rename(self, old: str, new: str) -> None:
+        import ftplib
+        try:
+            self.ftp.delete(self._path(new))
+        except ftplib.error_perm:
+            pass
+        self.ftp.rename(self._path(old), self._path(new))
+
+
+class S3ChunkStore:
+    """Store on a boto3 S3 client, under key prefix `prefix` in `bucket`."""
+
+    def __init__(self, s3, bucket: str, prefix: str = ""):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def read(self, name: str) -> Optional[bytes]:
+        from botocore.exceptions import ClientError
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=self.prefix + name)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+            raise
+        return obj["Body"].read()
+
+    def write(self, name: str, data: bytes) -> None:
+        self.s3.put_object(Bucket=self.bucket, Key=self.prefix + name, Body=data)
+
+    def delete(self, name: str) -> None:
+        self.s3.delete_object(Bucket=self.bucket, Key=self.prefix + name)
+
+    def rename(self, old: str, new: str) -> None:
+        # S3 has no rename: copy, then delete the original
+        self.s3.copy_object(Bucket=self.bucket, Key=self.prefix + new,
+                            CopySource={"Bucket": self.bucket, "Key": self.prefix + old})
+        self.delete(old)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Content-Encoding helpers shared by the HTTP sync client (task.py) and
+sync_server.py for /api/db bodies.
+
+gzip is always available; zstd is used when the optional `zstandard`
+package is installed (it is faster and compresses SQLite pages better).
+Encodings are listed in preference order.
+
+Usage patterns:
+    from sync_codec import accept_encoding, choose_encoding, compress, decompress
+
+    headers["Accept-Encoding"] = accept_encoding()          # client request
+    enc = choose_encoding(request.headers.get("Accept-Encoding"))  # server side
+    body = compress(data, enc)                              # enc may be None -> data as-is
+    data = decompress(body, response.headers.get("Content-Encoding"))
+
+    # Streaming (bounded memory): encode/decode a body piece by piece
+    c = compressor(enc)
+    for block in blocks:
+        out.write(c.compress(block))
+    out.write(c.flush())
+    reader = decoding_reader(body_file, enc)    # reader.read(n) returns <= n bytes
+"""
+
+import gzip
+import zlib
+from typing import Optional
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_zstd = None
+
+
+def load_zstd():
+    """zstandard module, imported on first use; None if it isn't installed."""
+    global _zstd
+    if _zstd is None:
+        try:
+            import zstandard
+            _zstd = zstandard
+        except ImportError:
+            _zstd = False
+    return _zstd or None
+
+
+def supported_encodings() -> list[str]:
+    """Encodings this process can read and write, most preferred first."""
+    return (["zstd"] if load_zstd() else []) + ["gzip"]
+
+
+def accept_encoding() -> str:
+    return ", ".join(supported_encodings())
+
+
+def parse_encodings(header: Optional[str]) -> list[str]:
+    """Codings listed in an Accept-Encoding header, in order, skipping q=0."""
+    codings = []
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name or name == "identity":
+            continue
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        codings.append(name)
+    return codings
+
+
+def choose_encoding(header: Optional[str]) -> Optional[str]:
+    """Best encoding both sides support for the given Accept-Encoding header, or None."""
+    offered = parse_encodings(header)
+    for enc in supported_encodings():
+        if enc in offered:
+            return enc
+    return None
+
+
+def compress(data: bytes, encoding: Optional[str]) -> bytes:
+    if not encoding:
+        return data
+    if encoding == "zstd" and load_zstd():
+        return _zstd.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    c = compressor(encoding)
+    return c.compress(data) + c.flush()
+
+
+def compressor(encoding: str):
+    """Incremental encoder with compress(chunk) -> bytes and flush() -> bytes."""
+    if encoding == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    if encoding == "zstd" and load_zstd():
+        return _zstd.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+def decoding_reader(fileobj, encoding: Optional[str]):
+    """
+    File-like reader of fileobj's decoded bytes; read(n) returns at most n,
+    so a small encoded body can't expand into a large buffer.
+    Raises ValueError for unknown codings.
+    """
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("", "identity"):
+        return fileobj
+    if encoding == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if encoding == "zstd" and load_zstd():
+        return _zstd.ZstdDecompressor().stream_reader(fileobj)
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+def decompressor(encoding: Optional[str]):
+    """
+    Incremental decoder with decompress(chunk) -> bytes and flush() -> bytes,
+    for reading an encoded body in pieces. Raises ValueError for unknown codings.
+    """
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("", "identity"):
+        return _Identity()
+    if encoding == "gzip":
+        return zlib.decompressobj(31)
+    if encoding == "zstd" and load_zstd():
+        return _zstd.ZstdDecompressor().decompressobj()
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+def decompress(data: bytes, encoding: Optional[str]) -> bytes:
+    d = decompressor(encoding)
+    return d.decompress(data) + d.flush()
+
+
+class _Identity:
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
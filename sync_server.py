@@ -1,158 +1,713 @@
-import argparse
-import hashlib
-import json
-import os
-from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from urllib.parse import urlparse, parse_qs
-
-# Centralized logging
-import sys
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from logging_config import get_logger
-logger = get_logger(__name__)
-
-
-def sha256_bytes(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
-
-
-def ensure_dir(p: str) -> None:
-    os.makedirs(p, exist_ok=True)
-
-
-class SyncServer:
-    def __init__(self, storage_dir: str, token: str):
-        self.storage_dir = storage_dir
-        self.token = token or ""
-        ensure_dir(self.storage_dir)
-
-    def user_db_path(self, user: str) -> str:
-        safe = "".join(ch for ch in user if ch.isalnum() or ch in ("-", "_")) or "default"
-        return os.path.join(self.storage_dir, f"{safe}.db")
-
-    def user_meta_path(self, user: str) -> str:
-        safe = "".join(ch for ch in user if ch.isalnum() or ch in ("-", "_")) or "default"
-        return os.path.join(self.storage_dir, f"{safe}.meta.json")
-
-    def get_meta(self, user: str) -> dict:
-        db_path = self.user_db_path(user)
-        if not os.path.exists(db_path):
-            return {"exists": False}
-        st = os.stat(db_path)
-        with open(db_path, "rb") as f:
-            data = f.read()
-        return {
-            "exists": True,
-            "size": st.st_size,
-            "mtime": st.st_mtime,
-            "sha256": sha256_bytes(data),
-        }
-
-    def save_db(self, user: str, data: bytes) -> dict:
-        db_path = self.user_db_path(user)
-        tmp = db_path + ".tmp"
-        with open(tmp, "wb") as f:
-            f.write(data)
-        os.replace(tmp, db_path)
-        meta = self.get_meta(user)
-        with open(self.user_meta_path(user), "w", encoding="utf-8") as f:
-            json.dump(meta, f, indent=2)
-        return meta
-
-
-def make_handler(server_state: SyncServer):
-    class Handler(BaseHTTPRequestHandler):
-        def _send_json(self, obj: dict, code: int = 200):
-            data = json.dumps(obj).encode("utf-8")
-            self.send_response(code)
-            self.send_header("Content-Type", "application/json; charset=utf-8")
-            self.send_header("Content-Length", str(len(data)))
-            self.end_headers()
-            self.wfile.write(data)
-
-        def _send_bytes(self, data: bytes, code: int = 200):
-            self.send_response(code)
-            self.send_header("Content-Type", "application/octet-stream")
-            self.send_header("Content-Length", str(len(data)))
-            self.end_headers()
-            self.wfile.write(data)
-
-        def _auth_ok(self) -> bool:
-            if not server_state.token:
-                return True
-            token = self.headers.get("X-Token", "")
-            return token == server_state.token
-
-        def do_GET(self):
-            parsed = urlparse(self.path)
-            qs = parse_qs(parsed.query)
-            user = (qs.get("user", ["default"])[0] or "default").strip()
-
-            if parsed.path == "/api/ping":
-                return self._send_json({"ok": True})
-
-            if parsed.path == "/api/meta":
-                if not self._auth_ok():
-                    return self._send_json({"ok": False, "error": "unauthorized"}, 401)
-                meta = server_state.get_meta(user)
-                meta["ok"] = True
-                return self._send_json(meta)
-
-            if parsed.path == "/api/db":
-                if not self._auth_ok():
-                    return self._send_json({"ok": False, "error": "unauthorized"}, 401)
-                db_path = server_state.user_db_path(user)
-                if not os.path.exists(db_path):
-                    return self._send_json({"ok": False, "error": "not_found"}, 404)
-                with open(db_path, "rb") as f:
-                    return self._send_bytes(f.read(), 200)
-
-            return self._send_json({"ok": False, "error": "not_found"}, 404)
-
-        def do_POST(self):
-            parsed = urlparse(self.path)
-            qs = parse_qs(parsed.query)
-            user = (qs.get("user", ["default"])[0] or "default").strip()
-
-            if parsed.path != "/api/db":
-                return self._send_json({"ok": False, "error": "not_found"}, 404)
-            if not self._auth_ok():
-                return self._send_json({"ok": False, "error": "unauthorized"}, 401)
-
-            length = int(self.headers.get("Content-Length", "0") or "0")
-            if length <= 0:
-                return self._send_json({"ok": False, "error": "empty_body"}, 400)
-            data = self.rfile.read(length)
-
-            meta = server_state.save_db(user, data)
-            meta["ok"] = True
-            return self._send_json(meta, 200)
-
-        def log_message(self, format, *args):
-            # quiet
-            return
-
-    return Handler
-
-
-def main():
-    ap = argparse.ArgumentParser(description="DailyDashboard DB Sync Server")
-    ap.add_argument("--host", default="0.0.0.0")
-    ap.add_argument("--port", type=int, default=8765)
-    ap.add_argument("--storage", default="sync_storage", help="Folder to store per-user DB files")
-    ap.add_argument("--token", default="", help="Shared token; if empty, auth is disabled")
-    args = ap.parse_args()
-
-    state = SyncServer(storage_dir=args.storage, token=args.token)
-    handler = make_handler(state)
-    httpd = ThreadingHTTPServer((args.host, args.port), handler)
-    print(f"Sync server running on http://{args.host}:{args.port}")
-    print(f"Storage: {os.path.abspath(args.storage)}")
-    print("Endpoints: GET /api/ping | GET /api/meta?user=... | GET/POST /api/db?user=...")
-    httpd.serve_forever()
-
-
-if __name__ == "__main__":
-    main()
-
-
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import http.client
+import io
+import json
+import os
+import signal
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from typing import Iterable, Iterator, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Centralized logging
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from logging_config import get_logger
+from taskmask_db import (TaskmaskDB, migrate, changes_since, apply_changes, sync_changelog_version,
+                         sync_epoch, new_sync_epoch)
+from sync_codec import accept_encoding, choose_encoding, compress, compressor, decoding_reader
+logger = get_logger(__name__)
+
+# Upper bound for ?limit= on /api/pull
+MAX_PULL_LIMIT = 2000
+# Responses smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+# Seconds an idle keep-alive connection is held open
+KEEPALIVE_TIMEOUT = 120
+# Buffer size for streamed request/response bodies; memory per request stays
+# around this, whatever the database size
+STREAM_CHUNK = 64 * 1024
+# Largest decoded /api/push body (parsed as JSON in memory)
+MAX_JSON_BODY = 32 * 1024 * 1024
+# Bumped when the .meta.json layout or its invalidation rules change
+META_FORMAT = 1
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_path(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def migrate_changed(db: TaskmaskDB) -> bool:
+    """migrate(db); True if it rewrote the file (schema upgrade)."""
+    before = db.query_one("PRAGMA user_version")[0]
+    return migrate(db) != before
+
+
+def ensure_dir(p: str) -> None:
+    os.makedirs(p, exist_ok=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+class BodyReader:
+    """File-like view of exactly `length` request-body bytes of rfile."""
+
+    def __init__(self, rfile, length: int):
+        self.rfile = rfile
+        self.remaining = length
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.rfile.read(size)
+        if not data:
+            raise ConnectionError("request body ended early")
+        self.remaining -= len(data)
+        return data
+
+
+class SyncServer:
+    def __init__(self, storage_dir: str, token: str):
+        self.storage_dir = storage_dir
+        self.token = token or ""
+        ensure_dir(self.storage_dir)
+        # One open connection per user DB, used by the row-level endpoints
+        self._dbs: dict[str, TaskmaskDB] = {}
+        self._dbs_lock = threading.Lock()
+        # Per-user: a push's epoch check + apply, a pull's changes + epoch and
+        # save_db's file swap never interleave (in either server mode)
+        self._user_locks: dict[str, threading.Lock] = {}
+        # Serializes .meta.json rebuilds against uploads/invalidations
+        self._meta_lock = threading.RLock()
+
+    def user_db_path(self, user: str) -> str:
+        safe = "".join(ch for ch in user if ch.isalnum() or ch in ("-", "_")) or "default"
+        return os.path.join(self.storage_dir, f"{safe}.db")
+
+    def user_meta_path(self, user: str) -> str:
+        safe = "".join(ch for ch in user if ch.isalnum() or ch in ("-", "_")) or "default"
+        return os.path.join(self.storage_dir, f"{safe}.meta.json")
+
+    def user_lock(self, user: str) -> threading.Lock:
+        key = self.user_db_path(user)
+        with self._dbs_lock:
+            lock = self._user_locks.get(key)
+            if lock is None:
+                lock = self._user_locks[key] = threading.Lock()
+            return lock
+
+    def user_db(self, user: str) -> TaskmaskDB:
+        """Open (creating/migrating if needed) the user's DB for row-level sync."""
+        db_path = self.user_db_path(user)
+        with self._dbs_lock:
+            db = self._dbs.get(db_path)
+            opened = db is None
+            if opened:
+                db = TaskmaskDB(db_path)
+                self._dbs[db_path] = db
+        if opened:
+            changed = migrate_changed(db)
+            if not sync_epoch(db):  # stored by an older server
+                new_sync_epoch(db)
+                changed = True
+            if changed:
+                self.invalidate_meta(user)
+        return db
+
+    def checkpoint(self, user: str) -> None:
+        """Fold row-level writes (WAL) into the .db file before it is read whole."""
+        with self._dbs_lock:
+            db = self._dbs.get(self.user_db_path(user))
+        if db is not None:
+            db.checkpoint()
+
+    def close(self) -> None:
+        """Checkpoint and close the row-level connections (at shutdown)."""
+        with self._dbs_lock:
+            dbs = list(self._dbs.values())
+            self._dbs.clear()
+        for db in dbs:
+            db.close()
+
+    def push_changes(self, user: str, client: str, changes: list, epoch: str = "") -> Optional[dict]:
+        """
+        Apply a client's changes. Returns None, applying nothing, if the client
+        names an epoch other than the current one (the file was replaced since
+        its last sync).
+        """
+        with self.user_lock(user):
+            db = self.user_db(user)
+            current = sync_epoch(db)
+            if epoch and epoch != current:
+                return None
+            applied = apply_changes(db, changes, origin=client)
+            if applied:
+                self.invalidate_meta(user)
+            return {"applied": applied, "cursor": sync_changelog_version(db), "epoch": current}
+
+    def pull_changes(self, user: str, client: str, since: int, limit: int) -> dict:
+        with self.user_lock(user):
+            db = self.user_db(user)
+            changes, cursor, more = changes_since(db, since, exclude_origin=client, limit=limit)
+            return {"changes": changes, "cursor": cursor, "more": more, "epoch": sync_epoch(db)}
+
+    # .meta.json is the authoritative size/mtime/sha256 of the user's .db. It is
+    # written at upload time and dropped whenever the server itself changes the
+    # file (row-level push, migration); the next get_meta rebuilds it once.
+
+    def read_meta(self, user: str) -> Optional[dict]:
+        try:
+            with open(self.user_meta_path(user), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Older servers wrote .meta.json without "format" and never refreshed it after pushes
+        if not isinstance(meta, dict) or meta.get("format") != META_FORMAT:
+            return None
+        return meta
+
+    def write_meta(self, user: str, meta: dict) -> None:
+        path = self.user_meta_path(user)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, path)
+
+    def invalidate_meta(self, user: str) -> None:
+        with self._meta_lock:
+            try:
+                os.remove(self.user_meta_path(user))
+            except FileNotFoundError:
+                pass
+
+    def get_meta(self, user: str) -> dict:
+        meta = self.read_meta(user)
+        if meta is not None:
+            return meta
+        with self._meta_lock:
+            meta = self.read_meta(user)  # rebuilt by another request meanwhile?
+            if meta is not None:
+                return meta
+            db_path = self.user_db_path(user)
+            if not os.path.exists(db_path):
+                return {"exists": False}
+            self.checkpoint(user)
+            st = os.stat(db_path)
+            meta = {
+                "format": META_FORMAT,
+                "exists": True,
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "sha256": sha256_path(db_path),
+            }
+            self.write_meta(user, meta)
+            return meta
+
+    def save_db(self, user: str, chunks: Iterable[bytes]) -> dict:
+        """
+        Store an uploaded DB from its body chunks. Before it is swapped in the
+        file is migrated and given a new changelog epoch: its versions have
+        nothing to do with the cursors row-level clients hold for the old file.
+        Raises ValueError for an empty body and sqlite3.DatabaseError if it is
+        not a database; on any error the current DB is left as it was.
+        """
+        db_path = self.user_db_path(user)
+        tmp = db_path + ".tmp"
+        size = 0
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            if not size:
+                raise ValueError("empty upload")
+            upload = TaskmaskDB(tmp)
+            try:
+                migrate(upload)
+                new_sync_epoch(upload)
+            finally:
+                upload.close()  # checkpoints, so tmp alone holds every page
+            sha256 = sha256_path(tmp)
+        except BaseException:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(tmp + suffix)
+                except FileNotFoundError:
+                    pass
+            raise
+        with self.user_lock(user), self._meta_lock:
+            with self._dbs_lock:
+                db = self._dbs.get(db_path)
+            if db is not None:
+                db.replace_file(tmp)  # closes the open connection first
+            else:
+                os.replace(tmp, db_path)
+            st = os.stat(db_path)
+            meta = {
+                "format": META_FORMAT,
+                "exists": True,
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "sha256": sha256,
+            }
+            self.write_meta(user, meta)
+            return dict(meta)
+
+
+JSON_TYPE = "application/json; charset=utf-8"
+
+
+class Reply:
+    """
+    Result of handle_request(), written out by either front end (threaded or
+    asyncio): a body, a file to stream (path), a 304, or nothing (drop: the
+    client went away mid-request).
+    """
+
+    def __init__(self, code: int = 200, body: bytes = b"", content_type: str = JSON_TYPE,
+                 encoding: Optional[str] = None, etag: str = "", path: str = "",
+                 close: bool = False, drop: bool = False):
+        self.code = code
+        self.body = body
+        self.content_type = content_type
+        self.encoding = encoding
+        self.etag = etag
+        self.path = path
+        # After an error the request body may be unread; don't parse it as the next request
+        self.close = close or drop or code >= 400
+        self.drop = drop
+
+
+def json_reply(headers, obj: dict, code: int = 200, etag: str = "") -> Reply:
+    data = json.dumps(obj).encode("utf-8")
+    encoding = choose_encoding(headers.get("Accept-Encoding")) if len(data) >= MIN_COMPRESS_BYTES else None
+    if encoding:
+        data = compress(data, encoding)
+    return Reply(code, data, encoding=encoding, etag=etag)
+
+
+def error_reply(headers, code: int, error: str) -> Reply:
+    return json_reply(headers, {"ok": False, "error": error}, code)
+
+
+def reply_headers(reply: Reply, length: Optional[int]) -> list[tuple[str, str]]:
+    """Response headers for reply; length None means a chunked body follows."""
+    if reply.code == 304:
+        return [("ETag", reply.etag), ("Vary", "Accept-Encoding")]
+    headers = [("Content-Type", reply.content_type)]
+    if length is None:
+        headers.append(("Transfer-Encoding", "chunked"))
+    else:
+        headers.append(("Content-Length", str(length)))
+    if reply.encoding:
+        headers.append(("Content-Encoding", reply.encoding))
+    if reply.etag:
+        headers.append(("ETag", reply.etag))
+    headers.append(("Vary", "Accept-Encoding"))
+    # Advertise request codings we can decode (RFC 7694)
+    headers.append(("Accept-Encoding", accept_encoding()))
+    return headers
+
+
+def chunked_body(f, encoding: str) -> Iterator[bytes]:
+    """f's contents encoded with `encoding`, STREAM_CHUNK at a time, in HTTP/1.1 chunked framing."""
+    encoder = compressor(encoding)
+    for block in iter(lambda: f.read(STREAM_CHUNK), b""):
+        data = encoder.compress(block)
+        if data:
+            yield b"%x\r\n%s\r\n" % (len(data), data)
+    data = encoder.flush()
+    if data:
+        yield b"%x\r\n%s\r\n" % (len(data), data)
+    yield b"0\r\n\r\n"
+
+
+def request_user(qs: dict) -> str:
+    return (qs.get("user", ["default"])[0] or "default").strip()
+
+
+def handle_request(state: SyncServer, method: str, target: str, headers, rfile) -> Reply:
+    """
+    Route one request. headers is a case-insensitive mapping (http.client.HTTPMessage)
+    and rfile yields the request body. Blocking: the asyncio mode runs it in a worker thread.
+    """
+    parsed = urlparse(target)
+    qs = parse_qs(parsed.query)
+    user = request_user(qs)
+    path = parsed.path
+
+    if method == "GET" and path == "/api/ping":
+        return json_reply(headers, {"ok": True})
+    if not ((method == "GET" and path in ("/api/meta", "/api/db", "/api/pull"))
+            or (method == "POST" and path in ("/api/push", "/api/db"))):
+        return error_reply(headers, 404, "not_found")
+    if state.token and headers.get("X-Token", "") != state.token:
+        return error_reply(headers, 401, "unauthorized")
+
+    if method == "GET" and path == "/api/meta":
+        meta = state.get_meta(user)
+        meta["ok"] = True
+        etag = '"%s"' % sha256_bytes(json.dumps(meta, sort_keys=True).encode("utf-8"))[:32]
+        if etag_matches(headers.get("If-None-Match", ""), etag):
+            return Reply(304, etag=etag)
+        return json_reply(headers, meta, etag=etag)
+
+    if method == "GET" and path == "/api/db":
+        db_path = state.user_db_path(user)
+        if not os.path.exists(db_path):
+            return error_reply(headers, 404, "not_found")
+        # ETag is the file's sha256, so a client can revalidate with its own hash
+        etag = '"%s"' % state.get_meta(user).get("sha256", "")
+        if etag_matches(headers.get("If-None-Match", ""), etag):
+            return Reply(304, etag=etag)
+        state.checkpoint(user)
+        size = os.path.getsize(db_path)
+        encoding = choose_encoding(headers.get("Accept-Encoding")) if size >= MIN_COMPRESS_BYTES else None
+        return Reply(200, content_type="application/octet-stream", encoding=encoding, etag=etag, path=db_path)
+
+    if method == "GET":  # /api/pull
+        client = (qs.get("client", [""])[0] or "").strip()
+        try:
+            since = int(qs.get("since", ["0"])[0] or 0)
+            limit = min(max(int(qs.get("limit", ["500"])[0] or 500), 1), MAX_PULL_LIMIT)
+        except ValueError:
+            return error_reply(headers, 400, "bad_request")
+        if not client:
+            return error_reply(headers, 400, "missing_client")
+        result = state.pull_changes(user, client, since, limit)
+        result["ok"] = True
+        return json_reply(headers, result)
+
+    raw = BodyReader(rfile, int(headers.get("Content-Length", "0") or "0"))
+    try:
+        reader = decoding_reader(raw, headers.get("Content-Encoding"))
+    except ValueError:
+        return error_reply(headers, 415, "bad_encoding")
+
+    if path == "/api/push":
+        parts, total = [], 0
+        try:
+            for block in iter(lambda: reader.read(STREAM_CHUNK), b""):
+                total += len(block)
+                if total > MAX_JSON_BODY:
+                    return error_reply(headers, 413, "too_large")
+                parts.append(block)
+            data = b"".join(parts)
+            body = json.loads(data.decode("utf-8")) if data else {}
+        except ConnectionError:
+            return Reply(drop=True)
+        except Exception:
+            return error_reply(headers, 400, "bad_json")
+        client = str(body.get("client") or "").strip() if isinstance(body, dict) else ""
+        changes = body.get("changes") if isinstance(body, dict) else None
+        epoch = body.get("epoch") if isinstance(body, dict) else None
+        if not client or not isinstance(changes, list) or not isinstance(epoch, (str, type(None))):
+            return error_reply(headers, 400, "bad_request")
+        result = state.push_changes(user, client, changes, epoch or "")
+        if result is None:
+            return error_reply(headers, 409, "epoch_changed")
+        result["ok"] = True
+        return json_reply(headers, result)
+
+    try:  # POST /api/db
+        meta = state.save_db(user, iter(lambda: reader.read(STREAM_CHUNK), b""))
+    except ConnectionError:
+        return Reply(drop=True)  # client went away mid-upload; nothing was saved
+    except ValueError:
+        return error_reply(headers, 400, "empty_body")
+    except sqlite3.DatabaseError:
+        return error_reply(headers, 400, "not_a_database")
+    except Exception:
+        return error_reply(headers, 400, "bad_body")
+    meta["ok"] = True
+    reply = json_reply(headers, meta)
+    reply.close = bool(raw.remaining)  # trailing bytes after the encoded stream
+    return reply
+
+
+def make_handler(server_state: SyncServer):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive: every response carries Content-Length or is chunked
+        protocol_version = "HTTP/1.1"
+        timeout = KEEPALIVE_TIMEOUT
+
+        def _respond(self, method: str):
+            reply = handle_request(server_state, method, self.path, self.headers, self.rfile)
+            if reply.close:
+                self.close_connection = True
+            if reply.drop:
+                return
+            if not reply.path:
+                self._start(reply, len(reply.body))
+                self.wfile.write(reply.body)
+                return
+            with open(reply.path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if not reply.encoding:
+                    # Zero-copy: socket.sendfile() uses os.sendfile where the platform has it
+                    self._start(reply, size)
+                    self.connection.sendfile(f, 0, size)
+                    return
+                self._start(reply, None)
+                for chunk in chunked_body(f, reply.encoding):
+                    self.wfile.write(chunk)
+
+        def _start(self, reply: Reply, length: Optional[int]):
+            self.send_response(reply.code)
+            for name, value in reply_headers(reply, length):
+                self.send_header(name, value)
+            self.end_headers()
+
+        def do_GET(self):
+            self._respond("GET")
+
+        def do_POST(self):
+            self._respond("POST")
+
+        def log_message(self, format, *args):
+            # quiet
+            return
+
+    return Handler
+
+
+# ----------- ASYNCIO MODE -----------
+# --mode asyncio: one event loop holds every connection, so thousands of idle
+# keep-alive clients cost a socket each instead of a thread each. Blocking
+# work (handle_request: SQLite, hashing, file writes) runs in a bounded thread
+# pool, and uploads/pushes for the same user are serialized by an asyncio.Lock.
+
+DEFAULT_MAX_CONNECTIONS = 2000
+DEFAULT_WORKERS = 32
+# Request line + headers larger than this get 431
+MAX_HEADER_BYTES = 64 * 1024
+# Seconds in-flight requests get to finish on SIGINT/SIGTERM
+SHUTDOWN_GRACE_SEC = 10
+
+
+class LoopStream:
+    """Blocking read(n) over an asyncio.StreamReader, for handle_request() in a worker thread."""
+
+    def __init__(self, reader: asyncio.StreamReader, loop: asyncio.AbstractEventLoop):
+        self.reader = reader
+        self.loop = loop
+
+    def read(self, size: int = -1) -> bytes:
+        future = asyncio.run_coroutine_threadsafe(self.reader.read(size if size > 0 else STREAM_CHUNK), self.loop)
+        try:
+            return future.result(KEEPALIVE_TIMEOUT)
+        except TimeoutError:
+            future.cancel()
+            raise ConnectionError("request body stalled")
+
+
+class AsyncSyncServer:
+    def __init__(self, state: SyncServer, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 workers: int = DEFAULT_WORKERS):
+        self.state = state
+        self.max_connections = max_connections
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync-worker")
+        self._user_locks: dict[str, asyncio.Lock] = {}
+        self._connections: set[asyncio.StreamWriter] = set()
+        self._idle: set[asyncio.StreamWriter] = set()  # waiting for their next request
+        self._closing = False
+
+    def user_lock(self, user: str) -> asyncio.Lock:
+        key = self.state.user_db_path(user)
+        lock = self._user_locks.get(key)
+        if lock is None:
+            lock = self._user_locks[key] = asyncio.Lock()
+        return lock
+
+    async def serve(self, host: str, port: int) -> None:
+        """Serve until SIGINT/SIGTERM, then shut down gracefully."""
+        loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self._client, host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+        try:
+            await stop.wait()
+        finally:
+            await self.shutdown(server)
+
+    async def shutdown(self, server: asyncio.AbstractServer) -> None:
+        """Stop accepting, close idle keep-alive connections, let in-flight requests finish."""
+        loop = asyncio.get_running_loop()
+        self._closing = True
+        server.close()
+        for writer in list(self._idle):
+            writer.close()
+        deadline = loop.time() + SHUTDOWN_GRACE_SEC
+        while self._connections and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        for writer in list(self._connections):
+            writer.close()
+        await server.wait_closed()
+        self.pool.shutdown(wait=True)
+        self.state.close()
+        logger.info("Sync server stopped")
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self._closing or len(self._connections) >= self.max_connections:
+            # Refuse at once rather than queueing unbounded work
+            await self._write(writer, error_reply({}, 503, "busy"), keep_alive=False,
+                              extra=[("Retry-After", "5")])
+            writer.close()
+            return
+        self._connections.add(writer)
+        try:
+            while not self._closing:
+                self._idle.add(writer)
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, error_reply({}, 431, "headers_too_large"), keep_alive=False)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                finally:
+                    self._idle.discard(writer)
+                if not await self._request(head, reader, writer):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _request(self, head: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Handle one request; returns whether the connection stays open."""
+        request_line, _, header_block = head.partition(b"\r\n")
+        try:
+            method, target, version = request_line.decode("latin-1").split(" ")
+        except ValueError:
+            return await self._write(writer, error_reply({}, 400, "bad_request"), keep_alive=False)
+        headers = http.client.parse_headers(io.BytesIO(header_block))
+        connection = (headers.get("Connection") or "").lower()
+        keep_alive = ("close" not in connection) if version == "HTTP/1.1" else ("keep-alive" in connection)
+        if method not in ("GET", "POST"):
+            return await self._write(writer, error_reply(headers, 501, "not_implemented"), keep_alive=False)
+        if headers.get("Transfer-Encoding"):
+            return await self._write(writer, error_reply(headers, 411, "length_required"), keep_alive=False)
+
+        loop = asyncio.get_running_loop()
+        if method == "GET" and urlparse(target).path == "/api/ping":
+            reply = handle_request(self.state, method, target, headers, None)  # no I/O; stay on the loop
+        else:
+            user = request_user(parse_qs(urlparse(target).query))
+            try:
+                async with (self.user_lock(user) if method == "POST" else contextlib.nullcontext()):
+                    reply = await loop.run_in_executor(self.pool, handle_request, self.state, method,
+                                                       target, headers, LoopStream(reader, loop))
+            except Exception:
+                logger.exception("Request failed: %s %s", method, target)
+                reply = error_reply(headers, 500, "internal_error")
+        return await self._write(writer, reply, keep_alive)
+
+    async def _write(self, writer: asyncio.StreamWriter, reply: Reply, keep_alive: bool,
+                     extra: Iterable[tuple[str, str]] = ()) -> bool:
+        """Send reply; returns whether the connection stays open."""
+        keep_alive = keep_alive and not reply.close and not self._closing
+        if reply.drop:
+            return False
+        loop = asyncio.get_running_loop()
+        f = open(reply.path, "rb") if reply.path else None
+        try:
+            if f is None:
+                length = None if reply.code == 304 else len(reply.body)
+            else:
+                length = None if reply.encoding else os.fstat(f.fileno()).st_size
+            lines = [f"HTTP/1.1 {reply.code} {HTTPStatus(reply.code).phrase}",
+                     f"Date: {formatdate(usegmt=True)}"]
+            lines += [f"{name}: {value}" for name, value in [*reply_headers(reply, length), *extra]]
+            if not keep_alive:
+                lines.append("Connection: close")
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+            if f is None:
+                writer.write(reply.body)
+                await writer.drain()
+            elif not reply.encoding:
+                await writer.drain()
+                await loop.sendfile(writer.transport, f, 0, length)  # os.sendfile when available
+            else:
+                chunks = chunked_body(f, reply.encoding)
+                while (chunk := await loop.run_in_executor(self.pool, next, chunks, None)) is not None:
+                    writer.write(chunk)
+                    await writer.drain()
+        finally:
+            if f is not None:
+                f.close()
+        return keep_alive
+
+
+def main():
+    ap = argparse.ArgumentParser(description="DailyDashboard DB Sync Server")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--storage", default="sync_storage", help="Folder to store per-user DB files")
+    ap.add_argument("--token", default="", help="Shared token; if empty, auth is disabled")
+    ap.add_argument("--mode", choices=("threaded", "asyncio"), default="threaded",
+                    help="threaded: one thread per connection; asyncio: one event loop for many clients")
+    ap.add_argument("--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS,
+                    help="asyncio mode: open connections beyond this get 503")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                    help="asyncio mode: threads for database/file work")
+    args = ap.parse_args()
+
+    state = SyncServer(storage_dir=args.storage, token=args.token)
+    print(f"Sync server ({args.mode}) running on http://{args.host}:{args.port}")
+    print(f"Storage: {os.path.abspath(args.storage)}")
+    print("Endpoints: GET /api/ping | GET /api/meta?user=... | GET/POST /api/db?user=... | "
+          "POST /api/push?user=... | GET /api/pull?user=...&client=...&since=N")
+    if args.mode == "asyncio":
+        server = AsyncSyncServer(state, max_connections=args.max_connections, workers=args.workers)
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    handler = make_handler(state)
+    httpd = ThreadingHTTPServer((args.host, args.port), handler)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        state.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,98 @@
+import sys
+import time
+from contextlib import contextmanager
+
+# ----------- STARTUP PROFILING (--profile-startup) -----------
+# Records how long each import issued by this module takes, init_db, and the
+# time until the window is first painted; printed once hydration is done.
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+_startup_t0 = time.perf_counter()
+startup_timings: list[tuple[str, float]] = []  # (label, seconds)
+
+if PROFILE_STARTUP:
+    import builtins
+    _builtin_import = builtins.__import__
+
+    def _profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+        # Only time first-time imports made directly by task.py
+        if level or name in sys.modules or (globals or {}).get("__name__") != __name__:
+            return _builtin_import(name, globals, locals, fromlist, level)
+        start = time.perf_counter()
+        try:
+            return _builtin_import(name, globals, locals, fromlist, level)
+        finally:
+            startup_timings.append((f"import {name}", time.perf_counter() - start))
+
+    builtins.__import__ = _profiled_import
+
+@contextmanager
+def startup_phase(label: str):
+    """with startup_phase("init_db"): ...  - recorded only under --profile-startup."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if PROFILE_STARTUP:
+            startup_timings.append((label, time.perf_counter() - start))
+
+def report_startup_profile():
+    if not PROFILE_STARTUP:
+        return
+    builtins.__import__ = _builtin_import
+    print("Startup profile (ms):")
+    for label, seconds in startup_timings:
+        print(f"  {seconds * 1000:9.1f}  {label}")
+    print(f"  {(time.perf_counter() - _startup_t0) * 1000:9.1f}  total until hydrated")
+
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk, simpledialog
-import webbrowser, sqlite3, time
-from datetime import datetime, timedelta
-import pytz, os
-import sys
+import webbrowser
+from datetime import datetime, timedelta, timezone
+import os
+import io
 import json
 import re
 import shutil
 from pathlib import Path
-import urllib.request
-import urllib.parse
 import hashlib
 import uuid
 import subprocess  # For MP3 playback
-from playsound import playsound
 import threading
-import ftplib
-from urllib.parse import urlparse
-try:
-    import boto3
-    from botocore.exceptions import ClientError, NoCredentialsError
-    S3_AVAILABLE = True
-except ImportError:
-    S3_AVAILABLE = False
+import queue
+import heapq
+import itertools
+from collections import OrderedDict
+from taskmask_db import (
+    TaskmaskDB, WriteBehind, migrate, search_items,
+    archivable_todos, archive_todo_rows, page_archive, ARCHIVE_BATCH_SIZE, ARCHIVE_PAGE_SIZE,
+    ORDER_GAP, order_key_between, is_strictly_increasing, plan_order_keys, rebalance_table_order,
+    run_maintenance, new_row_uuid,
+    changes_since, apply_changes, get_sync_state, set_sync_state,
+    SYNC_REMOTE_ORIGIN, SyncEpochChanged,
+)
+from sync_codec import accept_encoding, compress, decompress, parse_encodings, supported_encodings
+from block_sync import (
+    FtpChunkStore, S3ChunkStore, build_manifest, read_manifest, push_file, pull_file, retire_legacy,
+)
+
+# Optional / heavy modules (boto3, playsound, pytz, ftplib, urllib.request)
+# are imported on first use inside the feature that needs them.
+_boto3 = None
+
+def load_boto3():
+    """boto3 module, imported on first S3 use; None if it isn't installed."""
+    global _boto3
+    if _boto3 is None:
+        try:
+            import boto3
+            _boto3 = boto3
+        except ImportError:
+            _boto3 = False
+    return _boto3 or None
+
+def playsound(sound_file: str, block: bool = True):
+    from playsound import playsound as _playsound
+    return _playsound(sound_file, block=block)
 
 # Windows-only sound module (not available on Linux/Mac)
 try:
@@ -45,6 +115,8 @@ DEFAULT_SETTINGS = {
     "sync_user": "default",
     "sync_token": "",
     "sync_interval_sec": 60,
+    # Identifies this install to the row-level HTTP sync (generated on first use)
+    "sync_client_id": "",
     # Conflict policy is now hard‑wired to "prefer newest copy" in code so that
     # the most recently modified DB (local or server) always wins.
     # This key is kept only for backwards‑compatibility with older configs.
@@ -61,6 +133,8 @@ DEFAULT_SETTINGS = {
     "sync_s3_region": "us-east-1",
     "sync_s3_access_key": "",
     "sync_s3_secret_key": "",
+    # Completed tasks older than this move to archive_todos in the background
+    "archive_after_hours": 12,
 }
 
 def load_settings() -> dict:
@@ -97,32 +171,202 @@ def sha256_file(path: str) -> str:
             h.update(chunk)
     return h.hexdigest()
 
+# (path, compute) -> ((st_ino, st_size, st_mtime_ns), result), so an unchanged
+# DB costs one stat() per sync tick instead of a full read + hash.
+_digest_cache: dict = {}
+# Files modified more recently than this aren't cached: a second write within
+# the same mtime tick could change the content without changing the key.
+DIGEST_SETTLE_SEC = 2.0
+
+def cached_digest(path: str, compute=sha256_file):
+    """compute(path) (sha256_file or build_manifest), reused while inode, size and mtime_ns are unchanged."""
+    st = os.stat(path)
+    key = (st.st_ino, st.st_size, st.st_mtime_ns)
+    hit = _digest_cache.get((path, compute))
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    result = compute(path)
+    if time.time() - st.st_mtime > DIGEST_SETTLE_SEC:
+        _digest_cache[(path, compute)] = (key, result)
+    return result
+
 def _join_url(base: str, path: str, query: dict) -> str:
+    import urllib.parse
     base = base.rstrip("/")
     url = f"{base}{path}"
     if query:
         url += "?" + urllib.parse.urlencode(query)
     return url
 
-def http_get_json(url: str, headers: dict | None = None, timeout: int = 10) -> dict:
-    req = urllib.request.Request(url, method="GET", headers=headers or {})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        data = resp.read().decode("utf-8")
-        return json.loads(data)
+# Sync HTTP connections are kept open (HTTP/1.1 keep-alive) and reused across
+# requests and sync ticks, one per (scheme, host:port).
+_http_conns: dict = {}
+_http_lock = threading.Lock()
+# Request Content-Encodings each server advertised via an Accept-Encoding response header
+_http_upload_encodings: dict = {}
 
-def http_download_bytes(url: str, headers: dict | None = None, timeout: int = 20) -> bytes:
-    req = urllib.request.Request(url, method="GET", headers=headers or {})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return resp.read()
+def http_request(method: str, url: str, body: bytes | None = None, headers: dict | None = None,
+                 timeout: int = 20) -> tuple[int, dict, bytes]:
+    """
+    One request on a kept-alive connection; a connection the server has
+    dropped since its last use is reopened once. The response body is
+    decoded per its Content-Encoding. Raises urllib.error.HTTPError on
+    4xx/5xx, like urlopen. Returns (status, headers, body).
+    """
+    import http.client
+    import urllib.error
+    import urllib.parse
+    parts = urllib.parse.urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    hdrs = {"Accept-Encoding": accept_encoding()}
+    hdrs.update(headers or {})
+    with _http_lock:
+        for attempt in (1, 2):
+            conn = _http_conns.get(key)
+            reused = conn is not None
+            if conn is None:
+                cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+                conn = _http_conns[key] = cls(parts.netloc, timeout=timeout)
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, target, body=body, headers=hdrs)
+                resp = conn.getresponse()
+                data = resp.read()
+            except Exception as e:
+                conn.close()
+                _http_conns.pop(key, None)
+                if reused and attempt == 1 and isinstance(e, ConnectionError):
+                    continue  # idle connection closed by the server; retry on a fresh one
+                raise
+            break
+        if resp.will_close:
+            conn.close()
+            _http_conns.pop(key, None)
+        advertised = resp.getheader("Accept-Encoding")
+        if advertised is not None:
+            _http_upload_encodings[key] = parse_encodings(advertised)
+    if resp.status >= 400:
+        raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(data))
+    return resp.status, resp.headers, decompress(data, resp.getheader("Content-Encoding"))
+
+def upload_encoding(url: str) -> str | None:
+    """Best request Content-Encoding the server at `url` has said it accepts (None = send as-is)."""
+    import urllib.parse
+    parts = urllib.parse.urlsplit(url)
+    accepted = _http_upload_encodings.get((parts.scheme, parts.netloc), ())
+    return next((enc for enc in supported_encodings() if enc in accepted), None)
+
+def close_http_connections():
+    """Close kept-alive sync connections (at exit; doesn't wait for a sync in progress)."""
+    for conn in list(_http_conns.values()):
+        conn.close()
+    _http_conns.clear()
+
+# url -> (ETag, parsed body) of the last conditional GET, replayed on 304
+_http_json_cache: dict = {}
+
+def http_get_json(url: str, headers: dict | None = None, timeout: int = 10, conditional: bool = False) -> dict:
+    """GET JSON. conditional=True sends If-None-Match from the last response and reuses it on 304."""
+    hdrs = dict(headers or {})
+    cached = _http_json_cache.get(url) if conditional else None
+    if cached is not None:
+        hdrs["If-None-Match"] = cached[0]
+    status, resp_headers, data = http_request("GET", url, headers=hdrs, timeout=timeout)
+    if status == 304 and cached is not None:
+        return dict(cached[1])
+    obj = json.loads(data.decode("utf-8"))
+    etag = resp_headers.get("ETag")
+    if conditional and etag:
+        _http_json_cache[url] = (etag, dict(obj))
+    return obj
+
+def http_download_bytes(url: str, headers: dict | None = None, timeout: int = 20, etag: str = "") -> bytes | None:
+    """GET a body; with etag set, returns None if the server answers 304 Not Modified."""
+    hdrs = dict(headers or {})
+    if etag:
+        hdrs["If-None-Match"] = etag
+    status, _, data = http_request("GET", url, headers=hdrs, timeout=timeout)
+    return None if status == 304 else data
 
 def http_post_bytes(url: str, body: bytes, headers: dict | None = None, timeout: int = 30) -> dict:
     hdrs = {"Content-Type": "application/octet-stream"}
     if headers:
         hdrs.update(headers)
-    req = urllib.request.Request(url, data=body, method="POST", headers=hdrs)
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        data = resp.read().decode("utf-8")
-        return json.loads(data) if data else {"ok": True}
+    encoding = upload_encoding(url)
+    if encoding:
+        body = compress(body, encoding)
+        hdrs["Content-Encoding"] = encoding
+    _, _, data = http_request("POST", url, body=body, headers=hdrs, timeout=timeout)
+    return json.loads(data.decode("utf-8")) if data else {"ok": True}
+
+def sync_blocks(store, name: str, label: str, legacy_mtime: float | None, fetch_legacy) -> str:
+    """
+    Block-level sync of DB_NAME against `store` (see block_sync.py): only
+    chunks whose hashes differ cross the network. legacy_mtime/fetch_legacy
+    describe the whole-file `name` that versions before block sync read and
+    write. The cut-over is one-way: that copy is pulled once if newer, then
+    moved aside to name + LEGACY_SUFFIX when the manifest is created. One
+    that reappears later (an older client uploading again) is moved aside
+    again without merging it, and the status message says so.
+    """
+    # Fold WAL into taskmask.db so mtime/hash/upload see every commit
+    db.checkpoint()
+    local = cached_digest(DB_NAME, build_manifest) if os.path.exists(DB_NAME) else None
+    remote = read_manifest(store, name)
+
+    if remote is None:
+        note = "uploaded (server was empty)"
+        if legacy_mtime is not None and (local is None or legacy_mtime > local["mtime"]):
+            tmp_remote = DB_NAME + ".remote.tmp"
+            fetch_legacy(tmp_remote)
+            if local is not None and sha256_file(tmp_remote) == local["sha256"]:
+                os.remove(tmp_remote)
+            else:
+                db.replace_file(tmp_remote)
+                init_db()
+                db.checkpoint()
+                note = "downloaded server DB"
+            local = build_manifest(DB_NAME)
+        elif legacy_mtime is not None:
+            note = "uploaded local DB"
+        if local is None:
+            return f"{label}: nothing to upload/download"
+        push_file(store, DB_NAME, name, local)
+        note += ", block index created"
+        if legacy_mtime is not None:
+            note += _retire_legacy_note(store, name, "old {name} moved to {backup}")
+        return f"{label}: {note}"
+
+    warning = ""
+    if legacy_mtime is not None:
+        warning = _retire_legacy_note(
+            store, name, "{name} from a client without block sync moved to {backup}, update that client")
+
+    if local is not None and local["sha256"] == remote["sha256"]:
+        return f"{label}: up-to-date{warning}"
+
+    # Decide direction based purely on which copy is newer.
+    # - If local DB is newer (or same time), upload to server.
+    # - If server DB is newer, download from server.
+    total = len(remote["chunks"])
+    if local is None or local["mtime"] < remote["mtime"]:
+        tmp_remote = DB_NAME + ".remote.tmp"
+        count, nbytes = pull_file(store, name, remote, DB_NAME, tmp_remote)
+        db.replace_file(tmp_remote)
+        init_db()
+        return f"{label}: downloaded server DB ({count}/{total} chunks, {_format_mb(nbytes)}){warning}"
+    count, nbytes = push_file(store, DB_NAME, name, local, remote)
+    return f"{label}: uploaded local DB ({count}/{len(local['chunks'])} chunks, {_format_mb(nbytes)}){warning}"
+
+def _retire_legacy_note(store, name: str, message: str) -> str:
+    """retire_legacy() for sync_blocks; returns a status-message suffix. Failure doesn't stop the sync."""
+    try:
+        return "; " + message.format(name=name, backup=retire_legacy(store, name))
+    except Exception as e:
+        return f"; could not move the whole-file {name} aside: {e}"
 
 def sync_ftp() -> str:
     """FTP sync. Returns human message."""
@@ -138,84 +382,49 @@ def sync_ftp() -> str:
         return "FTP sync: missing host or username"
     
     remote_file = f"{remote_path}/taskmask.db"
-    local_exists = os.path.exists(DB_NAME)
-    local_mtime = os.path.getmtime(DB_NAME) if local_exists else 0
-    local_sha = sha256_file(DB_NAME) if local_exists else ""
     
     try:
+        import ftplib
         ftp = ftplib.FTP()
         ftp.connect(host, port, timeout=10)
         ftp.login(user, password)
         
-        # Check if remote file exists and get its mtime
-        server_exists = False
-        server_mtime = 0
-        server_sha = ""
+        # Whole-file copy from before block sync, if any, and its mtime
+        legacy_mtime = None
         try:
             size = ftp.size(remote_file)
             if size is not None and size > 0:
-                server_exists = True
+                legacy_mtime = time.time()
                 # Get modification time (MDTM may not be supported by all servers)
                 try:
                     mdtm = ftp.voidcmd(f"MDTM {remote_file}")
                     # MDTM response: "213 20250115120000"
                     if mdtm.startswith("213"):
                         time_str = mdtm.split()[1]
-                        server_mtime = datetime.strptime(time_str, "%Y%m%d%H%M%S").timestamp()
+                        legacy_mtime = datetime.strptime(time_str, "%Y%m%d%H%M%S").timestamp()
                 except:
-                    # If MDTM fails, use current time as fallback
-                    server_mtime = time.time()
+                    pass
         except:
             pass
         
-        # If server has nothing, upload local (if any)
-        if not server_exists:
-            if not local_exists:
-                ftp.quit()
-                return "FTP sync: nothing to upload/download"
-            with open(DB_NAME, "rb") as f:
-                ftp.storbinary(f"STOR {remote_file}", f)
-            ftp.quit()
-            return "FTP sync: uploaded (server was empty)"
-        
-        # Download remote file to compare
-        tmp_remote = DB_NAME + ".remote.tmp"
-        with open(tmp_remote, "wb") as f:
-            ftp.retrbinary(f"RETR {remote_file}", f.write)
-        server_sha = sha256_file(tmp_remote)
-        
-        # If identical, nothing to do
-        if local_exists and local_sha and server_sha and local_sha == server_sha:
-            os.remove(tmp_remote)
-            ftp.quit()
-            return "FTP sync: up-to-date"
-        
-        # Decide direction based purely on which copy is newer.
-        # - If local DB is newer (or same time), upload to server.
-        # - If server DB is newer, download from server.
-        direction = "upload" if local_mtime >= server_mtime else "download"
+        def fetch_legacy(tmp_path: str):
+            with open(tmp_path, "wb") as f:
+                ftp.retrbinary(f"RETR {remote_file}", f.write)
         
-        if direction == "download":
-            os.replace(tmp_remote, DB_NAME)
-            ftp.quit()
-            init_db()
-            return "FTP sync: downloaded server DB"
-        else:
-            os.remove(tmp_remote)
-            if not local_exists:
-                ftp.quit()
-                return "FTP sync: local DB missing"
-            with open(DB_NAME, "rb") as f:
-                ftp.storbinary(f"STOR {remote_file}", f)
+        try:
+            return sync_blocks(FtpChunkStore(ftp, remote_path), "taskmask.db", "FTP sync",
+                               legacy_mtime, fetch_legacy)
+        finally:
             ftp.quit()
-            return "FTP sync: uploaded local DB"
     except Exception as e:
         return f"FTP sync error: {e}"
 
 def sync_s3() -> str:
     """S3 sync. Returns human message."""
-    if not S3_AVAILABLE:
+    boto3 = load_boto3()
+    if boto3 is None:
         return "S3 sync: boto3 not installed. Run: pip install boto3"
+    from botocore.exceptions import ClientError, NoCredentialsError
     
     bucket = (settings.get("sync_s3_bucket") or "").strip()
     key = (settings.get("sync_s3_key") or "taskmask.db").strip()
@@ -228,10 +437,6 @@ def sync_s3() -> str:
     if not bucket or not access_key or not secret_key:
         return "S3 sync: missing bucket, access key, or secret key"
     
-    local_exists = os.path.exists(DB_NAME)
-    local_mtime = os.path.getmtime(DB_NAME) if local_exists else 0
-    local_sha = sha256_file(DB_NAME) if local_exists else ""
-    
     try:
         s3 = boto3.client(
             "s3",
@@ -240,57 +445,121 @@ def sync_s3() -> str:
             region_name=region
         )
         
-        # Check if remote file exists
-        server_exists = False
-        server_mtime = 0
-        server_sha = ""
+        # Whole-file object from before block sync, if any, and its mtime
+        legacy_mtime = None
         try:
             head = s3.head_object(Bucket=bucket, Key=key)
-            server_exists = True
-            server_mtime = head["LastModified"].timestamp()
+            legacy_mtime = head["LastModified"].timestamp()
         except ClientError as e:
             if e.response["Error"]["Code"] != "404":
                 raise
         
-        # If server has nothing, upload local (if any)
-        if not server_exists:
-            if not local_exists:
-                return "S3 sync: nothing to upload/download"
-            s3.upload_file(DB_NAME, bucket, key)
-            return "S3 sync: uploaded (server was empty)"
-        
-        # Download remote file to compare
-        tmp_remote = DB_NAME + ".remote.tmp"
-        s3.download_file(bucket, key, tmp_remote)
-        server_sha = sha256_file(tmp_remote)
-        
-        # If identical, nothing to do
-        if local_exists and local_sha and server_sha and local_sha == server_sha:
-            os.remove(tmp_remote)
-            return "S3 sync: up-to-date"
-        
-        # Decide direction based purely on which copy is newer.
-        # - If local DB is newer (or same time), upload to server.
-        # - If server DB is newer, download from server.
-        direction = "upload" if local_mtime >= server_mtime else "download"
-        
-        if direction == "download":
-            os.replace(tmp_remote, DB_NAME)
-            init_db()
-            return "S3 sync: downloaded server DB"
-        else:
-            os.remove(tmp_remote)
-            if not local_exists:
-                return "S3 sync: local DB missing"
-            s3.upload_file(DB_NAME, bucket, key)
-            return "S3 sync: uploaded local DB"
+        prefix, _, name = key.rpartition("/")
+        return sync_blocks(S3ChunkStore(s3, bucket, prefix), name, "S3 sync", legacy_mtime,
+                           lambda tmp_path: s3.download_file(bucket, key, tmp_path))
     except NoCredentialsError:
         return "S3 sync: invalid credentials"
     except Exception as e:
         return f"S3 sync error: {e}"
 
+def sync_client_id() -> str:
+    client_id = settings.get("sync_client_id") or ""
+    if not client_id:
+        client_id = settings["sync_client_id"] = new_row_uuid()
+        save_settings(settings)
+    return client_id
+
+def http_post_json(url: str, obj: dict, headers: dict | None = None, timeout: int = 30) -> dict:
+    hdrs = dict(headers or {})
+    hdrs["Content-Type"] = "application/json"
+    return http_post_bytes(url, json.dumps(obj, separators=(",", ":")).encode("utf-8"), headers=hdrs, timeout=timeout)
+
+def sync_http_delta(server: str, user: str, headers: dict) -> str | None:
+    """
+    Row-level sync: push local changelog entries since our push cursor, then
+    pull the server's since our pull cursor (see changes_since/apply_changes).
+    If the server's changelog epoch changed (its file was replaced by a
+    whole-file upload) both cursors are reset: everything is pulled first,
+    so the server's rows win, then every local change is pushed again.
+    Returns None if the server has no /api/push + /api/pull (older sync_server.py).
+    """
+    import urllib.error
+    client_id = sync_client_id()
+    # Cursors live in the DB file, keyed by install + account, so a copied file starts fresh
+    state_key = f"{client_id}@{server.rstrip('/')}/{user}"
+    keys = {"push": f"push:{state_key}", "pull": f"pull:{state_key}", "epoch": f"epoch:{state_key}"}
+    try:
+        try:
+            pushed = _delta_push(server, user, client_id, keys, headers)
+            pulled = _delta_pull(server, user, client_id, keys, headers)
+        except SyncEpochChanged:
+            for name, value in (("push", 0), ("pull", 0), ("epoch", "")):
+                set_sync_state(db, keys[name], value)
+            pulled = _delta_pull(server, user, client_id, keys, headers)
+            pushed = _delta_push(server, user, client_id, keys, headers)
+    except urllib.error.HTTPError as e:
+        if e.code == 404:
+            return None
+        raise
+    if not pushed and not pulled:
+        return "HTTP sync: up-to-date"
+    return f"HTTP sync: sent {pushed}, received {pulled} change(s)"
+
+def _check_sync_epoch(keys: dict, epoch) -> None:
+    """Remember the server's first epoch; raise SyncEpochChanged if it differs later."""
+    if not epoch:  # server predates epochs
+        return
+    known = get_sync_state(db, keys["epoch"], "")
+    if not known:
+        set_sync_state(db, keys["epoch"], epoch)
+    elif known != epoch:
+        raise SyncEpochChanged(f"server changelog restarted ({known[:8]} -> {epoch[:8]})")
+
+def _delta_push(server: str, user: str, client_id: str, keys: dict, headers: dict) -> int:
+    import urllib.error
+    push_url = _join_url(server, "/api/push", {"user": user})
+    pushed = 0
+    since = int(get_sync_state(db, keys["push"], 0) or 0)
+    while True:
+        changes, cursor, more = changes_since(db, since, exclude_origin=SYNC_REMOTE_ORIGIN)
+        if changes:
+            body = {"client": client_id, "epoch": get_sync_state(db, keys["epoch"], ""), "changes": changes}
+            try:
+                resp = http_post_json(push_url, body, headers=headers)
+            except urllib.error.HTTPError as e:
+                if e.code == 409:  # epoch_changed: nothing was applied
+                    raise SyncEpochChanged("server changelog restarted") from None
+                raise
+            if not resp.get("ok", False):
+                raise RuntimeError(f"HTTP sync: push failed ({resp.get('error', 'unknown')})")
+            _check_sync_epoch(keys, resp.get("epoch"))
+            pushed += len(changes)
+        if cursor != since:
+            set_sync_state(db, keys["push"], cursor)
+            since = cursor
+        if not more:
+            return pushed
+
+def _delta_pull(server: str, user: str, client_id: str, keys: dict, headers: dict) -> int:
+    pulled = 0
+    since = int(get_sync_state(db, keys["pull"], 0) or 0)
+    while True:
+        pull_url = _join_url(server, "/api/pull", {"user": user, "client": client_id, "since": since})
+        resp = http_get_json(pull_url, headers=headers, timeout=30)
+        _check_sync_epoch(keys, resp.get("epoch"))  # before applying anything
+        changes = resp.get("changes") or []
+        if changes:
+            pulled += apply_changes(db, changes, SYNC_REMOTE_ORIGIN)
+        cursor = int(resp.get("cursor", since) or since)
+        if cursor == since:  # nothing new (or a server that doesn't advance)
+            return pulled
+        set_sync_state(db, keys["pull"], cursor)
+        since = cursor
+        if not resp.get("more"):
+            return pulled
+
 def sync_http() -> str:
-    """HTTP sync (original). Returns human message."""
+    """HTTP sync: row-level when the server supports it, else whole-file. Returns human message."""
     server = (settings.get("sync_server_url") or "").strip()
     user = (settings.get("sync_user") or "default").strip() or "default"
     token = (settings.get("sync_token") or "").strip()
@@ -303,15 +572,21 @@ def sync_http() -> str:
     if token:
         headers["X-Token"] = token
 
+    msg = sync_http_delta(server, user, headers)
+    if msg is not None:
+        return msg
+
     meta_url = _join_url(server, "/api/meta", {"user": user})
     db_url = _join_url(server, "/api/db", {"user": user})
 
+    # Fold WAL into taskmask.db so mtime/hash/upload see every commit
+    db.checkpoint()
     local_exists = os.path.exists(DB_NAME)
     local_mtime = os.path.getmtime(DB_NAME) if local_exists else 0
-    local_sha = sha256_file(DB_NAME) if local_exists else ""
+    local_sha = cached_digest(DB_NAME) if local_exists else ""
 
     try:
-        server_meta = http_get_json(meta_url, headers=headers, timeout=10)
+        server_meta = http_get_json(meta_url, headers=headers, timeout=10, conditional=True)
     except Exception:
         server_meta = {"exists": False}
 
@@ -338,11 +613,14 @@ def sync_http() -> str:
     direction = "upload" if local_mtime >= server_mtime else "download"
 
     if direction == "download":
-        data = http_download_bytes(db_url, headers=headers, timeout=30)
+        # The server's ETag is the file's sha256, so our own hash revalidates it
+        data = http_download_bytes(db_url, headers=headers, timeout=30, etag=f'"{local_sha}"' if local_sha else "")
+        if data is None:
+            return "HTTP sync: up-to-date"
         tmp = DB_NAME + ".tmp"
         with open(tmp, "wb") as f:
             f.write(data)
-        os.replace(tmp, DB_NAME)
+        db.replace_file(tmp)
         init_db()
         return "HTTP sync: downloaded server DB"
     else:
@@ -373,15 +651,21 @@ def sync_once_async():
     def _run():
         global sync_in_progress, last_sync_message
         try:
-            msg = sync_once()
+            # Queued edits are committed before the upload and held back while
+            # the file may be replaced
+            with writes.paused():
+                msg = sync_once()
             last_sync_message = msg
         except Exception as e:
             last_sync_message = f"Sync error: {e}"
         finally:
+            # Edits held back during the sync go to the new file before the UI reloads it
+            writes.flush()
             sync_in_progress = False
             # Refresh UI on main thread
             def _done():
                 try:
+                    invalidate_note_cache()
                     refresh_links()
                     refresh_notes()
                     load_todo_data_from_db()
@@ -390,7 +674,7 @@ def sync_once_async():
                     status_var.set(f"{last_sync_message}")
                 except Exception:
                     pass
-            root.after(0, _done)
+            run_in_ui(_done)
 
     threading.Thread(target=_run, daemon=True).start()
 
@@ -401,6 +685,110 @@ def schedule_auto_sync():
         sync_once_async()
         root.after(interval * 1000, schedule_auto_sync)
 
+# ----------- BACKGROUND ARCHIVER -----------
+ARCHIVE_INTERVAL_MS = 10 * 60 * 1000  # how often to look for archivable tasks
+archive_in_progress = False
+
+def archive_cutoff_ts(now: datetime | None = None) -> str:
+    """done_at values older than this timestamp are archived."""
+    try:
+        hours = max(0.0, float(settings.get("archive_after_hours", 12)))
+    except (TypeError, ValueError):
+        hours = 12.0
+    return ((now or datetime.now()) - timedelta(hours=hours)).strftime(TS_FMT)
+
+def archive_old_tasks_async():
+    """
+    Find old completed tasks on a worker thread, then archive them on the Tk
+    thread in batches through archive_tasks(), i.e. the write-behind queue.
+    """
+    global archive_in_progress
+    if archive_in_progress or sync_in_progress or maintenance_in_progress:
+        return
+    archive_in_progress = True
+    cutoff = archive_cutoff_ts()
+
+    def _run():
+        global archive_in_progress
+        try:
+            uuids = archivable_todos(db, cutoff)
+        except Exception as e:
+            print(f"Archiver warning: {e}")
+            archive_in_progress = False
+            return
+        run_in_ui(lambda: _archive_old_batch(uuids, cutoff))
+
+    threading.Thread(target=_run, daemon=True).start()
+
+def _archive_old_batch(uuids: list[str], cutoff: str, start: int = 0, archived: int = 0):
+    """
+    Archive uuids[start:start + ARCHIVE_BATCH_SIZE] (Tk thread), then yield to
+    the event loop before the next batch. The in-memory row decides: one
+    un-done (or re-done) since the query was taken stays.
+    """
+    global archive_in_progress
+    batch = []
+    for uuid_val in uuids[start:start + ARCHIVE_BATCH_SIZE]:
+        row = todo_data.get(uuid_val)
+        if row is not None and row.done and row.done_at and row.done_at < cutoff:
+            batch.append(uuid_val)
+    if batch:
+        archived += archive_tasks(batch)
+    start += ARCHIVE_BATCH_SIZE
+    if start < len(uuids) and not sync_in_progress:
+        root.after(0, lambda: _archive_old_batch(uuids, cutoff, start, archived))
+        return
+    archive_in_progress = False
+    if archived:
+        status_var.set(f"Archived {archived} completed task(s)")
+
+def schedule_archiver():
+    archive_old_tasks_async()
+    root.after(ARCHIVE_INTERVAL_MS, schedule_archiver)
+
+# ----------- IDLE DB MAINTENANCE -----------
+MAINTENANCE_CHECK_MS = 5 * 60 * 1000          # how often to check for idleness
+MAINTENANCE_IDLE_SEC = 120                    # no keyboard/mouse input for this long
+MAINTENANCE_MIN_INTERVAL_SEC = 6 * 60 * 60    # at most one run per this period
+maintenance_in_progress = False
+last_user_input = time.monotonic()
+last_maintenance = float("-inf")
+
+def note_user_input(event=None):
+    global last_user_input
+    last_user_input = time.monotonic()
+
+def _format_mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+def run_maintenance_async():
+    """Incremental vacuum + ANALYZE on a worker thread; sizes go to the status bar."""
+    global maintenance_in_progress, last_maintenance
+    if maintenance_in_progress or sync_in_progress or archive_in_progress:
+        return
+    maintenance_in_progress = True
+    last_maintenance = time.monotonic()
+
+    def _run():
+        global maintenance_in_progress
+        try:
+            before, after = run_maintenance(db, writes=writes)
+            msg = f"DB maintenance: {_format_mb(before)} -> {_format_mb(after)}"
+        except Exception as e:
+            msg = f"DB maintenance error: {e}"
+        finally:
+            maintenance_in_progress = False
+        run_in_ui(lambda: status_var.set(msg))
+
+    threading.Thread(target=_run, daemon=True).start()
+
+def schedule_maintenance():
+    now = time.monotonic()
+    if (now - last_user_input >= MAINTENANCE_IDLE_SEC
+            and now - last_maintenance >= MAINTENANCE_MIN_INTERVAL_SEC):
+        run_maintenance_async()
+    root.after(MAINTENANCE_CHECK_MS, schedule_maintenance)
+
 def _resource_base_dir() -> str:
     """Best-effort base folder for resources (icon/assets) for script vs onefile executable."""
     if getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS"):
@@ -444,9 +832,44 @@ def get_db_path() -> str:
 
     return new_db
 
-DB_NAME = get_db_path()
+with startup_phase("get_db_path"):
+    DB_NAME = get_db_path()
 os.makedirs(os.path.dirname(DB_NAME), exist_ok=True)
 
+# Single long-lived WAL connection shared by every data helper below
+db = TaskmaskDB(DB_NAME)
+# ----------- WORKER -> UI HAND-OFF -----------
+# Worker threads (write-behind acks, sync, archiver, maintenance) never call
+# into Tk: under threaded Tcl, root.after() from another thread waits for the
+# main loop, which deadlocks when the Tk thread is waiting on that worker.
+# They queue callables here instead and poll_ui_calls() runs them on the Tk
+# thread. The Tk thread in turn never waits on writes.flush()/close().
+UI_POLL_MS = 50
+ui_calls = queue.SimpleQueue()
+
+def run_in_ui(fn):
+    """Run fn() on the Tk thread soon (safe to call from any thread)."""
+    ui_calls.put(fn)
+
+def drain_ui_calls():
+    while True:
+        try:
+            fn = ui_calls.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            fn()
+        except Exception as e:
+            print(f"UI callback warning: {e}")
+
+def poll_ui_calls():
+    drain_ui_calls()
+    root.after(UI_POLL_MS, poll_ui_calls)
+
+# Todo/note/link edits from the UI are committed by this worker thread in
+# short batches; acknowledgements come back on the Tk thread via run_in_ui().
+writes = WriteBehind(DB_NAME, dispatch=run_in_ui)
+
 # Global set to track overdue tasks that have already played sound
 overdue_sound_played = set()
 
@@ -455,13 +878,67 @@ blinking_tasks = set()  # Track which tasks are currently blinking
 blink_state = True  # Toggle for blinking effect
 
 # In-memory todo model (uuid -> row), rendered in a Treeview (table)
-todo_data: dict[str, dict] = {}  # uuid -> {task, done, deadline, done_at, created_at}
+todo_data: dict[str, "TodoRow"] = {}  # uuid -> TodoRow(task, done, deadline, done_at, created_at, order_index)
+
+# Pending changes since the last persist_todos_to_db() (uuids)
+todo_dirty: set[str] = set()    # inserted or updated rows
+todo_deleted: set[str] = set()  # rows removed from todo_data
+todo_extra_writes: list = []    # failed extra_write(conn) callables (e.g. archive inserts) to retry with the deletes
+
+# Status bar counters, kept current by the mutations below and by the deadline
+# scheduler (pending -> overdue), so update_status_bar() never scans todo_data.
+todo_counts = {"done": 0, "overdue": 0}
+_todo_counted: dict[str, tuple[bool, bool]] = {}  # uuid -> (done, overdue) as last counted
+
+def count_todo(uuid_val: str, now: datetime | None = None) -> bool:
+    """Re-derive one row's share of todo_counts (row may be gone). True if the counts changed."""
+    row = todo_data.get(uuid_val)
+    old = _todo_counted.pop(uuid_val, (False, False))
+    new = (False, False)
+    if row:
+        new = (row.done, not row.done and row.is_overdue(now or datetime.now()))
+        _todo_counted[uuid_val] = new
+    if new == old:
+        return False
+    todo_counts["done"] += new[0] - old[0]
+    todo_counts["overdue"] += new[1] - old[1]
+    return True
+
+def recount_all_todos() -> None:
+    """Full recount; only needed after todo_data is rebuilt from the DB."""
+    todo_counts.update(done=0, overdue=0)
+    _todo_counted.clear()
+    now = datetime.now()
+    for uuid_val in todo_data:
+        count_todo(uuid_val, now)
+
+def mark_todo_dirty(uuid_val: str) -> None:
+    """Row inserted/edited: save it on the next persist, recount it and re-plan its deadline events."""
+    todo_deleted.discard(uuid_val)
+    todo_dirty.add(uuid_val)
+    count_todo(uuid_val)
+    schedule_todo_deadline(uuid_val)
+
+def mark_todo_deleted(uuid_val: str) -> None:
+    todo_dirty.discard(uuid_val)
+    todo_deleted.add(uuid_val)
+    count_todo(uuid_val)
+    deadline_due.pop(uuid_val, None)
+
+# Deadline scheduler: min-heap of (when, seq, uuid) for each task's next visible
+# change (time-left label tick, soon/today/overdue switch, overdue sound).
+# deadline_due holds the live entry per uuid; anything else in the heap is stale.
+deadline_heap: list[tuple[datetime, int, str]] = []
+deadline_due: dict[str, datetime] = {}
+_deadline_seq = itertools.count()
 
 # Global icon path
 ICON_PATH = resource_path("icon.ico")
 
 # Import shared icon utility
 from icon_utils import set_window_icon as set_icon_shared
+from widget_utils import TreeviewReconciler, VirtualList
+from audio_alerts import AlertPlayer
 
 # ----------- TASK LISTBOX FORMATTING -----------
 DEADLINE_RAW_FMT = "%Y-%m-%d %H:%M"
@@ -551,10 +1028,17 @@ def _format_time_left(deadline_raw: str, done: bool) -> tuple[str, str]:
         return ("Done", "done")
     if not deadline_raw:
         return ("", "none")
-    dt, delta, is_overdue = _deadline_status(deadline_raw)
-    if not dt or not delta:
+    dt, _delta, _is_overdue = _deadline_status(deadline_raw)
+    return _format_time_left_dt(dt, done)
+
+def _format_time_left_dt(dt: datetime | None, done: bool, now: datetime | None = None) -> tuple[str, str]:
+    """_format_time_left() for an already parsed deadline."""
+    if done:
+        return ("Done", "done")
+    if not dt:
         return ("", "none")
-    if is_overdue:
+    delta = dt - (now or datetime.now())
+    if delta.total_seconds() <= 0:
         return ("OVERDUE", "overdue")
     days = delta.days
     hours = delta.seconds // 3600
@@ -566,32 +1050,136 @@ def _format_time_left(deadline_raw: str, done: bool) -> tuple[str, str]:
         return (f"{hours}h {minutes}m left", tag)
     return (f"{minutes}m left", "soon")
 
+_UNPARSED = object()
+
+class TodoRow:
+    """
+    One task in todo_data. Parsed deadline/created datetimes and their display
+    strings are computed once and cached until that field is edited.
+    """
+    __slots__ = ("task", "done", "done_at", "order_index",
+                 "_deadline", "_created_at", "_deadline_dt", "_deadline_display", "_created_display")
+
+    def __init__(self, task: str = "", done: bool = False, deadline: str = "", done_at: str = "",
+                 created_at: str = "", order_index: int = 0):
+        self.task = task
+        self.done = done
+        self.done_at = done_at
+        self.order_index = order_index
+        self.deadline = deadline
+        self.created_at = created_at
+
+    @property
+    def deadline(self) -> str:
+        return self._deadline
+
+    @deadline.setter
+    def deadline(self, value: str) -> None:
+        self._deadline = value or ""
+        self._deadline_dt = _UNPARSED
+        self._deadline_display = None
+
+    @property
+    def created_at(self) -> str:
+        return self._created_at
+
+    @created_at.setter
+    def created_at(self, value: str) -> None:
+        self._created_at = value or ""
+        self._created_display = None
+
+    @property
+    def deadline_dt(self) -> datetime | None:
+        if self._deadline_dt is _UNPARSED:
+            try:
+                self._deadline_dt = datetime.strptime(self._deadline, DEADLINE_RAW_FMT) if self._deadline else None
+            except ValueError:
+                self._deadline_dt = None
+        return self._deadline_dt
+
+    @property
+    def deadline_display(self) -> str:
+        if self._deadline_display is None:
+            dt = self.deadline_dt
+            self._deadline_display = dt.strftime(DEADLINE_DISPLAY_FMT) if dt else self._deadline
+        return self._deadline_display
+
+    @property
+    def created_display(self) -> str:
+        if self._created_display is None:
+            self._created_display = _format_created_display(self._created_at)
+        return self._created_display
+
+    def is_overdue(self, now: datetime | None = None) -> bool:
+        dt = self.deadline_dt
+        return bool(dt and not self.done and dt <= (now or datetime.now()))
+
+    def time_left(self, now: datetime | None = None) -> tuple[str, str]:
+        return _format_time_left_dt(self.deadline_dt, self.done, now)
+
+    def tree_values(self, now: datetime | None = None) -> tuple[str, str, str, str, str]:
+        left, _tag = self.time_left(now)
+        return ("✅" if self.done else "☐", self.task, self.created_display, self.deadline_display, left)
+
+def _next_deadline_transition(deadline_dt: datetime, now: datetime) -> datetime | None:
+    """
+    When the "time left" text/tag of a pending task next changes (see _format_time_left):
+    hourly while >= 1 day is left, every minute below that, None once overdue.
+    """
+    remaining = (deadline_dt - now).total_seconds()
+    if remaining <= 0:
+        return None
+    unit = 3600 if remaining >= 86400 else 60
+    steps = int(remaining // unit)
+    return deadline_dt - timedelta(seconds=steps * unit) + timedelta(milliseconds=1)
+
+def schedule_todo_deadline(uuid_val: str, now: datetime | None = None) -> None:
+    """(Re)plan the next timer event for one task; done/no-deadline tasks get none."""
+    deadline_due.pop(uuid_val, None)
+    row = todo_data.get(uuid_val)
+    if not row or row.done:
+        return
+    dt = row.deadline_dt
+    if not dt:
+        return
+    now = now or datetime.now()
+    due = _next_deadline_transition(dt, now)
+    if due is None:
+        if uuid_val in overdue_sound_played:
+            return
+        due = now  # already overdue: fire the sound on the next tick
+    deadline_due[uuid_val] = due
+    heapq.heappush(deadline_heap, (due, next(_deadline_seq), uuid_val))
+    # Drop stale entries once they dominate the heap
+    if len(deadline_heap) > 2 * len(deadline_due) + 64:
+        deadline_heap[:] = [e for e in deadline_heap if deadline_due.get(e[2]) == e[0]]
+        heapq.heapify(deadline_heap)
+
+def reschedule_all_deadlines() -> None:
+    deadline_heap.clear()
+    deadline_due.clear()
+    now = datetime.now()
+    for uuid_val in todo_data:
+        schedule_todo_deadline(uuid_val, now)
+
 def todo_tree_row_values(uuid_val: str) -> tuple[str, str, str, str, str]:
-    row = todo_data.get(uuid_val, {})
-    done = bool(row.get("done"))
-    task = str(row.get("task") or "")
-    created = _format_created_display(str(row.get("created_at") or ""))
-    deadline_raw = str(row.get("deadline") or "")
-    deadline = _format_deadline_display(deadline_raw)
-    left, _tag = _format_time_left(deadline_raw, done)
-    status = "✅" if done else "☐"
-    return (status, task, created, deadline, left)
+    row = todo_data.get(uuid_val)
+    return row.tree_values() if row else ("", "", "", "", "")
+
+def todo_tree_row_tags(uuid_val: str) -> tuple[str]:
+    row = todo_data.get(uuid_val)
+    return (row.time_left()[1],) if row else ("none",)
 
 def refresh_todo_tree(selection_uuid: str | None = None):
-    """Rebuild the todo Treeview from todo_data and keep selection if possible."""
+    """Reconcile the todo Treeview with todo_data (minimal Tk calls) and keep selection if possible."""
     if "todo_tree" not in globals():
         return
     # Preserve order by order_index
-    ordered = sorted(todo_data.items(), key=lambda kv: kv[1].get("order_index", 0))
-    todo_tree.delete(*todo_tree.get_children())
-    for idx, (uuid_val, row) in enumerate(ordered):
-        row["order_index"] = idx
-        todo_data[uuid_val] = row
-        values = todo_tree_row_values(uuid_val)
-        deadline_raw = str(row.get("deadline") or "")
-        left, tag = _format_time_left(deadline_raw, bool(row.get("done")))
-        todo_tree.insert("", "end", iid=uuid_val, values=values, tags=(tag,))
-    _configure_todo_tree_tags()
+    ordered = sorted(todo_data, key=lambda u: todo_data[u].order_index)
+    todo_reconciler.reconcile([
+        (uuid_val, todo_tree_row_values(uuid_val), todo_tree_row_tags(uuid_val))
+        for uuid_val in ordered
+    ])
     if selection_uuid and selection_uuid in todo_data:
         try:
             todo_tree.selection_set(selection_uuid)
@@ -616,6 +1204,21 @@ def get_selected_todo_uuid() -> str | None:
     sel = todo_tree.selection()
     return sel[0] if sel else None
 
+def get_selected_todo_uuids() -> list[str]:
+    """All selected tasks, in display order."""
+    if "todo_tree" not in globals():
+        return []
+    return sorted((u for u in todo_tree.selection() if u in todo_data),
+                  key=lambda u: todo_data[u].order_index)
+
+def refresh_todo_rows(uuids) -> None:
+    """Rewrite just these rows of the Treeview (values/tags) instead of reconciling all of it."""
+    now = datetime.now()
+    for uuid_val in uuids:
+        row = todo_data.get(uuid_val)
+        if row is not None and uuid_val in todo_reconciler:
+            todo_reconciler.update_row(uuid_val, row.tree_values(now), (row.time_left(now)[1],))
+
 def apply_todo_item_style(index: int, done: bool, deadline_raw: str):
     """Set listbox item fg/bg based on done + deadline urgency (keeps selected highlight handled elsewhere)."""
     # Legacy listbox styling (todo UI is now a Treeview table). Keep safe no-op.
@@ -663,6 +1266,13 @@ def create_scrolled_listbox(parent, **kwargs):
     
     return listbox
 
+def create_virtual_list(parent, **kwargs):
+    """Packed VirtualList (draws only visible rows); same padding kwargs as create_scrolled_listbox."""
+    padx, pady = kwargs.pop('padx', 0), kwargs.pop('pady', 0)
+    vlist = VirtualList(parent, **kwargs)
+    vlist.pack(fill="both", expand=True, padx=padx, pady=pady)
+    return vlist
+
 def add_placeholder(entry, placeholder):
     placeholder_color = '#aaa'
     default_color = entry['fg']
@@ -684,126 +1294,110 @@ def add_placeholder(entry, placeholder):
 
 # ----------- DATABASE SETUP -----------
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # Create todos table with new schema
-    c.execute('''CREATE TABLE IF NOT EXISTS todos 
-                 (id INTEGER PRIMARY KEY, 
-                  uuid TEXT,
-                  task TEXT, 
-                  done INTEGER,
-                  deadline TEXT,
-                  done_at TEXT,
-                  order_index INTEGER DEFAULT 0,
-                  created_at TEXT)''')
-    
-    # Check if deadline column exists, if not add it
-    c.execute("PRAGMA table_info(todos)")
-    columns = [column[1] for column in c.fetchall()]
-    
-    if 'deadline' not in columns:
-        c.execute("ALTER TABLE todos ADD COLUMN deadline TEXT")
-
-    if 'uuid' not in columns:
-        c.execute("ALTER TABLE todos ADD COLUMN uuid TEXT")
-    if 'done_at' not in columns:
-        c.execute("ALTER TABLE todos ADD COLUMN done_at TEXT")
-    if 'order_index' not in columns:
-        c.execute("ALTER TABLE todos ADD COLUMN order_index INTEGER DEFAULT 0")
-    
-    if 'created_at' not in columns:
-        c.execute("ALTER TABLE todos ADD COLUMN created_at TEXT")
-        # Update existing rows with current timestamp
-        c.execute("UPDATE todos SET created_at = datetime('now') WHERE created_at IS NULL")
-
-    # Archive table for completed tasks (auto-moved after 12h)
-    c.execute('''CREATE TABLE IF NOT EXISTS archive_todos
-                 (id INTEGER PRIMARY KEY,
-                  uuid TEXT UNIQUE,
-                  task TEXT,
-                  done_at TEXT,
-                  deadline TEXT,
-                  created_at TEXT,
-                  archived_at TEXT)''')
-    
-    # Create notes table with new schema
-    c.execute('''CREATE TABLE IF NOT EXISTS notes 
-                 (id INTEGER PRIMARY KEY,
-                  title TEXT NOT NULL,
-                  content TEXT NOT NULL,
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                  order_index INTEGER DEFAULT 0)''')
-    
-    # Check if order_index column exists, if not add it
-    c.execute("PRAGMA table_info(notes)")
-    note_columns = [column[1] for column in c.fetchall()]
-    
-    if 'order_index' not in note_columns:
-        c.execute("ALTER TABLE notes ADD COLUMN order_index INTEGER DEFAULT 0")
-    
-    # Create links table with new schema
-    c.execute('''CREATE TABLE IF NOT EXISTS links 
-                 (id INTEGER PRIMARY KEY, 
-                  name TEXT, 
-                  url TEXT,
-                  order_index INTEGER DEFAULT 0)''')
-    
-    # Check if order_index column exists, if not add it
-    c.execute("PRAGMA table_info(links)")
-    link_columns = [column[1] for column in c.fetchall()]
-    
-    if 'order_index' not in link_columns:
-        c.execute("ALTER TABLE links ADD COLUMN order_index INTEGER DEFAULT 0")
-    
-    conn.commit()
-    conn.close()
+    """Bring taskmask.db to the current schema (see MIGRATIONS in taskmask_db.py)."""
+    migrate(db)
 
 def load_todos():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT uuid, task, done, deadline, done_at, created_at, order_index FROM todos ORDER BY order_index ASC, created_at ASC")
-    todos = c.fetchall()
-    conn.close()
-    return todos
+    return db.query("SELECT uuid, task, done, deadline, done_at, created_at, order_index FROM todos ORDER BY order_index ASC, created_at ASC")
 
 def load_todo_data_from_db():
     """Populate in-memory todo_data from DB rows (used at startup / after restore/sync)."""
     todo_data.clear()
+    todo_dirty.clear()
+    todo_deleted.clear()
+    todo_extra_writes.clear()
     for uuid_val, task, done, deadline, done_at, created_at, order_index in load_todos():
-        uuid_val = uuid_val or str(uuid.uuid4())
-        todo_data[uuid_val] = {
-            "task": task or "",
-            "done": bool(done),
-            "deadline": deadline or "",
-            "done_at": done_at or "",
-            "created_at": created_at or now_ts(),
-            "order_index": int(order_index or 0),
-        }
-
-def persist_todos_to_db(todo_order: list[str]):
-    """Persist all todos in the given order_index order (simple & reliable)."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM todos")
-    for idx, uuid_val in enumerate(todo_order):
+        if not uuid_val:
+            uuid_val = str(uuid.uuid4())
+            mark_todo_dirty(uuid_val)
+        todo_data[uuid_val] = TodoRow(
+            task=task or "",
+            done=bool(done),
+            deadline=deadline or "",
+            done_at=done_at or "",
+            created_at=created_at or now_ts(),
+            order_index=int(order_index or 0),
+        )
+    recount_all_todos()
+    reschedule_all_deadlines()
+
+def next_todo_order_index() -> int:
+    return max((r.order_index for r in todo_data.values()), default=0) + ORDER_GAP
+
+def _fix_todo_order(todo_order: list[str]) -> None:
+    """Make order_index strictly increasing along todo_order, marking only rows that had to move."""
+    prev = None
+    for uuid_val in todo_order:
         row = todo_data.get(uuid_val)
         if not row:
             continue
-        c.execute(
-            "INSERT INTO todos (uuid, task, done, deadline, done_at, created_at, order_index) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (
-                uuid_val,
-                row.get("task", ""),
-                1 if row.get("done") else 0,
-                row.get("deadline", ""),
-                row.get("done_at", ""),
-                row.get("created_at", now_ts()),
-                idx,
-            ),
-        )
-    conn.commit()
-    conn.close()
+        order_index = row.order_index
+        if prev is not None and order_index <= prev:
+            order_index = prev + 1
+            row.order_index = order_index
+            mark_todo_dirty(uuid_val)
+        prev = order_index
+
+TODO_UPSERT_SQL = (
+    "INSERT INTO todos (uuid, task, done, deadline, done_at, created_at, order_index) VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(uuid) DO UPDATE SET task = excluded.task, done = excluded.done, deadline = excluded.deadline, "
+    "done_at = excluded.done_at, created_at = excluded.created_at, order_index = excluded.order_index"
+)
+
+def persist_todos_to_db(todo_order: list[str] | None = None, extra_write=None):
+    """
+    Queue only the todos changed since the last save (see mark_todo_dirty / mark_todo_deleted)
+    as one uuid-keyed upsert/delete batch. todo_order (e.g. the Treeview order) fixes up order_index.
+    Rows are snapshotted here; the write-behind thread commits them. extra_write(conn), if
+    given, runs first in the same transaction (e.g. the archive_todos side of a move).
+    """
+    if todo_order is not None:
+        _fix_todo_order(todo_order)
+    upserts = []
+    for uuid_val in todo_dirty:
+        row = todo_data.get(uuid_val)
+        if not row:
+            continue
+        upserts.append((
+            uuid_val,
+            row.task,
+            1 if row.done else 0,
+            row.deadline,
+            row.done_at,
+            row.created_at or now_ts(),
+            row.order_index,
+        ))
+    deletes = [(uuid_val,) for uuid_val in todo_deleted]
+    extras = todo_extra_writes[:]
+    if extra_write is not None:
+        extras.append(extra_write)
+    if not upserts and not deletes and not extras:
+        return
+
+    def _write(c):
+        for extra in extras:
+            extra(c)
+        if deletes:
+            c.executemany("DELETE FROM todos WHERE uuid = ?", deletes)
+        if upserts:
+            c.executemany(TODO_UPSERT_SQL, upserts)
+
+    def _failed(error):
+        # Mark the rows again so the next persist retries them; the extra writes go
+        # with them, so a row being archived is never retried as a bare delete
+        todo_extra_writes.extend(extras)
+        for (uuid_val,) in deletes:
+            if uuid_val not in todo_data:
+                todo_deleted.add(uuid_val)
+        for values in upserts:
+            if values[0] in todo_data and values[0] not in todo_deleted:
+                todo_dirty.add(values[0])
+        status_var.set(f"Save error: {error}")
+
+    writes.submit(_write, on_error=_failed)
+    todo_dirty.clear()
+    todo_deleted.clear()
+    todo_extra_writes.clear()
 
 def save_todos(todo_listbox):
     # Backward-compatible stub (todo_listbox no longer the primary UI).
@@ -813,114 +1407,134 @@ def save_todos(todo_listbox):
         if "todo_tree" in globals():
             order = list(todo_tree.get_children())
         else:
-            order = sorted(todo_data.keys(), key=lambda u: todo_data[u].get("order_index", 0))
+            order = sorted(todo_data.keys(), key=lambda u: todo_data[u].order_index)
         persist_todos_to_db(order)
     except Exception as e:
         print(f"save_todos warning: {e}")
 
 def load_links():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT id, name, url, order_index FROM links ORDER BY order_index ASC")
-    links = c.fetchall()
-    conn.close()
-    return links
-
-def save_link(name, url):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT MAX(order_index) FROM links")
-    max_order = c.fetchone()[0] or 0
-    c.execute("INSERT INTO links (name, url, order_index) VALUES (?, ?, ?)", (name, url, max_order + 1))
-    conn.commit()
-    conn.close()
-
-def delete_link(link_id):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM links WHERE id = ?", (link_id,))
-    conn.commit()
-    conn.close()
-
-def update_link_order(link_id, new_order):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE links SET order_index = ? WHERE id = ?", (new_order, link_id))
-    conn.commit()
-    conn.close()
-
-def save_note(title, content):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT MAX(order_index) FROM notes")
-    max_order = c.fetchone()[0] or 0
-    c.execute("INSERT INTO notes (title, content, order_index) VALUES (?, ?, ?)", (title, content, max_order + 1))
-    conn.commit()
-    conn.close()
-
-def delete_note(note_id):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM notes WHERE id = ?", (note_id,))
-    conn.commit()
-    conn.close()
-
-def update_note_order(note_id, new_order):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE notes SET order_index = ? WHERE id = ?", (new_order, note_id))
-    conn.commit()
-    conn.close()
-
-def update_note(note_id, title, content):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE notes SET title = ?, content = ? WHERE id = ?", (title, content, note_id))
-    conn.commit()
-    conn.close()
-
-def get_all_notes():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT id, title, content, created_at, order_index FROM notes ORDER BY order_index ASC")
-    notes = c.fetchall()
-    conn.close()
-    return notes
+    return db.query("SELECT id, name, url, order_index FROM links ORDER BY order_index ASC, id ASC")
+
+# Link/note writes are queued on the write-behind thread; on_done(result) runs
+# on the Tk thread once committed (refresh the list there, not right after the call).
+def save_link(name, url, on_done=None):
+    def _write(c):
+        max_order = c.execute("SELECT MAX(order_index) FROM links").fetchone()[0] or 0
+        c.execute("INSERT INTO links (uuid, name, url, order_index) VALUES (?, ?, ?, ?)",
+                  (new_row_uuid(), name, url, max_order + ORDER_GAP))
+    writes.submit(_write, on_done)
+
+def delete_link(link_id, on_done=None):
+    writes.submit(lambda c: c.execute("DELETE FROM links WHERE id = ?", (link_id,)), on_done)
+
+def save_note(title, content, on_done=None):
+    def _write(c):
+        max_order = c.execute("SELECT MAX(order_index) FROM notes").fetchone()[0] or 0
+        c.execute("INSERT INTO notes (uuid, title, content, order_index) VALUES (?, ?, ?, ?)",
+                  (new_row_uuid(), title, content, max_order + ORDER_GAP))
+    writes.submit(_write, on_done)
+
+def _note_written(note_id, on_done):
+    """Ack for a note write: drop the cached copy, then the caller's callback."""
+    def _done(result):
+        invalidate_note_cache(note_id)
+        if on_done is not None:
+            on_done(result)
+    return _done
+
+def delete_note(note_id, on_done=None):
+    writes.submit(lambda c: c.execute("DELETE FROM notes WHERE id = ?", (note_id,)),
+                  _note_written(note_id, on_done))
+
+def update_note(note_id, title, content, on_done=None):
+    writes.submit(lambda c: c.execute("UPDATE notes SET title = ?, content = ? WHERE id = ?", (title, content, note_id)),
+                  _note_written(note_id, on_done))
+
+def list_notes():
+    """Listing query: (id, title, order_index) only - note bodies are fetched on open via get_note()."""
+    return db.query("SELECT id, title, order_index FROM notes ORDER BY order_index ASC, id ASC")
+
+# Recently opened notes: note_id -> (id, title, content, created_at, order_index)
+NOTE_CACHE_SIZE = 32
+_note_cache: "OrderedDict[int, tuple]" = OrderedDict()
+
+def get_note(note_id):
+    """One full note by primary key, through a small LRU cache. None if it doesn't exist."""
+    note = _note_cache.get(note_id)
+    if note is not None:
+        _note_cache.move_to_end(note_id)
+        return note
+    note = db.query_one("SELECT id, title, content, created_at, order_index FROM notes WHERE id = ?", (note_id,))
+    if note is not None:
+        _note_cache[note_id] = note
+        if len(_note_cache) > NOTE_CACHE_SIZE:
+            _note_cache.popitem(last=False)
+    return note
+
+def invalidate_note_cache(note_id=None):
+    """Forget one cached note, or all of them (after the DB file was replaced)."""
+    if note_id is None:
+        _note_cache.clear()
+    else:
+        _note_cache.pop(note_id, None)
 
 # ----------- REORDERING FUNCTIONS -----------
-def move_up(listbox, save_func, update_order_func, items_data):
-    selection = listbox.curselection()
-    if selection and selection[0] > 0:
-        index = selection[0]
-        text = listbox.get(index)
-        listbox.delete(index)
-        listbox.insert(index - 1, text)
-        listbox.selection_set(index - 1)
-        
-        # Update order in database
-        if items_data:
-            item_id = items_data[index][0]  # Assuming first element is ID
-            update_order_func(item_id, index)
-        save_func(listbox)
-
-def move_down(listbox, save_func, update_order_func, items_data):
-    selection = listbox.curselection()
-    if selection and selection[0] < listbox.size() - 1:
-        index = selection[0]
-        text = listbox.get(index)
-        listbox.delete(index)
-        listbox.insert(index + 1, text)
-        listbox.selection_set(index + 1)
-        
-        # Update order in database
-        if items_data:
-            item_id = items_data[index][0]  # Assuming first element is ID
-            update_order_func(item_id, index + 2)
-        save_func(listbox)
+# order_index keys are gapped (see ORDER_GAP in taskmask_db.py): a move writes
+# one key between the new neighbours; lists are respaced only when a gap is used up.
+def normalize_list_order(rows, table):
+    """Respace a notes/links table if its keys (rows = [(id, ..., order_index)]) have ties."""
+    if is_strictly_increasing(row[-1] for row in rows):
+        return
+    writes.submit(lambda c: rebalance_table_order(c, table),
+                  _note_written(None, None) if table == "notes" else None)
+
+def move_list_item(vlist, table, step):
+    """Move the selected item of a VirtualList up (step -1) or down (+1): one queued UPDATE."""
+    selection = vlist.curselection()
+    if not selection:
+        return
+    index = selection[0]
+    target = index + step
+    if not 0 <= target < vlist.size():
+        return
+    def key_without_moved(pos):
+        """Item id at pos in the list with the moved item taken out (None past either end)."""
+        if not 0 <= pos < vlist.size() - 1:
+            return None
+        return vlist.key_at(pos if pos < index else pos + 1)
+
+    item_id = vlist.key_at(index)
+    before, after = key_without_moved(target - 1), key_without_moved(target)
+
+    def new_key_between(c):
+        ids = [i for i in (before, after) if i is not None]
+        marks = ",".join("?" * len(ids))
+        found = dict(c.execute(f"SELECT id, order_index FROM {table} WHERE id IN ({marks})", ids))
+        return order_key_between(found.get(before), found.get(after))
+
+    def _write(c):
+        # Runs on the writer connection, after any earlier queued moves
+        new_key = new_key_between(c)
+        rebalanced = new_key is None
+        if rebalanced:  # gap used up: respace the (small) table, then place
+            rebalance_table_order(c, table)
+            new_key = new_key_between(c)
+        c.execute(f"UPDATE {table} SET order_index = ? WHERE id = ?", (new_key, item_id))
+        return rebalanced
+
+    def _done(rebalanced):
+        if table == "notes":
+            invalidate_note_cache(None if rebalanced else item_id)
+
+    writes.submit(_write, _done)
+    vlist.move(index, target)
+    vlist.see(target)
 
 # ----------- TIMER FUNCTIONS -----------
-def add_timer_window(selected_uuid: str | None = None):
-    selected_uuid = selected_uuid or get_selected_todo_uuid()
+def add_timer_window(selected_uuid: str | None = None, uuids: list[str] | None = None):
+    """Deadline dialog for one task, or for all of `uuids` at once (multi-select)."""
+    selected_uuid = selected_uuid or (uuids[0] if uuids else get_selected_todo_uuid())
+    targets = uuids or [selected_uuid]
     if not selected_uuid or selected_uuid not in todo_data:
         messagebox.showwarning("No Task Selected", "Please select a task first before adding a timer.")
         return
@@ -959,7 +1573,7 @@ def add_timer_window(selected_uuid: str | None = None):
     task_card = tk.Frame(container, bg="white", relief="flat", bd=0)
     task_card.pack(fill="x", pady=(0, 20))
     
-    task_text = str(todo_data[selected_uuid].get("task") or "")
+    task_text = todo_data[selected_uuid].task if len(targets) == 1 else f"{len(targets)} selected tasks"
     task_label = tk.Label(task_card, text=task_text, 
                           font=("Segoe UI", 12), bg="white", fg="#333",
                           wraplength=350, justify="left", padx=20, pady=15)
@@ -1098,11 +1712,8 @@ def add_timer_window(selected_uuid: str | None = None):
             # Validate format
             datetime.strptime(deadline_raw, DEADLINE_RAW_FMT)
             
-            if selected_uuid in todo_data:
-                todo_data[selected_uuid]["deadline"] = deadline_raw
-                refresh_todo_tree(selection_uuid=selected_uuid)
-                persist_todos_to_db(list(todo_tree.get_children()))
-                update_status_bar()
+            if any(u in todo_data for u in targets):
+                set_tasks_deadline(targets, deadline_raw)
                 timer_window.destroy()
             else:
                 status_label.config(text="❌ Task no longer exists", fg="#dc3545", bg="#f5f7fa")
@@ -1141,46 +1752,54 @@ def add_timer_window(selected_uuid: str | None = None):
     date_entry.focus_set()
     date_entry.select_range(0, tk.END)
 
+def _play_overdue_sound_blocking():
+    """Runs on the alert worker thread only (see overdue_alerts)."""
+    sound_file = resource_path("assets", "overdue.mp3")
+    try:
+        if os.path.exists(sound_file):
+            playsound(sound_file, block=True)
+            return
+    except Exception:
+        pass
+    if winsound:
+        winsound.PlaySound("SystemExclamation", winsound.SND_ALIAS)
+
+# One audio worker for all overdue alerts: bursts within 0.75s become one
+# sound, and at most one sound plays every 10s.
+overdue_alerts = AlertPlayer(_play_overdue_sound_blocking, coalesce_window=0.75, min_interval=10.0)
+
+def play_overdue_sound():
+    """Queue an overdue alert (never blocks the Tk thread)."""
+    overdue_alerts.alert()
+
 def update_timers():
-    """Update timer displays and check for overdue tasks"""
+    """Apply due deadline events (time-left text, color tag, overdue sound) to just the affected rows."""
     global blink_state
-    # Update table rows (time-left column + color tags) and beep on first overdue
     if "todo_tree" in globals():
-        for uuid_val in list(todo_tree.get_children()):
+        now = datetime.now()
+        counts_changed = False
+        while deadline_heap and deadline_heap[0][0] <= now:
+            due, _seq, uuid_val = heapq.heappop(deadline_heap)
+            if deadline_due.get(uuid_val) != due:
+                continue  # stale: row was edited, rescheduled or removed
+            del deadline_due[uuid_val]
             row = todo_data.get(uuid_val)
             if not row:
                 continue
-            deadline_raw = str(row.get("deadline") or "")
-            done_bool = bool(row.get("done"))
-            left, tag = _format_time_left(deadline_raw, done_bool)
-
-            # Update row values if needed (keeps time left fresh)
-            values = list(todo_tree.item(uuid_val, "values"))
-            # values = [status, task, created, deadline, left]
-            if len(values) == 5:
-                values[0] = "✅" if done_bool else "☐"
-                values[1] = str(row.get("task") or "")
-                values[2] = _format_created_display(str(row.get("created_at") or ""))
-                values[3] = _format_deadline_display(deadline_raw)
-                values[4] = left
-                todo_tree.item(uuid_val, values=values, tags=(tag,))
+            left, tag = row.time_left(now)
+            counts_changed |= count_todo(uuid_val, now)
+            if uuid_val in todo_reconciler:
+                todo_reconciler.update_row(uuid_val, row.tree_values(now), (tag,))
 
             # Sound on overdue (once per uuid)
-            if tag == "overdue" and not done_bool:
+            if tag == "overdue" and not row.done:
                 if uuid_val not in overdue_sound_played:
-                    try:
-                        sound_file = resource_path("assets", "overdue.mp3")
-                        if os.path.exists(sound_file):
-                            threading.Thread(target=lambda: playsound(sound_file, block=False), daemon=True).start()
-                        elif winsound:
-                            winsound.PlaySound("SystemExclamation", winsound.SND_ALIAS)
-                    except Exception:
-                        try:
-                            if winsound:
-                                winsound.PlaySound("SystemExclamation", winsound.SND_ALIAS)
-                        except Exception:
-                            pass
+                    play_overdue_sound()
                     overdue_sound_played.add(uuid_val)
+            else:
+                schedule_todo_deadline(uuid_val, now)
+        if counts_changed:
+            update_status_bar()
     
     # Toggle blink state for next update
     blink_state = not blink_state
@@ -1201,14 +1820,12 @@ def add_todo():
     task = todo_entry.get().strip()
     if task:
         uuid_val = str(uuid.uuid4())
-        todo_data[uuid_val] = {
-            "task": task,
-            "done": False,
-            "deadline": "",
-            "done_at": "",
-            "created_at": now_ts(),
-            "order_index": len(todo_data),
-        }
+        todo_data[uuid_val] = TodoRow(
+            task=task,
+            created_at=now_ts(),
+            order_index=next_todo_order_index(),
+        )
+        mark_todo_dirty(uuid_val)
         refresh_todo_tree(selection_uuid=uuid_val)
         persist_todos_to_db(list(todo_tree.get_children()))
         todo_entry.delete(0, tk.END)
@@ -1220,29 +1837,205 @@ def add_todo():
             pass
 
 def toggle_task(event=None):
+    selected = get_selected_todo_uuids()
+    if len(selected) > 1:
+        # Mark all done, or all not done if they already are
+        set_tasks_done(selected, not all(todo_data[u].done for u in selected))
+        return
     uuid_val = get_selected_todo_uuid()
     if uuid_val and uuid_val in todo_data:
         row = todo_data[uuid_val]
-        row["done"] = not bool(row.get("done"))
-        row["done_at"] = now_ts() if row["done"] else ""
+        row.done = not row.done
+        row.done_at = now_ts() if row.done else ""
         todo_data[uuid_val] = row
+        mark_todo_dirty(uuid_val)
         refresh_todo_tree(selection_uuid=uuid_val)
         persist_todos_to_db(list(todo_tree.get_children()))
         update_status_bar()
 
 def delete_task():
+    selected = get_selected_todo_uuids()
+    if len(selected) > 1:
+        if messagebox.askyesno("Confirm Delete", f"Delete {len(selected)} selected tasks?"):
+            delete_tasks(selected)
+        return
     uuid_val = get_selected_todo_uuid()
     if uuid_val and uuid_val in todo_data:
         del todo_data[uuid_val]
-        try:
-            todo_tree.delete(uuid_val)
-        except Exception:
-            pass
+        mark_todo_deleted(uuid_val)
+        todo_reconciler.remove_rows([uuid_val])
         persist_todos_to_db(list(todo_tree.get_children()))
         update_status_bar()
     else:
         messagebox.showinfo("No Selection", "Please select a task to delete.")
 
+# ----------- BULK ACTIONS (multi-select) -----------
+# Each bulk action edits todo_data, queues ONE persist (one transaction on the
+# write-behind thread) and touches only the affected Treeview rows.
+def set_tasks_done(uuids: list[str], done: bool) -> int:
+    stamp = now_ts()
+    changed = []
+    for uuid_val in uuids:
+        row = todo_data.get(uuid_val)
+        if row is None or row.done == done:
+            continue
+        row.done = done
+        row.done_at = stamp if done else ""
+        mark_todo_dirty(uuid_val)
+        changed.append(uuid_val)
+    if changed:
+        persist_todos_to_db()
+        refresh_todo_rows(changed)
+        update_status_bar()
+    return len(changed)
+
+def set_tasks_deadline(uuids: list[str], deadline_raw: str) -> int:
+    """Set (or clear, with "") the deadline of every listed task."""
+    changed = []
+    for uuid_val in uuids:
+        row = todo_data.get(uuid_val)
+        if row is None or row.deadline == deadline_raw:
+            continue
+        row.deadline = deadline_raw
+        overdue_sound_played.discard(uuid_val)
+        mark_todo_dirty(uuid_val)
+        changed.append(uuid_val)
+    if changed:
+        persist_todos_to_db()
+        refresh_todo_rows(changed)
+        update_status_bar()
+    return len(changed)
+
+def delete_tasks(uuids: list[str]) -> int:
+    gone = [u for u in uuids if u in todo_data]
+    for uuid_val in gone:
+        del todo_data[uuid_val]
+        mark_todo_deleted(uuid_val)
+    if gone:
+        todo_reconciler.remove_rows(gone)
+        persist_todos_to_db()
+        update_status_bar()
+    return len(gone)
+
+def archive_tasks(uuids: list[str]) -> int:
+    """Move the completed tasks among uuids to the archive now (pending ones are skipped)."""
+    done = [u for u in uuids if u in todo_data and todo_data[u].done]
+    if not done:
+        return 0
+    rows = []
+    for uuid_val in done:
+        row = todo_data.pop(uuid_val)
+        rows.append((uuid_val, row.task, row.done_at, row.deadline, row.created_at))
+        mark_todo_deleted(uuid_val)
+    archived_at = now_ts()
+    persist_todos_to_db(extra_write=lambda c: archive_todo_rows(c, rows, archived_at))
+    todo_reconciler.remove_rows(done)
+    update_status_bar()
+    return len(done)
+
+def archive_selected_tasks():
+    selected = get_selected_todo_uuids()
+    if not selected:
+        return
+    archived = archive_tasks(selected)
+    skipped = len(selected) - archived
+    status_var.set(f"Archived {archived} task(s)" + (f", skipped {skipped} not done" if skipped else ""))
+
+def mark_selected_done(done: bool = True):
+    set_tasks_done(get_selected_todo_uuids(), done)
+
+def select_all_todos(event=None):
+    todo_tree.selection_set(todo_tree.get_children())
+    return "break"
+
+def parse_import_rows(rows) -> list[tuple[str, str, bool]]:
+    """
+    (task, deadline, done) from rows of cells: task[, deadline[, done]].
+    A header row naming a "task" column may reorder them. Deadlines must be
+    YYYY-MM-DD [HH:MM] (otherwise dropped); done accepts 1/true/yes/x/✅.
+    """
+    rows = [[cell.strip() for cell in row] for row in rows if any(cell.strip() for cell in row)]
+    columns = {"task": 0, "deadline": 1, "done": 2}
+    if rows and "task" in (cell.lower() for cell in rows[0]):
+        header = [cell.lower() for cell in rows.pop(0)]
+        columns = {name: header.index(name) if name in header else None for name in columns}
+
+    def cell(row, name):
+        i = columns[name]
+        return row[i] if i is not None and i < len(row) else ""
+
+    tasks = []
+    for row in rows:
+        task = cell(row, "task")
+        if not task:
+            continue
+        deadline = cell(row, "deadline")
+        for fmt in (DEADLINE_RAW_FMT, "%Y-%m-%d"):
+            try:
+                deadline = datetime.strptime(deadline, fmt).strftime(DEADLINE_RAW_FMT)
+                break
+            except ValueError:
+                continue
+        else:
+            deadline = ""
+        done = cell(row, "done").lower() in ("1", "true", "yes", "y", "x", "done", "✅")
+        tasks.append((task, deadline, done))
+    return tasks
+
+def import_tasks(tasks: list[tuple[str, str, bool]]) -> int:
+    """Append parsed tasks (see parse_import_rows) with one persist and one tree update."""
+    if not tasks:
+        return 0
+    order_index = next_todo_order_index()
+    stamp = now_ts()
+    added = []
+    for task, deadline, done in tasks:
+        uuid_val = str(uuid.uuid4())
+        todo_data[uuid_val] = TodoRow(
+            task=task,
+            done=done,
+            deadline=deadline,
+            done_at=stamp if done else "",
+            created_at=stamp,
+            order_index=order_index,
+        )
+        order_index += ORDER_GAP
+        mark_todo_dirty(uuid_val)
+        added.append(uuid_val)
+    persist_todos_to_db()
+    refresh_todo_tree()
+    todo_tree.selection_set(added)
+    todo_tree.see(added[-1])
+    update_status_bar()
+    return len(added)
+
+def paste_import_tasks(event=None):
+    """One task per clipboard line; tab-separated cells (spreadsheet copy) as task, deadline, done."""
+    try:
+        text = root.clipboard_get()
+    except tk.TclError:
+        text = ""
+    count = import_tasks(parse_import_rows(line.split("\t") for line in text.splitlines()))
+    status_var.set(f"Imported {count} task(s) from clipboard")
+    return "break"
+
+def import_tasks_from_csv():
+    import csv
+    path = filedialog.askopenfilename(
+        title="Import Tasks",
+        filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+    )
+    if not path:
+        return
+    try:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            tasks = parse_import_rows(csv.reader(f))
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        messagebox.showerror("Import Failed", str(e))
+        return
+    count = import_tasks(tasks)
+    status_var.set(f"Imported {count} task(s) from {os.path.basename(path)}")
+
 def on_todo_select(event):
     """Treeview handles selection highlighting; keep for compatibility."""
     return
@@ -1255,6 +2048,8 @@ def on_todo_key(event):
         delete_task()
     elif event.keysym == 'space':
         toggle_task()
+    elif event.state & 0x0001:  # Shift+Up/Down: let the Treeview extend the selection
+        return
     elif event.keysym == 'Up':
         if "todo_tree" in globals():
             sel = get_selected_todo_uuid()
@@ -1357,8 +2152,7 @@ def add_link_window():
             url = "https://" + url
         
         try:
-            save_link(name, url)
-            refresh_links()
+            save_link(name, url, on_done=lambda _: refresh_links())
             link_window.destroy()
         except Exception as e:
             status_label.config(text=f"❌ Error: {str(e)}", fg="#dc3545", bg="#f5f7fa")
@@ -1387,32 +2181,23 @@ def add_link_window():
     # Focus on name entry
     name_entry.focus_set()
 
+link_urls: dict[int, str] = {}  # link id -> url for the rows shown in links_listbox
+
 def refresh_links():
-    links_listbox.delete(0, tk.END)
     links = load_links()
-    for link_id, name, url, order_index in links:
-        links_listbox.insert(tk.END, f"🌐 {name}")
-        
-        # Bind click event to open URL
-        def open_link(event, url=url):
-            open_website(url)
-        
-        # Bind double-click to open link
-        links_listbox.bind("<Double-Button-1>", lambda e, url=url: open_website(url))
-        
-        # Add right-click menu for delete
-        def create_popup(link_id):
-            popup = tk.Menu(links_listbox, tearoff=0)
-            popup.add_command(label="Delete", command=lambda: delete_and_refresh_link(link_id))
-            return popup
-        
-        popup = create_popup(link_id)
-        links_listbox.bind("<Button-3>", lambda e, p=popup: p.tk_popup(e.x_root, e.y_root))
+    normalize_list_order(links, "links")
+    link_urls.clear()
+    link_urls.update((link_id, url) for link_id, _name, url, _order in links)
+    links_listbox.set_items([(link_id, f"🌐 {name}") for link_id, name, _url, _order in links])
+
+def open_link_by_id(link_id):
+    url = link_urls.get(link_id)
+    if url:
+        open_website(url)
 
 def delete_and_refresh_link(link_id):
     if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this link?"):
-        delete_link(link_id)
-        refresh_links()
+        delete_link(link_id, on_done=lambda _: refresh_links())
 
 def add_note_window():
     note_window = tk.Toplevel(root)
@@ -1458,8 +2243,7 @@ def add_note_window():
         title = title_entry.get().strip()
         content = content_text.get("1.0", tk.END).strip()
         if title and content:
-            save_note(title, content)
-            refresh_notes()
+            save_note(title, content, on_done=lambda _: refresh_notes())
             note_window.destroy()
     
     save_btn = tk.Button(btn_frame, text="Save Note",
@@ -1470,13 +2254,7 @@ def add_note_window():
 
 def edit_note_window(note_id):
     """Open edit window for an existing note"""
-    notes = get_all_notes()
-    note_data = None
-    for note in notes:
-        if note[0] == note_id:
-            note_data = note
-            break
-    
+    note_data = get_note(note_id)
     if not note_data:
         messagebox.showerror("Error", "Note not found.")
         return
@@ -1606,8 +2384,7 @@ def edit_note_window(note_id):
             return
         
         try:
-            update_note(note_id, title, content)
-            refresh_notes()
+            update_note(note_id, title, content, on_done=lambda _: refresh_notes())
             edit_window.destroy()
         except Exception as e:
             status_label.config(text=f"❌ Error: {str(e)}", fg="#dc3545", bg="#f5f7fa")
@@ -1649,105 +2426,87 @@ def edit_note_window(note_id):
     title_entry.select_range(0, tk.END)
 
 def refresh_notes():
-    notes_listbox.delete(0, tk.END)
-    notes = get_all_notes()
-    for note in notes:
-        note_frame = tk.Frame(notes_listbox, bg="#f8f9fa")
-        notes_listbox.insert(tk.END, f"{note[0]} - {note[1]}")
-        
-        # Add right-click menu for edit and delete
-        def create_popup(note_id):
-            popup = tk.Menu(notes_listbox, tearoff=0)
-            popup.add_command(label="Edit", command=lambda: edit_note_window(note_id))
-            popup.add_separator()
-            popup.add_command(label="Delete", command=lambda: delete_and_refresh_note(note_id))
-            return popup
-        
-        popup = create_popup(note[0])
-        notes_listbox.bind("<Button-3>", lambda e, p=popup: p.tk_popup(e.x_root, e.y_root))
+    notes = list_notes()
+    normalize_list_order(notes, "notes")
+    notes_listbox.set_items([(note_id, f"{note_id} - {title}") for note_id, title, _order in notes])
 
 def delete_and_refresh_note(note_id):
     if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this note?"):
-        delete_note(note_id)
-        refresh_notes()
-
-def view_note(event):
-    selection = notes_listbox.curselection()
-    if selection:
-        note_id = int(notes_listbox.get(selection[0]).split(" - ")[0])
-        notes = get_all_notes()
-        for note in notes:
-            if note[0] == note_id:
-                view_window = tk.Toplevel(root)
-                # Create hidden first to avoid visible "jump" animation, then center and show
-                view_window.withdraw()
-                view_window.title(note[1])
-                view_window.config(bg="white")
-                view_window.resizable(False, False)
-                
-                # Set icon for view window
-                set_window_icon(view_window)
-                
-                # Center window relative to main window
-                center_window_relative_to_parent(view_window, 600, 400)
-                view_window.deiconify()
-                
-                # Make modal
-                view_window.transient(root)
-                view_window.grab_set()
-                
-                # Add a container frame
-                container = tk.Frame(view_window, bg="white", padx=20, pady=10)
-                container.pack(fill="both", expand=True)
-                
-                # Title display
-                title_label = tk.Label(container, text=note[1], 
-                                     font=("Segoe UI", 16, "bold"),
-                                     bg="white", fg="#333")
-                title_label.pack(anchor="w", pady=(0, 10))
-                
-                # Content display
-                text_frame = tk.Frame(container, bg="white")
-                text_frame.pack(fill="both", expand=True)
-                
-                text = tk.Text(text_frame, wrap=tk.WORD, font=("Segoe UI", 11),
-                              padx=10, pady=10, relief="flat", bg="#f8f9fa")
-                text.pack(fill="both", expand=True)
-                text.insert("1.0", note[2])
-                text.config(state="disabled")
-                
-                # Button frame
-                btn_frame = tk.Frame(container, bg="white")
-                btn_frame.pack(fill="x", pady=(10, 0))
-                
-                def edit_current_note():
+        delete_note(note_id, on_done=lambda _: refresh_notes())
+
+def view_note(event=None, note_id=None):
+    note_id = note_id if note_id is not None else notes_listbox.selected_key()
+    if note_id is not None:
+        note = get_note(note_id)
+        if note:
+            view_window = tk.Toplevel(root)
+            # Create hidden first to avoid visible "jump" animation, then center and show
+            view_window.withdraw()
+            view_window.title(note[1])
+            view_window.config(bg="white")
+            view_window.resizable(False, False)
+            
+            # Set icon for view window
+            set_window_icon(view_window)
+            
+            # Center window relative to main window
+            center_window_relative_to_parent(view_window, 600, 400)
+            view_window.deiconify()
+            
+            # Make modal
+            view_window.transient(root)
+            view_window.grab_set()
+            
+            # Add a container frame
+            container = tk.Frame(view_window, bg="white", padx=20, pady=10)
+            container.pack(fill="both", expand=True)
+            
+            # Title display
+            title_label = tk.Label(container, text=note[1], 
+                                 font=("Segoe UI", 16, "bold"),
+                                 bg="white", fg="#333")
+            title_label.pack(anchor="w", pady=(0, 10))
+            
+            # Content display
+            text_frame = tk.Frame(container, bg="white")
+            text_frame.pack(fill="both", expand=True)
+            
+            text = tk.Text(text_frame, wrap=tk.WORD, font=("Segoe UI", 11),
+                          padx=10, pady=10, relief="flat", bg="#f8f9fa")
+            text.pack(fill="both", expand=True)
+            text.insert("1.0", note[2])
+            text.config(state="disabled")
+            
+            # Button frame
+            btn_frame = tk.Frame(container, bg="white")
+            btn_frame.pack(fill="x", pady=(10, 0))
+            
+            def edit_current_note():
+                view_window.destroy()
+                edit_note_window(note_id)
+            
+            def delete_current_note():
+                if messagebox.askyesno("Confirm Delete", 
+                                     "Are you sure you want to delete this note?"):
+                    delete_note(note_id, on_done=lambda _: refresh_notes())
                     view_window.destroy()
-                    edit_note_window(note_id)
-                
-                def delete_current_note():
-                    if messagebox.askyesno("Confirm Delete", 
-                                         "Are you sure you want to delete this note?"):
-                        delete_note(note_id)
-                        refresh_notes()
-                        view_window.destroy()
-                
-                edit_btn = tk.Button(btn_frame, text="Edit Note", 
-                                    command=edit_current_note,
-                                    bg="#007bff", fg="white",
-                                    font=("Segoe UI", 9),
-                                    padx=12, pady=4)
-                edit_btn.pack(side="left", padx=(0, 10))
-                
-                delete_btn = tk.Button(btn_frame, text="Delete Note", 
-                                     command=delete_current_note,
-                                     bg="#dc3545", fg="white",
-                                     font=("Segoe UI", 9),
-                                     padx=12, pady=4)
-                delete_btn.pack(side="right")
-                break
+            
+            edit_btn = tk.Button(btn_frame, text="Edit Note", 
+                                command=edit_current_note,
+                                bg="#007bff", fg="white",
+                                font=("Segoe UI", 9),
+                                padx=12, pady=4)
+            edit_btn.pack(side="left", padx=(0, 10))
+            
+            delete_btn = tk.Button(btn_frame, text="Delete Note", 
+                                 command=delete_current_note,
+                                 bg="#dc3545", fg="white",
+                                 font=("Segoe UI", 9),
+                                 padx=12, pady=4)
+            delete_btn.pack(side="right")
 
 # ----------- GUI SETUP -----------
-init_db()
+# init_db() and loading data run in hydrate_dashboard(), after the first paint
 settings = load_settings()
 root = tk.Tk()
 root.title("🧠 Advanced Daily Dashboard")
@@ -1768,6 +2527,45 @@ root.config(bg="#eaf4fc")
 # Set application icon using shared utility
 set_window_icon(root)
 
+exit_in_progress = False
+
+def on_app_exit():
+    """
+    Hide the window, commit queued writes and checkpoint + close the DB
+    connections on a worker thread, then destroy the window. The Tk thread
+    keeps running queued callbacks meanwhile instead of blocking on close().
+    """
+    global exit_in_progress
+    if exit_in_progress:
+        return
+    exit_in_progress = True
+    overdue_alerts.stop()
+    root.withdraw()
+
+    def _close():
+        close_http_connections()
+        try:
+            writes.close()
+        except Exception as e:
+            print(f"DB write flush warning: {e}")
+        try:
+            db.close()
+        except Exception as e:
+            print(f"DB close warning: {e}")
+
+    closer = threading.Thread(target=_close, name="db-close")
+    closer.start()
+
+    def _wait():
+        drain_ui_calls()
+        if closer.is_alive():
+            root.after(UI_POLL_MS, _wait)
+        else:
+            root.destroy()
+    _wait()
+
+root.protocol("WM_DELETE_WINDOW", on_app_exit)
+
 def apply_theme():
     """Basic light/dark theme for main surfaces. (Listboxes are styled manually)."""
     theme = settings.get("theme", "light")
@@ -1800,10 +2598,25 @@ def backup_database():
         )
         if not path:
             return
-        shutil.copy2(DB_NAME, path)
-        messagebox.showinfo("Backup Complete", f"Database backup saved to:\n{path}")
     except Exception as e:
         messagebox.showerror("Backup Failed", str(e))
+        return
+    status_var.set("Backup: saving...")
+
+    def _run():
+        # Off the Tk thread: flush() waits for the write-behind worker
+        try:
+            writes.flush()
+            db.checkpoint()
+            shutil.copy2(DB_NAME, path)
+        except Exception as e:
+            error = str(e)
+            run_in_ui(lambda: messagebox.showerror("Backup Failed", error))
+            return
+        run_in_ui(lambda: (status_var.set("Backup complete"),
+                           messagebox.showinfo("Backup Complete", f"Database backup saved to:\n{path}")))
+
+    threading.Thread(target=_run, daemon=True).start()
 
 def restore_database():
     path = filedialog.askopenfilename(
@@ -1817,17 +2630,36 @@ def restore_database():
         "This will replace your current database.\n\nContinue?",
     ):
         return
-    try:
-        shutil.copy2(path, DB_NAME)
-        init_db()
-        load_todo_data_from_db()
-        # Reload views
-        refresh_links()
-        refresh_notes()
-        refresh_todo_tree()
-        messagebox.showinfo("Restore Complete", "Database restored successfully.")
-    except Exception as e:
-        messagebox.showerror("Restore Failed", str(e))
+    status_var.set("Restore: replacing database...")
+
+    def _reload():
+        try:
+            invalidate_note_cache()
+            init_db()
+            load_todo_data_from_db()
+            # Reload views
+            refresh_links()
+            refresh_notes()
+            refresh_todo_tree()
+            status_var.set("Restore complete")
+            messagebox.showinfo("Restore Complete", "Database restored successfully.")
+        except Exception as e:
+            messagebox.showerror("Restore Failed", str(e))
+
+    def _run():
+        # Off the Tk thread: paused() waits for the write-behind worker
+        try:
+            tmp = DB_NAME + ".restore.tmp"
+            shutil.copy2(path, tmp)
+            with writes.paused():
+                db.replace_file(tmp)
+        except Exception as e:
+            error = str(e)
+            run_in_ui(lambda: messagebox.showerror("Restore Failed", error))
+            return
+        run_in_ui(_reload)
+
+    threading.Thread(target=_run, daemon=True).start()
 
 def open_settings_window():
     win = tk.Toplevel(root)
@@ -1888,6 +2720,13 @@ def open_settings_window():
     tk.Radiobutton(theme_frame, text="Light", value="light", variable=theme_var, bg="white").pack(anchor="w")
     tk.Radiobutton(theme_frame, text="Dark", value="dark", variable=theme_var, bg="white").pack(anchor="w")
 
+    # Archive
+    archive_frame = tk.LabelFrame(container, text="Archive", font=("Segoe UI", 10, "bold"), bg="white", fg="#111", padx=12, pady=10)
+    archive_frame.pack(fill="x", pady=(0, 10))
+    tk.Label(archive_frame, text="Archive completed tasks after (hours):", bg="white").grid(row=0, column=0, sticky="w")
+    archive_hours_var = tk.StringVar(value=str(settings.get("archive_after_hours", 12)))
+    tk.Entry(archive_frame, textvariable=archive_hours_var, width=10).grid(row=0, column=1, sticky="w", padx=(10, 0))
+
     # Sync
     sync_frame = tk.LabelFrame(container, text="Server Sync (optional)", font=("Segoe UI", 10, "bold"), bg="white", fg="#111", padx=12, pady=10)
     sync_frame.pack(fill="x", pady=(0, 10))
@@ -2020,6 +2859,7 @@ def open_settings_window():
             port = 21
         password = ftp_pass_var.get()
         try:
+            import ftplib
             ftp = ftplib.FTP()
             ftp.connect(host, port, timeout=5)
             ftp.login(user, password)
@@ -2030,7 +2870,8 @@ def open_settings_window():
             _set_test_status(f"FTP error: {e}", "#dc3545")
 
     def _test_s3_connection():
-        if not S3_AVAILABLE:
+        boto3 = load_boto3()
+        if boto3 is None:
             _set_test_status("S3: boto3 not installed.", "#dc3545")
             return
         bucket = s3_bucket_var.get().strip()
@@ -2122,6 +2963,10 @@ def open_settings_window():
             settings["sync_interval_sec"] = max(10, int(interval_var.get()))
         except ValueError:
             settings["sync_interval_sec"] = 60
+        try:
+            settings["archive_after_hours"] = max(0.0, float(archive_hours_var.get()))
+        except ValueError:
+            settings["archive_after_hours"] = 12
         save_settings(settings)
         apply_theme()
         win.destroy()
@@ -2129,12 +2974,81 @@ def open_settings_window():
     tk.Button(btns, text="Close", command=win.destroy, bg="#6c757d", fg="white", padx=12, pady=5).pack(side="left")
     tk.Button(btns, text="Save", command=save_and_close, bg="#28a745", fg="white", padx=12, pady=5).pack(side="right")
 
+def open_archive_browser():
+    """Browse archived tasks newest first, one keyset page at a time."""
+    win = tk.Toplevel(root)
+    # Create hidden first to avoid visible "jump" animation, then center and show
+    win.withdraw()
+    win.title("Archived Tasks")
+    win.config(bg="white")
+    set_window_icon(win)
+    center_window_relative_to_parent(win, 820, 520)
+    win.deiconify()
+    win.transient(root)
+
+    container = tk.Frame(win, bg="white", padx=15, pady=10)
+    container.pack(fill="both", expand=True)
+    header_var = tk.StringVar(value="🗄️ Archived Tasks")
+    tk.Label(container, textvariable=header_var, bg="white", fg="#111",
+             font=("Segoe UI", 14, "bold"), anchor="w").pack(fill="x", pady=(0, 8))
+
+    tree_frame = tk.Frame(container, bg="white")
+    tree_frame.pack(fill="both", expand=True)
+    tree = ttk.Treeview(tree_frame, columns=("task", "done", "deadline", "created"),
+                        show="headings", selectmode="browse")
+    tree.heading("task", text="Task")
+    tree.heading("done", text="Completed")
+    tree.heading("deadline", text="Deadline")
+    tree.heading("created", text="Created")
+    tree.column("task", width=360, anchor="w", stretch=True)
+    tree.column("done", width=150, anchor="center", stretch=False)
+    tree.column("deadline", width=130, anchor="center", stretch=False)
+    tree.column("created", width=150, anchor="center", stretch=False)
+    scroll = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=scroll.set)
+    tree.pack(side="left", fill="both", expand=True)
+    scroll.pack(side="right", fill="y")
+
+    cursor = {"after": None, "shown": 0, "done": False}
+
+    def load_next_page():
+        if cursor["done"]:
+            return
+        rows = page_archive(db, cursor["after"])
+        for row_id, uuid_val, task_text, done_at, deadline, created_at, _archived_at in rows:
+            tree.insert("", "end", iid=str(row_id),
+                        values=(task_text, done_at or "-", deadline or "-", created_at or "-"))
+        if rows:
+            cursor["after"] = (rows[-1][3], rows[-1][0])
+            cursor["shown"] += len(rows)
+        if len(rows) < ARCHIVE_PAGE_SIZE:
+            cursor["done"] = True
+            more_btn.config(state="disabled")
+        header_var.set(f"🗄️ Archived Tasks ({cursor['shown']} shown)")
+
+    def on_scroll(first, last):
+        scroll.set(first, last)
+        # Fetch the next page as the user reaches the bottom
+        if float(last) >= 0.98 and not cursor["done"]:
+            win.after_idle(load_next_page)
+
+    tree.configure(yscrollcommand=on_scroll)
+
+    btns = tk.Frame(container, bg="white")
+    btns.pack(fill="x", pady=(10, 0))
+    tk.Button(btns, text="Close", command=win.destroy, bg="#6c757d", fg="white", padx=12, pady=5).pack(side="left")
+    more_btn = tk.Button(btns, text="Load more", command=load_next_page, bg="#0d6efd", fg="white", padx=12, pady=5)
+    more_btn.pack(side="right")
+
+    load_next_page()
+
 menubar = tk.Menu(root)
 file_menu = tk.Menu(menubar, tearoff=0)
 file_menu.add_command(label="Backup Database...", command=backup_database)
 file_menu.add_command(label="Restore Database...", command=restore_database)
+file_menu.add_command(label="Import Tasks from CSV...", command=import_tasks_from_csv)
 file_menu.add_separator()
-file_menu.add_command(label="Exit", command=root.destroy)
+file_menu.add_command(label="Exit", command=lambda: on_app_exit())
 menubar.add_cascade(label="File", menu=file_menu)
 
 def open_mysql_backup_gui():
@@ -2224,6 +3138,7 @@ def open_ossl_automation():
 tools_menu = tk.Menu(menubar, tearoff=0)
 tools_menu.add_command(label="Sync Now", command=lambda: sync_once_async())
 tools_menu.add_command(label="Settings...", command=open_settings_window)
+tools_menu.add_command(label="Archived Tasks...", command=open_archive_browser)
 tools_menu.add_separator()
 tools_menu.add_command(label="MySQL Backup Tool...", command=open_mysql_backup_gui)
 tools_menu.add_command(label="Otithee Automation...", command=open_otithee_automation)
@@ -2246,17 +3161,8 @@ status_label_bar.pack(side="left", padx=10, pady=4)
 def update_status_bar():
     try:
         total = len(todo_data)
-        done_count = 0
-        overdue_count = 0
-        for uuid_val, row in todo_data.items():
-            done_bool = bool(row.get("done"))
-            if done_bool:
-                done_count += 1
-            deadline_raw = str(row.get("deadline") or "")
-            if deadline_raw:
-                _, _, is_overdue = _deadline_status(deadline_raw)
-                if is_overdue and not done_bool:
-                    overdue_count += 1
+        done_count = todo_counts["done"]
+        overdue_count = todo_counts["overdue"]
         sync_txt = "Sync: ON" if settings.get("sync_enabled") else "Sync: OFF"
         status_var.set(f"Tasks: {total} | Done: {done_count} | Overdue: {overdue_count} | {sync_txt} | DB: {DB_NAME}")
     except Exception:
@@ -2310,10 +3216,22 @@ ampm_label = tk.Label(datetime_frame, text="", font=("Segoe UI", 12, "bold"),
                       bg="#eaf4fc", fg="#28a745")
 ampm_label.pack(pady=(0, 5))
 
+_bd_timezone = None
+
+def get_bd_timezone():
+    """Asia/Dhaka tzinfo; pytz is imported on first use (fixed UTC+6 if it's missing)."""
+    global _bd_timezone
+    if _bd_timezone is None:
+        try:
+            import pytz
+            _bd_timezone = pytz.timezone('Asia/Dhaka')
+        except ImportError:
+            _bd_timezone = timezone(timedelta(hours=6), "Asia/Dhaka")
+    return _bd_timezone
+
 def update_datetime():
     # Get Bangladesh time
-    bd_timezone = pytz.timezone('Asia/Dhaka')
-    bd_time = datetime.now(bd_timezone)
+    bd_time = datetime.now(get_bd_timezone())
     
     # Update date in format: "Tuesday, July 29, 2025"
     date_label.config(text=bd_time.strftime("%A, %B %d, %Y"))
@@ -2346,23 +3264,31 @@ tk.Button(links_title_frame, text="➕ Add New Link", command=add_link_window,
           padx=10, pady=4).pack(side="right")
 
 # Create links listbox for reordering
-links_listbox = create_scrolled_listbox(left_frame, 
+links_listbox = create_virtual_list(left_frame,
                           font=("Segoe UI", 13),
                           height=8, selectbackground="#007bff",
-                          selectforeground="white", relief="flat",
+                          selectforeground="white",
                           bg="#f8f9fa",
+                          on_activate=open_link_by_id,
+                          on_context=lambda key, e: link_menu.tk_popup(e.x_root, e.y_root),
                           padx=15, pady=(0,15))
 
+# One context menu shared by every link row (acts on the selected row)
+link_menu = tk.Menu(links_listbox, tearoff=0)
+link_menu.add_command(label="Open", command=lambda: open_link_by_id(links_listbox.selected_key()))
+link_menu.add_separator()
+link_menu.add_command(label="Delete", command=lambda: delete_and_refresh_link(links_listbox.selected_key()))
+
 # Add reorder buttons for links
 links_button_frame = tk.Frame(left_frame, bg="white")
 links_button_frame.pack(pady=(0, 10))
 
 tk.Button(links_button_frame, text="⬆️ Move Up", 
-          command=lambda: move_up(links_listbox, lambda x: None, update_link_order, []),
+          command=lambda: move_list_item(links_listbox, "links", -1),
           font=("Segoe UI", 9), bg="#6c757d", fg="white",
           padx=8, pady=4).pack(side="left", padx=5)
 tk.Button(links_button_frame, text="⬇️ Move Down", 
-          command=lambda: move_down(links_listbox, lambda x: None, update_link_order, []),
+          command=lambda: move_list_item(links_listbox, "links", 1),
           font=("Segoe UI", 9), bg="#6c757d", fg="white",
           padx=8, pady=4).pack(side="left", padx=5)
 
@@ -2380,7 +3306,8 @@ todo_search_var = tk.StringVar(value="")
 search_entry = tk.Entry(todo_title_frame, textvariable=todo_search_var,
                         font=("Segoe UI", 10), relief="solid", bd=1, bg="#f8f9fa")
 search_entry.pack(side="left", padx=(12, 8), fill="x", expand=True, ipady=6)
-search_entry.insert(0, "Search tasks...")
+SEARCH_PLACEHOLDER = "Search tasks, notes, links..."
+search_entry.insert(0, SEARCH_PLACEHOLDER)
 search_placeholder_active = True
 
 def _search_focus_in(_e):
@@ -2394,7 +3321,7 @@ def _search_focus_out(_e):
     global search_placeholder_active
     if not search_entry.get().strip():
         search_entry.delete(0, tk.END)
-        search_entry.insert(0, "Search tasks...")
+        search_entry.insert(0, SEARCH_PLACEHOLDER)
         search_entry.config(fg="#888")
         search_placeholder_active = True
 
@@ -2402,39 +3329,114 @@ search_entry.config(fg="#888")
 search_entry.bind("<FocusIn>", _search_focus_in)
 search_entry.bind("<FocusOut>", _search_focus_out)
 
+SEARCH_KIND_LABELS = {"todo": "✅ Task", "archive": "🗄️ Archived", "note": "📝 Note", "link": "🔗 Link"}
+SEARCH_RESULT_LIMIT = 200
+
+search_results_window = None
+search_results_listbox = None
+search_results_header_var = None
+search_results_hits: list = []
+
 def find_next_task(event=None):
+    """
+    Ranked full-text search (FTS5) over tasks, archive, notes and links.
+    Lists every hit in the results panel and jumps to the next matching task,
+    so repeated Enter presses cycle through task hits.
+    """
     query = todo_search_var.get().strip()
     if search_placeholder_active or not query:
         return
-    query_l = query.lower()
-    children = list(todo_tree.get_children()) if "todo_tree" in globals() else []
-    start_idx = 0
+    hits = search_items(db, query, limit=SEARCH_RESULT_LIMIT)
+    show_search_results(query, hits)
+    todo_hits = [ref for kind, ref, _title, _snippet in hits if kind == "todo" and ref in todo_data]
+    if not todo_hits:
+        return
     cur = get_selected_todo_uuid()
-    if cur and cur in children:
-        start_idx = children.index(cur) + 1
-    # wrap-around scan
-    for pass_idx in range(2):
-        rng = range(start_idx, len(children)) if pass_idx == 0 else range(0, start_idx)
-        for idx in rng:
-            uuid_val = children[idx]
-            row = todo_data.get(uuid_val, {})
-            hay = f"{row.get('task','')} {row.get('deadline','')} {row.get('created_at','')}".lower()
-            if query_l in hay:
-                todo_tree.selection_set(uuid_val)
-                todo_tree.see(uuid_val)
-                return
+    next_idx = (todo_hits.index(cur) + 1) % len(todo_hits) if cur in todo_hits else 0
+    jump_to_search_hit("todo", todo_hits[next_idx])
+
+def show_search_results(query: str, hits: list):
+    """Create (once) and fill the non-modal search results panel."""
+    global search_results_window, search_results_listbox, search_results_header_var, search_results_hits
+    search_results_hits = hits
+    if search_results_window is None or not search_results_window.winfo_exists():
+        win = tk.Toplevel(root)
+        # Create hidden first to avoid visible "jump" animation, then center and show
+        win.withdraw()
+        win.title("Search Results")
+        win.config(bg="white")
+        set_window_icon(win)
+        center_window_relative_to_parent(win, 620, 420)
+        win.deiconify()
+        win.transient(root)
+
+        container = tk.Frame(win, bg="white", padx=15, pady=10)
+        container.pack(fill="both", expand=True)
+        search_results_header_var = tk.StringVar(value="")
+        tk.Label(container, textvariable=search_results_header_var, bg="white", fg="#111",
+                 font=("Segoe UI", 12, "bold"), anchor="w").pack(fill="x", pady=(0, 8))
+        search_results_listbox = create_scrolled_listbox(container,
+                                  font=("Segoe UI", 11),
+                                  selectbackground="#007bff",
+                                  selectforeground="white", relief="flat",
+                                  bg="#f8f9fa")
+        search_results_listbox.bind("<Double-Button-1>", lambda e: jump_to_selected_search_result())
+        search_results_listbox.bind("<Return>", lambda e: jump_to_selected_search_result())
+        tk.Label(container, text="💡 Double-click or Enter to open a result",
+                 font=("Segoe UI", 8), bg="white", fg="#666").pack(anchor="w", pady=(6, 0))
+        search_results_window = win
+
+    search_results_header_var.set(f"🔎 {len(hits)} result(s) for \"{query}\"")
+    search_results_listbox.delete(0, tk.END)
+    for kind, _ref, title, snippet in hits:
+        label = SEARCH_KIND_LABELS.get(kind, kind)
+        line = f"{label}: {title}"
+        if "[" in snippet:  # body matched too: show the highlighted excerpt
+            line += f"  —  {snippet.strip()}"
+        search_results_listbox.insert(tk.END, line.replace("\n", " "))
+
+def jump_to_selected_search_result():
+    sel = search_results_listbox.curselection() if search_results_listbox is not None else ()
+    if sel and sel[0] < len(search_results_hits):
+        kind, ref, _title, _snippet = search_results_hits[sel[0]]
+        jump_to_search_hit(kind, ref)
+
+def jump_to_search_hit(kind: str, ref):
+    """Bring a search hit into view: select the task/link, open the note, show the archived task."""
+    if kind == "todo":
+        if ref in todo_data:
+            todo_tree.selection_set(ref)
+            todo_tree.see(ref)
+        else:
+            status_var.set("Search: task no longer in the list (archived or deleted)")
+    elif kind in ("note", "link"):
+        vlist = notes_listbox if kind == "note" else links_listbox
+        idx = vlist.index_of_key(ref)
+        if idx is not None:
+            vlist.selection_set(idx)
+            vlist.see(idx)
+            if kind == "note":
+                view_note(note_id=ref)
+    elif kind == "archive":
+        row = db.query_one("SELECT task, done_at, deadline, created_at FROM archive_todos WHERE uuid = ?", (ref,))
+        if row:
+            task_text, done_at, deadline, created_at = row
+            messagebox.showinfo(
+                "Archived Task",
+                f"{task_text}\n\nCreated: {created_at or '-'}\nDeadline: {deadline or '-'}\nCompleted: {done_at or '-'}",
+            )
 
 search_entry.bind("<Return>", find_next_task)
 
 # Add timer button with better feedback
 def add_timer_with_check():
-    sel = get_selected_todo_uuid()
-    if not sel:
+    selected = get_selected_todo_uuids()
+    if not selected:
         messagebox.showwarning("No Task Selected", 
                              "Please select a task first before adding a timer.\n\n"
                              "Click on any task in the list to select it.")
         return
-    add_timer_window(sel)
+    add_timer_window(uuids=selected)
 
 # Add timer button
 tk.Button(todo_title_frame, text="⏰ Add Timer", command=add_timer_with_check,
@@ -2448,7 +3450,7 @@ todo_tree = ttk.Treeview(
     todo_tree_frame,
     columns=("status", "task", "created", "deadline", "left"),
     show="headings",
-    selectmode="browse",
+    selectmode="extended",
 )
 todo_tree.heading("status", text="✓")
 todo_tree.heading("task", text="Task")
@@ -2466,6 +3468,9 @@ style = ttk.Style()
 style.configure("Treeview", font=("Segoe UI", 13))
 style.configure("Treeview.Heading", font=("Segoe UI", 13, "bold"))
 
+todo_reconciler = TreeviewReconciler(todo_tree)
+_configure_todo_tree_tags()
+
 todo_tree_scroll = ttk.Scrollbar(todo_tree_frame, orient="vertical", command=todo_tree.yview)
 todo_tree.configure(yscrollcommand=todo_tree_scroll.set)
 todo_tree_scroll.pack(side="right", fill="y")
@@ -2500,6 +3505,8 @@ todo_tree.bind("<KeyPress-Delete>", on_todo_key)
 todo_tree.bind("<KeyPress-space>", on_todo_key)
 todo_tree.bind("<KeyPress-Up>", on_todo_key)
 todo_tree.bind("<KeyPress-Down>", on_todo_key)
+todo_tree.bind("<Control-a>", select_all_todos)
+todo_tree.bind("<Control-v>", paste_import_tasks)
 
 # Right-click context menu (edit / clear timer / delete)
 todo_menu = tk.Menu(todo_tree, tearoff=0)
@@ -2603,14 +3610,14 @@ def edit_selected_task():
     task_text_area.config(yscrollcommand=text_scrollbar.set)
     
     # Insert current task text
-    current_task = str(row.get("task") or "")
+    current_task = row.task
     task_text_area.insert("1.0", current_task)
     
     # Status Section (Done checkbox)
     status_section = tk.Frame(container, bg="#f5f7fa")
     status_section.pack(fill="x", pady=(0, 20))
     
-    done_var = tk.BooleanVar(value=bool(row.get("done", False)))
+    done_var = tk.BooleanVar(value=row.done)
     done_checkbox = tk.Checkbutton(status_section, text="Task Completed", 
                                    variable=done_var, bg="#f5f7fa", 
                                    font=("Segoe UI", 11, "bold"), fg="#333",
@@ -2625,7 +3632,7 @@ def edit_selected_task():
     tk.Label(created_section, text="Created Date", bg="#f5f7fa", font=("Segoe UI", 10, "bold"), 
              fg="#555", anchor="w").pack(fill="x", pady=(0, 8))
     
-    created_at_str = str(row.get("created_at") or now_ts())
+    created_at_str = row.created_at or now_ts()
     try:
         created_dt = datetime.strptime(created_at_str, TS_FMT)
         created_display = created_dt.strftime("%Y-%m-%d %H:%M:%S")
@@ -2645,7 +3652,7 @@ def edit_selected_task():
     deadline_section.pack(fill="x", pady=(0, 20))
     
     # Parse existing deadline if any
-    deadline_raw = str(row.get("deadline") or "")
+    deadline_raw = row.deadline
     deadline_date_str = ""
     deadline_hour = 12
     deadline_minute = 0
@@ -2750,7 +3757,7 @@ def edit_selected_task():
     done_at_frame = tk.Frame(container, bg="#f5f7fa")
     done_at_frame.pack(fill="x", pady=(0, 20))
     
-    done_at_str = str(row.get("done_at") or "")
+    done_at_str = row.done_at
     if done_at_str:
         try:
             done_at_dt = datetime.strptime(done_at_str, TS_FMT)
@@ -2781,14 +3788,14 @@ def edit_selected_task():
                 return
             
             # Update task data
-            row["task"] = new_task_text
-            row["done"] = bool(done_var.get())
+            row.task = new_task_text
+            row.done = bool(done_var.get())
             
             # Update done_at
-            if row["done"] and not row.get("done_at"):
-                row["done_at"] = now_ts()
-            elif not row["done"]:
-                row["done_at"] = ""
+            if row.done and not row.done_at:
+                row.done_at = now_ts()
+            elif not row.done:
+                row.done_at = ""
             
             # Update created_at if changed
             try:
@@ -2796,7 +3803,7 @@ def edit_selected_task():
                 if new_created_str:
                     # Validate format
                     datetime.strptime(new_created_str, "%Y-%m-%d %H:%M:%S")
-                    row["created_at"] = new_created_str
+                    row.created_at = new_created_str
             except ValueError:
                 status_label.config(text="❌ Invalid created date format. Use: YYYY-MM-DD HH:MM:SS", fg="#dc3545", bg="#f5f7fa")
                 status_label.pack(pady=(0, 15))
@@ -2823,16 +3830,17 @@ def edit_selected_task():
                     deadline_raw = f"{deadline_date} {time_str}"
                     # Validate format
                     datetime.strptime(deadline_raw, DEADLINE_RAW_FMT)
-                    row["deadline"] = deadline_raw
+                    row.deadline = deadline_raw
                 except ValueError:
                     status_label.config(text="❌ Invalid deadline format. Use: YYYY-MM-DD for date", fg="#dc3545", bg="#f5f7fa")
                     status_label.pack(pady=(0, 15))
                     return
             else:
-                row["deadline"] = ""
+                row.deadline = ""
             
             # Save to data structure
             todo_data[uuid_val] = row
+            mark_todo_dirty(uuid_val)
             refresh_todo_tree(selection_uuid=uuid_val)
             persist_todos_to_db(list(todo_tree.get_children()))
             update_status_bar()
@@ -2877,26 +3885,25 @@ def edit_selected_task():
     task_text_area.select_range("1.0", tk.END)
 
 def clear_selected_timer():
-    uuid_val = get_selected_todo_uuid()
-    if not uuid_val or uuid_val not in todo_data:
-        return
-    row = todo_data[uuid_val]
-    row["deadline"] = ""
-    todo_data[uuid_val] = row
-    refresh_todo_tree(selection_uuid=uuid_val)
-    persist_todos_to_db(list(todo_tree.get_children()))
+    set_tasks_deadline(get_selected_todo_uuids(), "")
 
 todo_menu.add_command(label="Toggle Done", command=toggle_task)
+todo_menu.add_command(label="Mark Done", command=lambda: mark_selected_done(True))
+todo_menu.add_command(label="Mark Not Done", command=lambda: mark_selected_done(False))
 todo_menu.add_command(label="Set Timer...", command=add_timer_with_check)
 todo_menu.add_command(label="Clear Timer", command=clear_selected_timer)
 todo_menu.add_separator()
 todo_menu.add_command(label="Edit Task...", command=edit_selected_task)
-todo_menu.add_command(label="Delete Task", command=delete_task)
+todo_menu.add_command(label="Archive Completed", command=archive_selected_tasks)
+todo_menu.add_command(label="Delete Task(s)", command=delete_task)
+todo_menu.add_separator()
+todo_menu.add_command(label="Select All", command=select_all_todos)
+todo_menu.add_command(label="Paste Tasks", command=paste_import_tasks)
 
 def show_todo_menu(event):
     try:
         row_id = todo_tree.identify_row(event.y)
-        if row_id:
+        if row_id and row_id not in todo_tree.selection():
             todo_tree.selection_set(row_id)
     except Exception:
         pass
@@ -2924,27 +3931,57 @@ tk.Button(button_frame, text="🗑️ Delete Task", command=delete_task,
           padx=10, pady=4).pack(side="left", padx=5)
 
 # Add reorder buttons for todo tree
-def move_todo_up():
-    sel = get_selected_todo_uuid()
-    if not sel:
+def rebalance_todo_order(ordered_uuids: list[str]):
+    """
+    Respace every todo's order_index along ordered_uuids (in memory, immediately)
+    and queue the n UPDATEs on the write-behind thread. Persists queued later
+    are committed after it, so they still win for the rows they touch.
+    """
+    for pos, uuid_val in enumerate(ordered_uuids):
+        todo_data[uuid_val].order_index = (pos + 1) * ORDER_GAP
+    keys = [(row.order_index, u) for u, row in todo_data.items()]
+    writes.submit(lambda c: c.executemany("UPDATE todos SET order_index = ? WHERE uuid = ?", keys))
+
+def move_todo(step: int):
+    """
+    Move the selected task(s) up (-1) or down (+1) one row. Only rows whose
+    key no longer fits their new place are rewritten (usually one per block).
+    """
+    selected = set(get_selected_todo_uuids())
+    if not selected:
         return
     children = list(todo_tree.get_children())
-    if sel in children:
-        idx = children.index(sel)
-        if idx > 0:
-            todo_tree.move(sel, "", idx - 1)
-            persist_todos_to_db(list(todo_tree.get_children()))
+    positions = [i for i, u in enumerate(children) if u in selected]
+    order = children[:]
+    for i in (positions if step < 0 else reversed(positions)):
+        j = i + step
+        if 0 <= j < len(order) and order[j] not in selected:
+            order[i], order[j] = order[j], order[i]
+    first = max(positions[0] - 1, 0)
+    last = min(positions[-1] + 1, len(order) - 1)
+    span = order[first:last + 1]
+    if span == children[first:last + 1]:
+        return  # already at the top/bottom
+    lo = todo_data[order[first - 1]].order_index if first > 0 else None
+    hi = todo_data[order[last + 1]].order_index if last + 1 < len(order) else None
+    keys = plan_order_keys([todo_data[u].order_index for u in span], lo, hi)
+    for index in range(first, last + 1):
+        if order[index] != children[index]:
+            todo_tree.move(order[index], "", index)
+    if keys is None:  # gap used up
+        rebalance_todo_order(order)
+        return
+    for uuid_val, key in zip(span, keys):
+        if todo_data[uuid_val].order_index != key:
+            todo_data[uuid_val].order_index = key
+            mark_todo_dirty(uuid_val)
+    persist_todos_to_db()
+
+def move_todo_up():
+    move_todo(-1)
 
 def move_todo_down():
-    sel = get_selected_todo_uuid()
-    if not sel:
-        return
-    children = list(todo_tree.get_children())
-    if sel in children:
-        idx = children.index(sel)
-        if idx < len(children) - 1:
-            todo_tree.move(sel, "", idx + 1)
-            persist_todos_to_db(list(todo_tree.get_children()))
+    move_todo(1)
 
 tk.Button(button_frame, text="⬆️ Move Up", 
           command=move_todo_up,
@@ -2974,24 +4011,32 @@ tk.Button(title_frame, text="➕ Add New Note", command=add_note_window,
           bg="#007bff", fg="white", font=("Segoe UI", 9),
           padx=10, pady=4).pack(side="right")
 
-notes_listbox = create_scrolled_listbox(notes_frame, 
+notes_listbox = create_virtual_list(notes_frame,
                           font=("Segoe UI", 13),
                           height=8, selectbackground="#007bff",
-                          selectforeground="white", relief="flat",
+                          selectforeground="white",
                           bg="#f8f9fa",
+                          on_activate=lambda note_id: view_note(note_id=note_id),
+                          on_context=lambda key, e: note_menu.tk_popup(e.x_root, e.y_root),
                           padx=15, pady=(0,15))
-notes_listbox.bind("<Double-Button-1>", view_note)
+
+# One context menu shared by every note row (acts on the selected row)
+note_menu = tk.Menu(notes_listbox, tearoff=0)
+note_menu.add_command(label="Open", command=lambda: view_note())
+note_menu.add_command(label="Edit", command=lambda: edit_note_window(notes_listbox.selected_key()))
+note_menu.add_separator()
+note_menu.add_command(label="Delete", command=lambda: delete_and_refresh_note(notes_listbox.selected_key()))
 
 # Add reorder buttons for notes
 notes_button_frame = tk.Frame(notes_frame, bg="white")
 notes_button_frame.pack(pady=(0, 10))
 
 tk.Button(notes_button_frame, text="⬆️ Move Up", 
-          command=lambda: move_up(notes_listbox, lambda x: None, update_note_order, []),
+          command=lambda: move_list_item(notes_listbox, "notes", -1),
           font=("Segoe UI", 9), bg="#6c757d", fg="white",
           padx=8, pady=4).pack(side="left", padx=5)
 tk.Button(notes_button_frame, text="⬇️ Move Down", 
-          command=lambda: move_down(notes_listbox, lambda x: None, update_note_order, []),
+          command=lambda: move_list_item(notes_listbox, "notes", 1),
           font=("Segoe UI", 9), bg="#6c757d", fg="white",
           padx=8, pady=4).pack(side="left", padx=5)
 
@@ -3000,32 +4045,72 @@ def start_timer_updates():
     update_timers()  # Run immediately
     # The update_timers function now schedules itself every 1 second for blinking
 
-# Load saved todos into the table
-load_todo_data_from_db()
-refresh_todo_tree()
+dashboard_hydrated = False
 
-update_status_bar()
+def hydrate_dashboard():
+    """Open/migrate the DB and load all data into the (already painted) window."""
+    global dashboard_hydrated
+    if dashboard_hydrated:
+        return
+    dashboard_hydrated = True
 
-# Run initial timer update to format existing deadlines
-root.after(1000, update_timers)
+    # Worker threads hand results to the Tk thread through ui_calls
+    poll_ui_calls()
 
-# Auto-select first task if available
-try:
-    children = list(todo_tree.get_children())
-    if children:
-        todo_tree.selection_set(children[0])
-        todo_tree.see(children[0])
-except Exception:
-    pass
+    with startup_phase("init_db"):
+        init_db()
+
+    with startup_phase("load + render todos"):
+        # Load saved todos into the table
+        load_todo_data_from_db()
+        refresh_todo_tree()
+        update_status_bar()
+
+    # Auto-select first task if available
+    try:
+        children = list(todo_tree.get_children())
+        if children:
+            todo_tree.selection_set(children[0])
+            todo_tree.see(children[0])
+    except Exception:
+        pass
+
+    with startup_phase("load links + notes"):
+        refresh_links()
+        refresh_notes()
+
+    # Start the datetime update
+    update_datetime()
+
+    # Start timer updates
+    start_timer_updates()
+
+    # Start optional auto-sync loop
+    root.after(2000, schedule_auto_sync)
 
-refresh_links()
-refresh_notes()
+    # Start background archiving of old completed tasks
+    root.after(5000, schedule_archiver)
 
-# Start timer updates
-start_timer_updates()
+    # Vacuum/ANALYZE the DB once the user has been idle for a while
+    root.bind_all("<KeyPress>", note_user_input, add="+")
+    root.bind_all("<ButtonPress>", note_user_input, add="+")
+    root.after(MAINTENANCE_CHECK_MS, schedule_maintenance)
 
-# Start optional auto-sync loop
-root.after(2000, schedule_auto_sync)
+    report_startup_profile()
+
+def _on_first_map(event):
+    """Window is on screen: record time to first paint, then hydrate on the next tick."""
+    if event.widget is not root or dashboard_hydrated:
+        return
+    root.unbind("<Map>")
+    root.update_idletasks()
+    if PROFILE_STARTUP:
+        startup_timings.append(("first paint (since start)", time.perf_counter() - _startup_t0))
+    root.after(1, hydrate_dashboard)
+
+root.bind("<Map>", _on_first_map)
+# Fallback in case the window is never mapped (e.g. started minimized)
+root.after(1500, hydrate_dashboard)
 
 # Developer credit in footer
 footer_frame = tk.Frame(scrollable_frame, bg="#eaf4fc")
@@ -3049,58 +4134,16 @@ credit_link.bind("<Button-1>", open_profile)
 credit_link.bind("<Enter>", lambda e: credit_link.config(fg="#0056b3"))
 credit_link.bind("<Leave>", lambda e: credit_link.config(fg="#007bff"))
 
-# Test sound function for debugging
-def play_sound_background():
-    """Test function to debug sound playback"""
-    try:
-        sound_file = resource_path("assets", "overdue.mp3")
-        if os.path.exists(sound_file):
-            print(f"Testing sound playback: {sound_file}")  # Debug print
-            full_path = os.path.abspath(sound_file)
-            print(f"Full path: {full_path}")
-            
-            # Use threading to play sound in background
-            def play_sound_thread():
-                try:
-                    # Method 1: Try using playsound in background
-                    playsound(sound_file, block=False)
-                    print("Test: Sound should have played using playsound in background")
-                except Exception as e:
-                    print(f"Test: Playsound failed: {e}")
-                    try:
-                        # Method 2: Try using subprocess with start command
-                        subprocess.Popen(['start', full_path], shell=True, 
-                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                        print("Test: Sound should have played using 'start' command")
-                    except Exception as e:
-                        print(f"Test: Start command failed: {e}")
-                        try:
-                            # Method 3: Fallback to system sound (Windows only)
-                            if winsound:
-                                winsound.PlaySound("SystemExclamation", winsound.SND_ALIAS)
-                                print("Test: Sound should have played using winsound")
-                            else:
-                                print("Test: winsound not available on this platform")
-                        except Exception as e:
-                            print(f"Test: Winsound failed: {e}")
-                            pass
-            
-            # Start sound in background thread
-            threading.Thread(target=play_sound_thread, daemon=True).start()
-        else:
-            print(f"Test: Sound file not found: {sound_file}")
-    except Exception as e:
-        print(f"Test: Sound test error: {e}")
+def play_test_sound():
+    """Play the overdue sound once through the shared alert worker."""
+    overdue_alerts.play()
 
 # Add a test button for sound (temporary, for debugging)
 test_frame = tk.Frame(scrollable_frame, bg="#eaf4fc")
 test_frame.pack(fill="x", pady=(0, 10))
-tk.Button(test_frame, text="🔊 Test Sound", command=play_sound_background,
+tk.Button(test_frame, text="🔊 Test Sound", command=play_test_sound,
           bg="#ffc107", fg="black", font=("Segoe UI", 9),
           padx=10, pady=4).pack()
 
-# Start the datetime update
-update_datetime()
-
 # Start GUI loop
 root.mainloop()
@@ -0,0 +1,1059 @@
+#!/usr/bin/env python3
+"""
+Long-lived SQLite connection layer for the dashboard database (taskmask.db).
+
+Every helper in task.py used to open a fresh sqlite3 connection, run one
+statement, commit and close. This module keeps ONE connection open for the
+lifetime of the app instead:
+
+- WAL journal mode + synchronous=NORMAL: commits append to the -wal file and
+  do not fsync; only checkpoints do.
+- A larger page cache and in-memory temp store.
+- Statement reuse: sqlite3 caches prepared statements per connection keyed by
+  the SQL text, so keeping the connection alive (and the SQL strings constant)
+  means each query is compiled once.
+- transaction(): groups many writes into a single BEGIN/COMMIT.
+- run_maintenance(): incremental vacuum + ANALYZE, meant for idle time.
+- WriteBehind: a worker thread with its own connection that commits queued
+  writes in batches, so UI callbacks never wait on the disk.
+- changes_since() / apply_changes(): row-level delta sync driven by a
+  trigger-maintained changelog (see sync_server.py /api/push, /api/pull).
+- migrate(): versioned schema upgrades keyed on PRAGMA user_version.
+
+Usage patterns:
+    from taskmask_db import TaskmaskDB, migrate
+
+    db = TaskmaskDB("/path/to/taskmask.db")
+    migrate(db)  # once at startup and after swapping in another file
+    rows = db.query("SELECT id, name FROM links ORDER BY order_index")
+
+    with db.transaction() as conn:
+        conn.execute("UPDATE links SET order_index = ? WHERE id = ?", (1, 7))
+        conn.execute("UPDATE links SET order_index = ? WHERE id = ?", (2, 3))
+
+NOTE: With WAL enabled recent commits may live in "taskmask.db-wal". Call
+checkpoint() before reading the raw .db file (sync upload, hashing, backup)
+and replace_file() instead of os.replace() when swapping in a downloaded copy.
+"""
+
+import bisect
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+# Applied to every new connection, in order.
+PRAGMAS = (
+    ("auto_vacuum", "INCREMENTAL"),  # must precede WAL to apply to a new file
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", "-16000"),  # negative = KiB, so ~16 MB of page cache
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", "5000"),
+)
+
+# Size of sqlite3's per-connection prepared statement cache.
+STATEMENT_CACHE_SIZE = 256
+
+# Side files SQLite keeps next to the database in WAL mode.
+WAL_SUFFIXES = ("-wal", "-shm")
+
+
+class TaskmaskDB:
+    """Single shared connection to taskmask.db (safe to use from the sync thread)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        # Re-entrant so helpers can call query()/execute() inside transaction().
+        self._lock = threading.RLock()
+        self._tx_depth = 0
+
+    # ----------- CONNECTION -----------
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=5,
+            isolation_level=None,  # autocommit; transactions are explicit below
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for name, value in PRAGMAS:
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the shared connection, opening it on first use."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._open()
+            return self._conn
+
+    def close(self) -> None:
+        """Checkpoint the WAL into the main file and close the connection."""
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error:
+                pass
+            self._conn.close()
+            self._conn = None
+            self._tx_depth = 0
+
+    # ----------- TRANSACTIONS -----------
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        BEGIN IMMEDIATE ... COMMIT around the block (ROLLBACK on error).
+        Nested calls join the outermost transaction.
+        """
+        with self._lock:
+            conn = self.connection()
+            if self._tx_depth:
+                self._tx_depth += 1
+                try:
+                    yield conn
+                finally:
+                    self._tx_depth -= 1
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            self._tx_depth = 1
+            try:
+                yield conn
+            except BaseException:
+                self._tx_depth = 0
+                conn.execute("ROLLBACK")
+                raise
+            self._tx_depth = 0
+            conn.execute("COMMIT")
+
+    def execute(self, sql: str, params: Iterable = ()) -> sqlite3.Cursor:
+        """Run one write statement in its own (or the current) transaction."""
+        with self.transaction() as conn:
+            return conn.execute(sql, tuple(params))
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Iterable]) -> sqlite3.Cursor:
+        with self.transaction() as conn:
+            return conn.executemany(sql, seq_of_params)
+
+    def query(self, sql: str, params: Iterable = ()) -> list:
+        with self._lock:
+            return self.connection().execute(sql, tuple(params)).fetchall()
+
+    def query_one(self, sql: str, params: Iterable = ()) -> Optional[tuple]:
+        with self._lock:
+            return self.connection().execute(sql, tuple(params)).fetchone()
+
+    # ----------- FILE-LEVEL OPERATIONS (sync / backup / restore) -----------
+    def checkpoint(self) -> None:
+        """Fold the WAL into taskmask.db so the file on disk is complete."""
+        with self._lock:
+            if self._conn is not None and not self._tx_depth:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def replace_file(self, src_path: str) -> None:
+        """
+        Atomically replace taskmask.db with src_path (downloaded/restored copy).
+        The connection is closed first and reopened lazily on next use, so
+        no stale -wal/-shm from the old file is applied to the new one.
+        """
+        with self._lock:
+            self.close()
+            for suffix in WAL_SUFFIXES:
+                try:
+                    os.remove(self.path + suffix)
+                except FileNotFoundError:
+                    pass
+            os.replace(src_path, self.path)
+
+
+# ----------- WRITE-BEHIND QUEUE -----------
+# Writes submitted from the UI thread are queued and committed by one worker
+# thread on its own connection: a batch is everything that arrives within
+# `delay` seconds of the first write, in one transaction. In WAL mode the
+# shared TaskmaskDB connection keeps reading the last committed state while
+# a batch is being written.
+WRITE_BEHIND_DELAY = 0.05      # seconds to collect writes into one batch
+WRITE_BEHIND_MAX_BATCH = 1000  # writes per transaction
+
+_STOP = object()
+
+
+class _Write:
+    __slots__ = ("fn", "on_done", "on_error")
+
+    def __init__(self, fn, on_done, on_error):
+        self.fn = fn
+        self.on_done = on_done
+        self.on_error = on_error
+
+
+class WriteBehind:
+    """
+    Batching writer thread that owns a write connection to `path`.
+
+    submit(fn) queues fn(conn); once its batch commits, on_done(result) (or
+    on_error(exc)) is handed to `dispatch`, e.g. the put() of a queue the UI
+    thread drains, so acknowledgements run on the UI thread. dispatch runs on
+    the worker and must not block: flush(), paused() and close() wait for the
+    worker, so a dispatch that waits for the UI thread (root.after() from
+    another thread under threaded Tcl) deadlocks a UI thread that calls them.
+    A failed batch is retried one write per transaction so a single bad
+    write cannot drop the others.
+    """
+
+    def __init__(self, path: str, dispatch: Optional[Callable[[Callable[[], None]], Any]] = None,
+                 delay: float = WRITE_BEHIND_DELAY, max_batch: int = WRITE_BEHIND_MAX_BATCH):
+        self._db = TaskmaskDB(path)
+        self._dispatch = dispatch or (lambda fn: fn())
+        self.delay = delay
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Held by the worker while it writes and by paused() while the file is swapped
+        self._commit_lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, fn: Callable[[sqlite3.Connection], Any],
+               on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None) -> None:
+        """Queue fn(conn) for the next batch (non-blocking, thread-safe)."""
+        if self._closed:
+            raise RuntimeError("write-behind queue is closed")
+        self._ensure_worker()
+        self._queue.put(_Write(fn, on_done, on_error))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every write submitted so far is committed. False on timeout."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """
+        Flush, then hold off further commits and close the write connection
+        for the duration of the block (sync upload/download, restore). Writes
+        submitted meanwhile stay queued and go to the file present afterwards.
+        """
+        self.flush()
+        with self._commit_lock:
+            self._db.close()
+            yield
+
+    def close(self) -> None:
+        """Commit everything still queued, stop the worker and close its connection."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+        self._db.close()
+
+    # ----------- WORKER -----------
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> list:
+        """First queued item plus whatever follows within `delay`; stops at a flush/stop marker."""
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.delay
+        while isinstance(items[-1], _Write) and len(items) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self) -> None:
+        while True:
+            items = self._next_batch()
+            writes = [item for item in items if isinstance(item, _Write)]
+            if writes:
+                with self._commit_lock:
+                    self._commit(writes)
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if items[-1] is _STOP:
+                return
+
+    def _commit(self, writes: list) -> None:
+        try:
+            with self._db.transaction() as conn:
+                outcomes = [(w, w.fn(conn), None) for w in writes]
+        except Exception:
+            outcomes = []
+            for w in writes:
+                try:
+                    with self._db.transaction() as conn:
+                        outcomes.append((w, w.fn(conn), None))
+                except Exception as e:
+                    outcomes.append((w, None, e))
+        self._acknowledge(outcomes)
+
+    def _acknowledge(self, outcomes: list) -> None:
+        callbacks = []
+        for w, result, error in outcomes:
+            if error is None:
+                if w.on_done is not None:
+                    callbacks.append((w.on_done, result))
+            elif w.on_error is not None:
+                callbacks.append((w.on_error, error))
+            else:
+                print(f"Write-behind warning: {error}")
+        if not callbacks:
+            return
+
+        def _deliver():
+            for callback, arg in callbacks:
+                try:
+                    callback(arg)
+                except Exception as e:
+                    print(f"Write-behind callback warning: {e}")
+
+        try:
+            self._dispatch(_deliver)
+        except Exception as e:  # e.g. the window is already gone during exit
+            print(f"Write-behind dispatch warning: {e}")
+
+
+# ----------- FULL-TEXT SEARCH (FTS5) -----------
+# One FTS5 table covers every searchable table. The FTS rowid encodes the
+# source row as  source_id * 4 + kind  so triggers can update/delete by rowid
+# (an indexed lookup) instead of scanning the index.
+SEARCH_KIND_TODO = 0
+SEARCH_KIND_ARCHIVE = 1
+SEARCH_KIND_NOTE = 2
+SEARCH_KIND_LINK = 3
+SEARCH_KINDS = {
+    SEARCH_KIND_TODO: "todo",
+    SEARCH_KIND_ARCHIVE: "archive",
+    SEARCH_KIND_NOTE: "note",
+    SEARCH_KIND_LINK: "link",
+}
+
+# table -> (kind, title expr, body expr, columns whose change re-indexes the row)
+_SEARCH_SOURCES = {
+    "todos": (SEARCH_KIND_TODO, "{r}.task",
+              "coalesce({r}.deadline, '') || ' ' || coalesce({r}.created_at, '')",
+              ("task", "deadline", "created_at")),
+    "archive_todos": (SEARCH_KIND_ARCHIVE, "{r}.task",
+                      "coalesce({r}.deadline, '') || ' ' || coalesce({r}.done_at, '') || ' ' || coalesce({r}.created_at, '')",
+                      ("task", "deadline", "done_at", "created_at")),
+    "notes": (SEARCH_KIND_NOTE, "{r}.title", "{r}.content", ("title", "content")),
+    "links": (SEARCH_KIND_LINK, "{r}.name", "{r}.url", ("name", "url")),
+}
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE IF EXISTS temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def ensure_search_index(conn: sqlite3.Connection) -> bool:
+    """
+    Create search_fts + its sync triggers if missing and backfill it once.
+    Returns False when this SQLite build has no FTS5 (callers fall back to LIKE).
+    """
+    if not fts5_available(conn):
+        return False
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'"
+    ).fetchone()
+    if not exists:
+        conn.execute("CREATE VIRTUAL TABLE search_fts USING fts5(title, body, prefix='2 3')")
+        for table, (kind, title, body, _cols) in _SEARCH_SOURCES.items():
+            conn.execute(
+                f"INSERT INTO search_fts (rowid, title, body) "
+                f"SELECT id * 4 + {kind}, {title.format(r=table)}, {body.format(r=table)} FROM {table}"
+            )
+    for table, (kind, title, body, cols) in _SEARCH_SOURCES.items():
+        new_title, new_body = title.format(r="new"), body.format(r="new")
+        changed = " OR ".join(f"old.{c} IS NOT new.{c}" for c in cols + ("id",))
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO search_fts (rowid, title, body) VALUES (new.id * 4 + {kind}, {new_title}, {new_body}); END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM search_fts WHERE rowid = old.id * 4 + {kind}; END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE ON {table} WHEN {changed} BEGIN "
+            f"DELETE FROM search_fts WHERE rowid = old.id * 4 + {kind}; "
+            f"INSERT INTO search_fts (rowid, title, body) VALUES (new.id * 4 + {kind}, {new_title}, {new_body}); END"
+        )
+    return True
+
+
+def build_match_query(text: str) -> str:
+    """User text -> FTS5 MATCH string: every word quoted and prefix-matched (AND)."""
+    words = [w.replace('"', '""') for w in text.split()]
+    return " ".join(f'"{w}"*' for w in words if w)
+
+
+def search_items(db: "TaskmaskDB", text: str, limit: int = 50) -> list[tuple[str, object, str, str]]:
+    """
+    Ranked search over todos, archive_todos, notes and links.
+    Returns [(kind, ref, title, snippet), ...] best first, where ref is the
+    uuid for todo/archive hits and the integer id for note/link hits.
+    """
+    match = build_match_query(text)
+    if not match:
+        return []
+    try:
+        hits = db.query(
+            "SELECT rowid, title, snippet(search_fts, 1, '[', ']', '…', 8) FROM search_fts "
+            "WHERE search_fts MATCH ? ORDER BY bm25(search_fts, 10.0, 1.0) LIMIT ?",
+            (match, limit),
+        )
+    except sqlite3.OperationalError:
+        return _search_items_like(db, text, limit)
+
+    uuids = {}
+    for kind, table in ((SEARCH_KIND_TODO, "todos"), (SEARCH_KIND_ARCHIVE, "archive_todos")):
+        ids = [rowid // 4 for rowid, _t, _s in hits if rowid % 4 == kind]
+        if ids:
+            marks = ",".join("?" * len(ids))
+            uuids[kind] = dict(db.query(f"SELECT id, uuid FROM {table} WHERE id IN ({marks})", ids))
+    results = []
+    for rowid, title, snippet in hits:
+        kind, source_id = rowid % 4, rowid // 4
+        ref = uuids[kind].get(source_id) if kind in uuids else source_id
+        if ref is not None:
+            results.append((SEARCH_KINDS[kind], ref, title or "", snippet or ""))
+    return results
+
+
+def _search_items_like(db: "TaskmaskDB", text: str, limit: int) -> list[tuple[str, object, str, str]]:
+    """Fallback for SQLite builds without FTS5 (unranked substring match)."""
+    like = f"%{text.strip()}%"
+    queries = (
+        ("todo", "SELECT uuid, task, coalesce(deadline, '') FROM todos WHERE task LIKE ? OR deadline LIKE ? LIMIT ?"),
+        ("archive", "SELECT uuid, task, coalesce(done_at, '') FROM archive_todos WHERE task LIKE ? OR done_at LIKE ? LIMIT ?"),
+        ("note", "SELECT id, title, substr(content, 1, 80) FROM notes WHERE title LIKE ? OR content LIKE ? LIMIT ?"),
+        ("link", "SELECT id, name, url FROM links WHERE name LIKE ? OR url LIKE ? LIMIT ?"),
+    )
+    results = []
+    for kind, sql in queries:
+        for ref, title, body in db.query(sql, (like, like, limit)):
+            results.append((kind, ref, title or "", body or ""))
+    return results[:limit]
+
+
+# ----------- ARCHIVE -----------
+# Completed todos older than the configured age move to archive_todos. Both
+# queries below are served by indexes created in ensure_archive_indexes().
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_PAGE_SIZE = 50
+
+
+def ensure_archive_indexes(conn: sqlite3.Connection) -> None:
+    # NULL would break the (done_at, id) row-value comparison in page_archive()
+    conn.execute("UPDATE archive_todos SET done_at = '' WHERE done_at IS NULL")
+    # Partial index: only done rows are ever archive candidates
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_todos_done_at ON todos(done_at) WHERE done = 1")
+    # Keyset pagination key for the archive browser (newest first)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_done_at ON archive_todos(done_at, id)")
+
+
+# Re-archiving a uuid updates its row in place. INSERT OR REPLACE would delete
+# it without firing archive_todos_fts_ad (recursive_triggers is off), leaving
+# its old search_fts row behind.
+_ARCHIVE_UPSERT = ", ".join(f"{col} = excluded.{col}" for col in
+                            ("task", "done_at", "deadline", "created_at", "archived_at"))
+
+
+def archivable_todos(db: "TaskmaskDB", cutoff: str) -> list[str]:
+    """
+    uuids of done todos with done_at < cutoff, oldest first. Read-only: the
+    app moves them with archive_todo_rows() through its write-behind queue,
+    behind any queued edit of the same rows, which would otherwise commit
+    after the move and put the row back into todos.
+    """
+    return [row[0] for row in db.query(
+        "SELECT uuid FROM todos WHERE done = 1 AND done_at != '' AND done_at < ? ORDER BY done_at",
+        (cutoff,),
+    )]
+
+
+def archive_todo_rows(conn: sqlite3.Connection, rows: list[tuple], archived_at: str) -> None:
+    """
+    Archive specific todos given as (uuid, task, done_at, deadline, created_at)
+    from the caller's in-memory copy (they may not be saved yet); the matching
+    todos rows are deleted.
+    """
+    conn.executemany(
+        "INSERT INTO archive_todos (uuid, task, done_at, deadline, created_at, archived_at) "
+        f"VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(uuid) DO UPDATE SET {_ARCHIVE_UPSERT}",
+        [(*row, archived_at) for row in rows],
+    )
+    conn.executemany("DELETE FROM todos WHERE uuid = ?", [(row[0],) for row in rows])
+
+
+def page_archive(db: "TaskmaskDB", after: Optional[tuple[str, int]] = None,
+                 limit: int = ARCHIVE_PAGE_SIZE) -> list[tuple]:
+    """
+    One page of archived todos, newest done_at first, using keyset pagination:
+    pass the (done_at, id) of the last row of the previous page as `after`.
+    Rows are (id, uuid, task, done_at, deadline, created_at, archived_at).
+    """
+    cols = "id, uuid, task, done_at, deadline, created_at, archived_at"
+    if after is None:
+        return db.query(
+            f"SELECT {cols} FROM archive_todos ORDER BY done_at DESC, id DESC LIMIT ?", (limit,)
+        )
+    return db.query(
+        f"SELECT {cols} FROM archive_todos WHERE (done_at, id) < (?, ?) "
+        f"ORDER BY done_at DESC, id DESC LIMIT ?",
+        (after[0], after[1], limit),
+    )
+
+
+# ----------- ORDER KEYS -----------
+# order_index values are spaced ORDER_GAP apart, so moving a row only writes
+# one new key between its neighbours. When two neighbours end up adjacent
+# (about log2(ORDER_GAP) moves into the same spot) the list is respaced.
+ORDER_GAP = 1024
+
+
+def order_key_between(before: Optional[int], after: Optional[int]) -> Optional[int]:
+    """A key strictly between two neighbours (None = list end), or None if there is no room."""
+    if before is None and after is None:
+        return ORDER_GAP
+    if before is None:
+        return after - ORDER_GAP
+    if after is None:
+        return before + ORDER_GAP
+    if after - before < 2:
+        return None
+    return (before + after) // 2
+
+
+def is_strictly_increasing(keys: Iterable[int]) -> bool:
+    prev = None
+    for key in keys:
+        if prev is not None and key <= prev:
+            return False
+        prev = key
+    return True
+
+
+def longest_increasing_run(keys: list[int]) -> set[int]:
+    """
+    Positions of one longest strictly increasing subsequence of keys. Shared
+    with widget_utils.TreeviewReconciler: rows in that run stay where they are.
+    """
+    tails: list[int] = []      # tails[k] = position ending the best run of length k+1
+    tail_keys: list[int] = []
+    prev = [-1] * len(keys)
+    for i, key in enumerate(keys):
+        k = bisect.bisect_left(tail_keys, key)
+        if k:
+            prev[i] = tails[k - 1]
+        if k == len(tails):
+            tails.append(i)
+            tail_keys.append(key)
+        else:
+            tails[k] = i
+            tail_keys[k] = key
+    keep = set()
+    i = tails[-1] if tails else -1
+    while i != -1:
+        keep.add(i)
+        i = prev[i]
+    return keep
+
+
+def plan_order_keys(keys: list[int], lo: Optional[int] = None, hi: Optional[int] = None) -> Optional[list[int]]:
+    """
+    New keys for rows listed in their new order (keys = their current keys),
+    rewriting as few as possible: one longest increasing run keeps its keys,
+    every other row gets a key spread between its kept neighbours. lo/hi are
+    the keys just outside the list (None = list end). None if a gap is too small.
+    """
+    inside = [i for i, key in enumerate(keys) if (lo is None or key > lo) and (hi is None or key < hi)]
+    keep = {inside[j] for j in longest_increasing_run([keys[i] for i in inside])}
+    result = list(keys)
+    i = 0
+    while i < len(keys):
+        if i in keep:
+            i += 1
+            continue
+        j = i
+        while j < len(keys) and j not in keep:
+            j += 1
+        count = j - i
+        before = result[i - 1] if i else lo
+        after = keys[j] if j < len(keys) else hi
+        if before is None and after is None:
+            new = [(n + 1) * ORDER_GAP for n in range(count)]
+        elif before is None:
+            new = [after - (count - n) * ORDER_GAP for n in range(count)]
+        elif after is None:
+            new = [before + (n + 1) * ORDER_GAP for n in range(count)]
+        elif after - before > count:
+            new = [before + (after - before) * (n + 1) // (count + 1) for n in range(count)]
+        else:
+            return None
+        result[i:j] = new
+        i = j
+    return result
+
+
+def respace_order(conn: sqlite3.Connection, table: str, ordered_keys: list, key_col: str = "id") -> None:
+    """Rewrite order_index as ORDER_GAP, 2*ORDER_GAP, ... following ordered_keys."""
+    conn.executemany(
+        f"UPDATE {table} SET order_index = ? WHERE {key_col} = ?",
+        [((pos + 1) * ORDER_GAP, key) for pos, key in enumerate(ordered_keys)],
+    )
+
+
+def rebalance_table_order(conn: sqlite3.Connection, table: str, order_by: str = "order_index, id") -> None:
+    """Respace a table's order_index keeping its current order."""
+    ids = [row[0] for row in conn.execute(f"SELECT id FROM {table} ORDER BY {order_by}")]
+    respace_order(conn, table, ids)
+
+
+# ----------- MAINTENANCE -----------
+# With auto_vacuum=INCREMENTAL, pages freed by deletes (archiving, sync
+# replacing rows) stay on the freelist until incremental_vacuum returns them
+# to the OS. Files created before auto_vacuum was enabled need one full VACUUM
+# to switch mode; run_maintenance() does that the first time it runs, on its
+# own connection (see convert_auto_vacuum).
+AUTO_VACUUM_INCREMENTAL = 2
+VACUUM_BUSY_TIMEOUT = 60  # seconds the conversion waits for a running write
+MAINTENANCE_VACUUM_PAGES = 2000  # pages released per run (~8 MB at 4 KiB pages)
+ANALYZE_LIMIT = 400  # rows sampled per index by ANALYZE
+
+
+def db_file_size(path: str) -> int:
+    """Bytes used by the database including its WAL."""
+    total = 0
+    for suffix in ("", "-wal"):
+        try:
+            total += os.path.getsize(path + suffix)
+        except OSError:
+            pass
+    return total
+
+
+def convert_auto_vacuum(path: str) -> bool:
+    """
+    Switch an existing file to auto_vacuum=INCREMENTAL (one full VACUUM).
+    Runs on a connection of its own so the shared TaskmaskDB lock stays free:
+    in WAL mode readers keep seeing the last committed state while the VACUUM
+    rewrites the file, but other writers wait for it. Returns True if the
+    file was converted.
+    """
+    conn = sqlite3.connect(path, timeout=VACUUM_BUSY_TIMEOUT, isolation_level=None)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")  # cannot run inside a transaction
+        # The rewritten file is in the WAL; fold it in here rather than under the lock
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return True
+    finally:
+        conn.close()
+
+
+def run_maintenance(db: "TaskmaskDB", vacuum_pages: int = MAINTENANCE_VACUUM_PAGES,
+                    writes: Optional["WriteBehind"] = None) -> tuple[int, int]:
+    """
+    Release free pages and refresh planner statistics.
+    Returns (size_before, size_after) in bytes. The one-time auto_vacuum
+    conversion runs outside the connection lock with `writes` paused (queued
+    edits commit afterwards); the incremental steps hold the lock, which is
+    brief. Call it when the app is idle.
+    """
+    size_before = db_file_size(db.path)
+    if db.query_one("PRAGMA auto_vacuum")[0] != AUTO_VACUUM_INCREMENTAL:
+        with writes.paused() if writes is not None else nullcontext():
+            convert_auto_vacuum(db.path)
+    with db._lock:
+        if db._tx_depth:
+            return size_before, size_before
+        conn = db.connection()
+        if conn.execute("PRAGMA freelist_count").fetchone()[0]:
+            # executescript() steps the pragma to completion; execute() would
+            # stop after the first page.
+            conn.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+        conn.execute(f"PRAGMA analysis_limit = {ANALYZE_LIMIT}")
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return size_before, db_file_size(db.path)
+
+
+# ----------- DELTA SYNC (CHANGELOG) -----------
+# Triggers on every synced table record (table, uuid) in sync_changelog with a
+# version stamp one above the current maximum, so "what changed since version
+# N" is an index range scan. Deletes leave a tombstone (deleted = 1). Rows are
+# identified across devices by uuid; local integer ids never leave the file.
+# sync_changelog.origin tells where a change came from: '' for local edits,
+# otherwise the value apply_changes() was given (a client id on the server,
+# SYNC_REMOTE_ORIGIN on clients) so nobody is sent their own changes back.
+# Versions only mean something within one file: the server keeps an epoch id
+# in sync_state and replaces it whenever the whole file is swapped (POST
+# /api/db), so clients know to drop their cursors.
+SYNC_TABLES = {
+    "todos": ("task", "done", "deadline", "done_at", "order_index", "created_at"),
+    "archive_todos": ("task", "done_at", "deadline", "created_at", "archived_at"),
+    "notes": ("title", "content", "created_at", "order_index"),
+    "links": ("name", "url", "order_index"),
+}
+SYNC_REMOTE_ORIGIN = "remote"
+SYNC_PAGE_SIZE = 500
+SYNC_EPOCH_KEY = "epoch"
+
+
+class SyncEpochChanged(Exception):
+    """The server's changelog was restarted; cursors from before are meaningless."""
+
+
+def new_row_uuid() -> str:
+    return uuid.uuid4().hex
+
+
+def ensure_sync_changelog(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value)")
+    conn.execute('''CREATE TABLE IF NOT EXISTS sync_changelog
+                    (tbl TEXT NOT NULL,
+                     uuid TEXT NOT NULL,
+                     version INTEGER NOT NULL,
+                     deleted INTEGER NOT NULL DEFAULT 0,
+                     origin TEXT NOT NULL DEFAULT '',
+                     PRIMARY KEY (tbl, uuid))''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sync_changelog_version ON sync_changelog(version)")
+    for table, columns in SYNC_TABLES.items():
+        # An explicit upsert: INSERT OR REPLACE in a trigger would be overridden
+        # by the conflict policy of the statement that fired it.
+        log = (f"INSERT INTO sync_changelog (tbl, uuid, version, deleted, origin) "
+               f"VALUES ('{table}', {{row}}.uuid, "
+               f"(SELECT coalesce(max(version), 0) + 1 FROM sync_changelog), {{deleted}}, "
+               f"coalesce((SELECT value FROM sync_state WHERE key = 'origin'), '')) "
+               f"ON CONFLICT (tbl, uuid) DO UPDATE SET version = excluded.version, "
+               f"deleted = excluded.deleted, origin = excluded.origin;")
+        changed = " OR ".join(f"OLD.{col} IS NOT NEW.{col}" for col in ("uuid",) + columns)
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_sync_ai AFTER INSERT ON {table}
+                         WHEN NEW.uuid IS NOT NULL
+                         BEGIN {log.format(row="NEW", deleted=0)} END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_sync_au AFTER UPDATE ON {table}
+                         WHEN NEW.uuid IS NOT NULL AND ({changed})
+                         BEGIN {log.format(row="NEW", deleted=0)} END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_sync_ad AFTER DELETE ON {table}
+                         WHEN OLD.uuid IS NOT NULL
+                         BEGIN {log.format(row="OLD", deleted=1)} END""")
+
+
+def sync_changelog_version(db: "TaskmaskDB") -> int:
+    return db.query_one("SELECT coalesce(max(version), 0) FROM sync_changelog")[0]
+
+
+def get_sync_state(db: "TaskmaskDB", key: str, default=None):
+    row = db.query_one("SELECT value FROM sync_state WHERE key = ?", (key,))
+    return default if row is None else row[0]
+
+
+def set_sync_state(db: "TaskmaskDB", key: str, value) -> None:
+    db.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+
+def sync_epoch(db: "TaskmaskDB") -> str:
+    return str(get_sync_state(db, SYNC_EPOCH_KEY, "") or "")
+
+
+def new_sync_epoch(db: "TaskmaskDB") -> str:
+    """Start a new changelog epoch (after the file was replaced wholesale)."""
+    epoch = uuid.uuid4().hex
+    set_sync_state(db, SYNC_EPOCH_KEY, epoch)
+    return epoch
+
+
+def changes_since(db: "TaskmaskDB", since: int, exclude_origin: Optional[str] = None,
+                  limit: int = SYNC_PAGE_SIZE) -> tuple[list[dict], int, bool]:
+    """
+    Up to `limit` changelog entries with version > since, oldest first, as
+    {"t": table, "u": uuid, "v": version, "d": 0|1, "r": [column values]}
+    ("r" follows SYNC_TABLES and is omitted for deletes). Entries whose origin
+    is exclude_origin are skipped but still advance the returned cursor.
+    Returns (changes, cursor, more).
+    """
+    with db.transaction() as conn:  # one snapshot for the log and the rows
+        log = conn.execute(
+            "SELECT tbl, uuid, version, deleted, origin FROM sync_changelog "
+            "WHERE version > ? ORDER BY version LIMIT ?",
+            (since, limit + 1),
+        ).fetchall()
+        more = len(log) > limit
+        log = log[:limit]
+        wanted: dict[str, list[str]] = {}
+        for table, row_uuid, _version, deleted, origin in log:
+            if not deleted and origin != exclude_origin and table in SYNC_TABLES:
+                wanted.setdefault(table, []).append(row_uuid)
+        values: dict[tuple[str, str], list] = {}
+        for table, uuids in wanted.items():
+            columns = ", ".join(SYNC_TABLES[table])
+            for start in range(0, len(uuids), 500):
+                chunk = uuids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for row in conn.execute(f"SELECT uuid, {columns} FROM {table} WHERE uuid IN ({marks})", chunk):
+                    values[(table, row[0])] = list(row[1:])
+    changes = []
+    for table, row_uuid, version, deleted, origin in log:
+        if origin == exclude_origin or table not in SYNC_TABLES:
+            continue
+        change = {"t": table, "u": row_uuid, "v": version, "d": 1 if deleted else 0}
+        if not deleted:
+            row = values.get((table, row_uuid))
+            if row is None:  # changed and then deleted within this page
+                change["d"] = 1
+            else:
+                change["r"] = row
+        changes.append(change)
+    cursor = log[-1][2] if log else since
+    return changes, cursor, more
+
+
+def _sync_upsert_sql(conn: sqlite3.Connection, table: str, columns: tuple) -> str:
+    """uuid-keyed upsert of `columns` for apply_changes()."""
+    info = {row[1]: row for row in conn.execute(f"PRAGMA table_info({table})")}
+    marks = ["?"]
+    for col in columns:
+        _cid, _name, _type, notnull, default, _pk = info[col]
+        marks.append(f"coalesce(?, {default if default is not None else repr('')})" if notnull else "?")
+    updates = ", ".join(f"{col} = excluded.{col}" for col in columns)
+    return (f"INSERT INTO {table} (uuid, {', '.join(columns)}) VALUES ({', '.join(marks)}) "
+            f"ON CONFLICT(uuid) DO UPDATE SET {updates}")
+
+
+def apply_changes(db: "TaskmaskDB", changes: list[dict], origin: str) -> int:
+    """
+    Apply changes from changes_since() of another replica in one transaction;
+    the changelog entries they trigger are tagged with `origin`. Unknown
+    tables and malformed entries are skipped; NULL for a NOT NULL column is
+    stored as the column default (or '') so one partial row can't fail the
+    whole batch. Returns the number applied.
+    """
+    applied = 0
+    upserts: dict[str, str] = {}
+    with db.transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('origin', ?)", (origin,))
+        try:
+            for change in changes:
+                if not isinstance(change, dict):
+                    continue
+                table = change.get("t")
+                row_uuid = change.get("u")
+                columns = SYNC_TABLES.get(table)
+                if columns is None or not isinstance(row_uuid, str) or not row_uuid:
+                    continue
+                if change.get("d"):
+                    conn.execute(f"DELETE FROM {table} WHERE uuid = ?", (row_uuid,))
+                else:
+                    row = change.get("r")
+                    if (not isinstance(row, list) or len(row) != len(columns)
+                            or not all(v is None or isinstance(v, (str, int, float)) for v in row)):
+                        continue
+                    if table not in upserts:
+                        upserts[table] = _sync_upsert_sql(conn, table, columns)
+                    conn.execute(upserts[table], [row_uuid, *row])
+                applied += 1
+        finally:
+            conn.execute("DELETE FROM sync_state WHERE key = 'origin'")
+    return applied
+
+
+# ----------- SCHEMA MIGRATIONS -----------
+# PRAGMA user_version stores how many steps of MIGRATIONS have been applied.
+# Steps run in order, all pending ones inside a single transaction, and are
+# never edited once shipped: schema changes go in a new step at the end.
+# An up-to-date database costs one PRAGMA read.
+
+def _columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _m001_base_schema(conn: sqlite3.Connection) -> None:
+    """Tables as created by every earlier release, plus columns older files lack."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS todos
+                    (id INTEGER PRIMARY KEY,
+                     uuid TEXT,
+                     task TEXT,
+                     done INTEGER,
+                     deadline TEXT,
+                     done_at TEXT,
+                     order_index INTEGER DEFAULT 0,
+                     created_at TEXT)''')
+    columns = _columns(conn, "todos")
+    for name, decl in (("deadline", "TEXT"), ("uuid", "TEXT"), ("done_at", "TEXT"),
+                       ("order_index", "INTEGER DEFAULT 0"), ("created_at", "TEXT")):
+        if name not in columns:
+            conn.execute(f"ALTER TABLE todos ADD COLUMN {name} {decl}")
+    conn.execute("UPDATE todos SET created_at = datetime('now') WHERE created_at IS NULL")
+
+    # Archive table for completed tasks (see archive_todo_rows)
+    conn.execute('''CREATE TABLE IF NOT EXISTS archive_todos
+                    (id INTEGER PRIMARY KEY,
+                     uuid TEXT UNIQUE,
+                     task TEXT,
+                     done_at TEXT,
+                     deadline TEXT,
+                     created_at TEXT,
+                     archived_at TEXT)''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS notes
+                    (id INTEGER PRIMARY KEY,
+                     title TEXT NOT NULL,
+                     content TEXT NOT NULL,
+                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                     order_index INTEGER DEFAULT 0)''')
+    if "order_index" not in _columns(conn, "notes"):
+        conn.execute("ALTER TABLE notes ADD COLUMN order_index INTEGER DEFAULT 0")
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS links
+                    (id INTEGER PRIMARY KEY,
+                     name TEXT,
+                     url TEXT,
+                     order_index INTEGER DEFAULT 0)''')
+    if "order_index" not in _columns(conn, "links"):
+        conn.execute("ALTER TABLE links ADD COLUMN order_index INTEGER DEFAULT 0")
+
+
+def _m002_unique_todo_uuids(conn: sqlite3.Connection) -> None:
+    """
+    Every todo needs a unique uuid for the upsert in persist_todos_to_db().
+    Rows sharing a uuid are all kept: the newest keeps it, the others get
+    fresh ones.
+    """
+    conn.execute("UPDATE todos SET uuid = lower(hex(randomblob(16))) WHERE uuid IS NULL OR uuid = ''")
+    conn.execute(
+        "UPDATE todos SET uuid = lower(hex(randomblob(16))) "
+        "WHERE id NOT IN (SELECT MAX(id) FROM todos GROUP BY uuid)"
+    )
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_todos_uuid ON todos(uuid)")
+
+
+def _m003_hot_query_indexes(conn: sqlite3.Connection) -> None:
+    """Indexes for the ORDER BY order_index listings and the archiver/archive browser."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_todos_order ON todos(order_index)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notes_order ON notes(order_index)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_links_order ON links(order_index)")
+    ensure_archive_indexes(conn)
+
+
+def _m004_search_index(conn: sqlite3.Connection) -> None:
+    ensure_search_index(conn)
+
+
+def _m005_gapped_order_keys(conn: sqlite3.Connection) -> None:
+    """Respace the dense 0..n / 1..n order_index values to ORDER_GAP steps."""
+    rebalance_table_order(conn, "todos", "order_index, created_at, id")
+    rebalance_table_order(conn, "notes")
+    rebalance_table_order(conn, "links")
+
+
+def _m006_incremental_auto_vacuum(conn: sqlite3.Connection) -> None:
+    """
+    Request auto_vacuum=INCREMENTAL. New files already have it (see PRAGMAS);
+    existing ones switch at their first run_maintenance() VACUUM.
+    """
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+
+def _m007_sync_changelog(conn: sqlite3.Connection) -> None:
+    """
+    uuids for notes and links, then the delta-sync changelog seeded with every
+    existing row. Existing notes/links get uuids derived from their id and
+    content, so copies of one file on two devices agree on them.
+    """
+    for table, identity in (("notes", "id, title"), ("links", "id, url")):
+        if "uuid" not in _columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN uuid TEXT")
+        rows = conn.execute(f"SELECT {identity} FROM {table} WHERE uuid IS NULL").fetchall()
+        conn.executemany(
+            f"UPDATE {table} SET uuid = ? WHERE id = ?",
+            [(uuid.uuid5(uuid.NAMESPACE_URL, f"taskmask:{table}:{row_id}:{extra}").hex, row_id)
+             for row_id, extra in rows],
+        )
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_uuid ON {table}(uuid)")
+    ensure_sync_changelog(conn)
+    for table in SYNC_TABLES:
+        base = conn.execute("SELECT coalesce(max(version), 0) FROM sync_changelog").fetchone()[0]
+        conn.execute(
+            "INSERT OR IGNORE INTO sync_changelog (tbl, uuid, version, deleted, origin) "
+            f"SELECT '{table}', uuid, ? + id, 0, '' FROM {table} WHERE uuid IS NOT NULL",
+            (base,),
+        )
+
+
+def _m008_drop_orphaned_search_rows(conn: sqlite3.Connection) -> None:
+    """
+    Remove search_fts rows whose source row is gone: archiving a uuid twice
+    used INSERT OR REPLACE, which didn't fire the FTS delete trigger.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'"
+    ).fetchone()
+    if not exists:
+        return
+    for table, (kind, _title, _body, _cols) in _SEARCH_SOURCES.items():
+        conn.execute(
+            f"DELETE FROM search_fts WHERE rowid % 4 = {kind} "
+            f"AND rowid / 4 NOT IN (SELECT id FROM {table})"
+        )
+
+
+MIGRATIONS = (
+    _m001_base_schema,
+    _m002_unique_todo_uuids,
+    _m003_hot_query_indexes,
+    _m004_search_index,
+    _m005_gapped_order_keys,
+    _m006_incremental_auto_vacuum,
+    _m007_sync_changelog,
+    _m008_drop_orphaned_search_rows,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(db: "TaskmaskDB") -> int:
+    """
+    Apply pending MIGRATIONS and return the schema version.
+    Files written by a newer release (higher user_version) are left untouched.
+    """
+    version = db.query_one("PRAGMA user_version")[0]
+    if version >= SCHEMA_VERSION:
+        return version
+    with db.transaction() as conn:
+        # Re-read under the write lock in case another process migrated meanwhile
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for step in MIGRATIONS[version:]:
+            step(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return SCHEMA_VERSION
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Shared Tk widget helpers for the dashboard.
+
+TreeviewReconciler keeps a flat ttk.Treeview in sync with a desired list of
+rows while issuing as few Tk calls as possible (no delete-all + re-insert),
+so large tables don't flicker or lose selection/scroll position on refresh.
+
+VirtualList is a Listbox-like widget that only draws the rows currently in
+view, so its cost depends on the widget height, not on the number of items.
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+
+from taskmask_db import longest_increasing_run
+
+
+class TreeviewReconciler:
+    """
+    Diff-based renderer for a flat (single level) ttk.Treeview.
+
+    Remembers the (values, tags) it last wrote for every item, so unchanged
+    rows cost nothing; only the minimal delete/insert/move/item calls are sent.
+    All value/tag writes to the tree should go through reconcile()/update_row().
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._shown: dict[str, tuple[tuple, tuple]] = {}  # iid -> (values, tags)
+
+    def __contains__(self, iid: str) -> bool:
+        return iid in self._shown
+
+    def update_row(self, iid: str, values: tuple, tags: tuple = ()) -> bool:
+        """Rewrite one row only if its values/tags changed. Returns True if Tk was touched."""
+        state = (tuple(values), tuple(tags))
+        if self._shown.get(iid) == state:
+            return False
+        self.tree.item(iid, values=state[0], tags=state[1])
+        self._shown[iid] = state
+        return True
+
+    def remove_rows(self, iids) -> None:
+        """Delete these rows (one Tk call) without reconciling the rest."""
+        present = [iid for iid in iids if iid in self._shown]
+        if present:
+            self.tree.delete(*present)
+            for iid in present:
+                del self._shown[iid]
+
+    def reconcile(self, rows: list[tuple[str, tuple, tuple]]) -> None:
+        """Make the tree show exactly `rows` = [(iid, values, tags), ...] in that order."""
+        tree = self.tree
+        current = list(tree.get_children())
+        wanted = {iid: pos for pos, (iid, _values, _tags) in enumerate(rows)}
+
+        # 1) Drop rows that are gone (one Tk call)
+        stale = [iid for iid in current if iid not in wanted]
+        if stale:
+            tree.delete(*stale)
+            for iid in stale:
+                self._shown.pop(iid, None)
+            current = [iid for iid in current if iid in wanted]
+        for iid in list(self._shown):
+            if iid not in wanted:
+                del self._shown[iid]
+
+        # 2) Rows already in correct relative order stay put; the rest are
+        #    detached and re-attached at their new index.
+        keep_idx = longest_increasing_run([wanted[iid] for iid in current])
+        keep = {current[i] for i in keep_idx}
+        moving = [iid for iid in current if iid not in keep]
+        structural = bool(stale or moving or len(current) != len(rows))
+
+        if structural:
+            selection = tree.selection()
+            try:
+                top = tree.yview()[0]
+            except Exception:
+                top = None
+        if moving:
+            tree.detach(*moving)
+
+        present = set(current)
+        for index, (iid, values, tags) in enumerate(rows):
+            if iid not in present:
+                tree.insert("", index, iid=iid, values=values, tags=tags)
+                self._shown[iid] = (tuple(values), tuple(tags))
+                continue
+            if iid not in keep:
+                tree.move(iid, "", index)
+            self.update_row(iid, values, tags)
+
+        # 3) Keep selection + scroll position across structural changes
+        if structural:
+            selection = [iid for iid in selection if iid in wanted]
+            if tuple(tree.selection()) != tuple(selection):
+                tree.selection_set(selection)
+            if top is not None:
+                tree.yview_moveto(top)
+
+
+class VirtualList(tk.Frame):
+    """
+    Scrollable single-select list of (key, text) items drawn on a Canvas.
+
+    Items live in a Python list; a fixed pool of canvas rows (one per visible
+    line) is re-labelled on scroll, so no per-item widgets or menus exist.
+    Implements the subset of the tk.Listbox API the dashboard uses
+    (curselection, selection_set/clear, see, get, size) plus key helpers.
+
+    on_activate(key)        - double-click / Enter on a row
+    on_context(key, event)  - right-click on a row (row is selected first)
+    """
+
+    def __init__(self, parent, font=("Segoe UI", 11), height=8, bg="#f8f9fa", fg="#111",
+                 selectbackground="#007bff", selectforeground="white",
+                 on_activate=None, on_context=None, **frame_kw):
+        super().__init__(parent, **frame_kw)
+        self._font = tkfont.Font(font=font)
+        self.row_height = self._font.metrics("linespace") + 6
+        self._colors = (bg, fg, selectbackground, selectforeground)
+        self.on_activate = on_activate
+        self.on_context = on_context
+
+        self.canvas = tk.Canvas(self, bg=bg, highlightthickness=0, relief="flat",
+                                height=height * self.row_height)
+        self.scrollbar = tk.Scrollbar(self, command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self._items: list[tuple[object, str]] = []
+        self._index: dict[object, int] = {}  # key -> position
+        self._top = 0          # first visible item
+        self._selected = None  # selected position
+        self._pool: list[tuple[int, int]] = []  # (rect id, text id) per visible line
+
+        self.canvas.bind("<Configure>", lambda e: self._redraw())
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<Double-Button-1>", self._on_double_click)
+        self.canvas.bind("<Button-3>", self._on_right_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+        self.canvas.bind("<Up>", lambda e: self._step_selection(-1))
+        self.canvas.bind("<Down>", lambda e: self._step_selection(1))
+        self.canvas.bind("<Return>", lambda e: self._activate(self._selected))
+
+    # ----------- MODEL -----------
+    def set_items(self, items: list[tuple[object, str]]) -> None:
+        """Replace the items, keeping the selection (by key) and scroll offset."""
+        selected_key = self.selected_key()
+        self._items = list(items)
+        self._index = {key: pos for pos, (key, _text) in enumerate(self._items)}
+        self._selected = self._index.get(selected_key)
+        self._redraw()
+
+    def move(self, src: int, dst: int) -> None:
+        """Move the item at src to position dst (selection follows it if selected)."""
+        item = self._items.pop(src)
+        self._items.insert(dst, item)
+        lo, hi = min(src, dst), max(src, dst)
+        for pos in range(lo, hi + 1):
+            self._index[self._items[pos][0]] = pos
+        if self._selected == src:
+            self._selected = dst
+        self._redraw()
+
+    def key_at(self, index: int):
+        return self._items[index][0]
+
+    def index_of_key(self, key):
+        return self._index.get(key)
+
+    def selected_key(self):
+        if self._selected is None or self._selected >= len(self._items):
+            return None
+        return self._items[self._selected][0]
+
+    # ----------- LISTBOX-COMPATIBLE API -----------
+    def size(self) -> int:
+        return len(self._items)
+
+    def get(self, index: int) -> str:
+        return self._items[index][1]
+
+    def curselection(self) -> tuple:
+        return () if self.selected_key() is None else (self._selected,)
+
+    def selection_clear(self, *_args) -> None:
+        self._selected = None
+        self._redraw()
+
+    def selection_set(self, index: int) -> None:
+        self._selected = index if 0 <= index < len(self._items) else None
+        self._redraw()
+
+    def see(self, index: int) -> None:
+        visible = self._visible_rows()
+        if index < self._top:
+            self._top = index
+        elif index >= self._top + visible:
+            self._top = index - visible + 1
+        self._redraw()
+
+    # ----------- SCROLLING -----------
+    def _visible_rows(self) -> int:
+        height = self.canvas.winfo_height()
+        if height <= 1:  # not mapped yet: use the requested height
+            height = int(self.canvas.cget("height") or self.row_height)
+        return max(1, height // self.row_height)
+
+    def yview(self, *args):
+        """Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"|"pages")."""
+        total = len(self._items)
+        visible = self._visible_rows()
+        if not args:
+            if not total:
+                return (0.0, 1.0)
+            return (self._top / total, min(1.0, (self._top + visible) / total))
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = int(args[1]) * (visible if args[2] == "pages" else 1)
+            self._top += step
+        self._redraw()
+
+    # ----------- DRAWING -----------
+    def _redraw(self) -> None:
+        total = len(self._items)
+        visible = self._visible_rows()
+        self._top = max(0, min(self._top, total - visible))
+        width = max(self.canvas.winfo_width(), 1)
+        bg, fg, sel_bg, sel_fg = self._colors
+        canvas = self.canvas
+
+        # Pool grows to the number of lines that fit; it never tracks item count
+        while len(self._pool) < visible + 1:
+            rect = canvas.create_rectangle(0, 0, 0, 0, width=0)
+            text = canvas.create_text(0, 0, anchor="w", font=self._font)
+            self._pool.append((rect, text))
+
+        for line, (rect, text) in enumerate(self._pool):
+            pos = self._top + line
+            if line > visible or pos >= total:
+                canvas.itemconfigure(rect, state="hidden")
+                canvas.itemconfigure(text, state="hidden")
+                continue
+            y = line * self.row_height
+            selected = pos == self._selected
+            canvas.coords(rect, 0, y, width, y + self.row_height)
+            canvas.itemconfigure(rect, fill=sel_bg if selected else bg, state="normal")
+            canvas.coords(text, 6, y + self.row_height // 2)
+            canvas.itemconfigure(text, text=self._items[pos][1], fill=sel_fg if selected else fg, state="normal")
+
+        if total:
+            self.scrollbar.set(self._top / total, min(1.0, (self._top + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # ----------- EVENTS -----------
+    def _pos_at(self, y: int):
+        pos = self._top + int(y) // self.row_height
+        return pos if 0 <= pos < len(self._items) else None
+
+    def _on_click(self, event) -> None:
+        self.canvas.focus_set()
+        pos = self._pos_at(event.y)
+        if pos is not None:
+            self.selection_set(pos)
+
+    def _on_double_click(self, event) -> None:
+        self._activate(self._pos_at(event.y))
+
+    def _on_right_click(self, event) -> None:
+        pos = self._pos_at(event.y)
+        if pos is None:
+            return
+        self.selection_set(pos)
+        if self.on_context:
+            self.on_context(self._items[pos][0], event)
+
+    def _step_selection(self, step: int) -> None:
+        if not self._items:
+            return
+        pos = 0 if self._selected is None else max(0, min(len(self._items) - 1, self._selected + step))
+        self.selection_set(pos)
+        self.see(pos)
+
+    def _activate(self, pos) -> None:
+        if pos is not None and self.on_activate:
+            self.on_activate(self._items[pos][0])